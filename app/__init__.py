@@ -3,36 +3,64 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_wtf.csrf import CSRFProtect
 from dotenv import load_dotenv
-import os
+from app.database import RoutingSession, init_engines
+from app.compression import init_compression
 
 # 加载环境变量
 load_dotenv()
 
 # 创建扩展实例
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})  # 读请求的查询可路由到只读引擎
 login_manager = LoginManager()
 csrf = CSRFProtect()
 
 # 用户加载器函数 - Flask-Login 必须要有这个函数来从会话中加载用户
+# 返回缓存的轻量身份对象，命中时不查询数据库；携带API令牌的请求以令牌对应的用户为准
 @login_manager.user_loader
 def load_user(user_id):
-    from .models import User
-    return User.query.get(int(user_id))
+    from app.services.identity import load_identity
+    from app.services.token_service import request_identity
+    return request_identity() or load_identity(int(user_id))
+
+# 没有会话的请求：通过 Authorization: Bearer 令牌认证（仅 /api/ 接口）
+@login_manager.request_loader
+def load_user_from_request(request):
+    from app.services.token_service import request_identity
+    return request_identity()
 
 
 def create_app():
     """创建并配置Flask应用"""
     app = Flask(__name__)
 
-    # 基础配置
-    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY') or 'dev-key-for-testing-change-in-production'
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test_platform.db'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # 基础配置（数据库地址、连接池和SQLite参数均可通过环境变量覆盖，见 app/config.py）
+    from app.config import Config
+    app.config.from_object(Config)
 
     # 初始化扩展
     db.init_app(app)
+    init_engines(app, db)
+    from app.services.cache import init_cache
+    from app.services.identity import init_identity_cache
+    from app.services.passwords import init_password_hashing
+    from app.services.token_service import init_api_tokens
+    from app.services.ai_clients import init_ai_clients
+    from app.services.ai_settings import init_ai_settings
+    from app.services.ai_response_cache import init_ai_response_cache
+    from app.services.ai_jobs import init_ai_jobs
+    from app.services.ai_stream import init_ai_stream
+    init_cache(app)
+    init_identity_cache(app)
+    init_password_hashing(app)
+    init_ai_clients(app)
+    init_ai_settings(app)
+    init_ai_response_cache(app)
+    init_ai_jobs(app)
+    init_ai_stream(app)
     login_manager.init_app(app)
     csrf.init_app(app)
+    init_api_tokens(app, csrf)
+    init_compression(app)
     login_manager.login_view = 'auth.login'  # 设置登录页面
 
     # 注册蓝图
@@ -41,16 +69,20 @@ def create_app():
     from app.bugs import bugs_bp
     from app.test_cases import test_cases_bp
     from app.ai import ai_bp
+    from app.test_runs import test_runs_bp
+    from app.api_tokens import api_tokens_bp
     
     app.register_blueprint(main_bp)
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(bugs_bp)
     app.register_blueprint(test_cases_bp)
+    app.register_blueprint(test_runs_bp)
+    app.register_blueprint(api_tokens_bp)
     app.register_blueprint(ai_bp, url_prefix='/api/ai')
 
-    # 创建数据库表
-    with app.app_context():
-        from . import models
-        db.create_all()
+    # 注册命令行工具
+    # 数据库结构由迁移管理（flask db upgrade），不在请求服务进程启动时创建
+    from app.cli import register_commands
+    register_commands(app)
 
     return app
\ No newline at end of file
@@ -1,13 +1,21 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask import Blueprint, Response, render_template, redirect, url_for, flash, request, jsonify, stream_with_context
 from flask_login import login_required, current_user
 from app.forms import AIConfigForm
 from app.services.ai_service import AIService
+from app.services.ai_clients import get_registry
+from app.services.ai_settings import get_ai_settings, get_ai_settings_cache
+from app.services.ai_jobs import AIJobQueueFull, get_job, get_queue
+from app.services import ai_stream
+from app.services.query_budget import query_budget
 from app.models import AIConfig
 from app import db
-import os
 
 ai_bp = Blueprint('ai', __name__)
 
+def _bypass_cache(data):
+    """请求是否要求跳过AI响应缓存：请求体 "refresh": true 或请求头 Cache-Control: no-cache"""
+    return bool(data.get('refresh')) or 'no-cache' in request.headers.get('Cache-Control', '')
+
 @ai_bp.route('/config', methods=['GET', 'POST'])
 @login_required
 def ai_config():
@@ -44,9 +52,9 @@ def ai_config():
             
             db.session.commit()
             
-            # 更新环境变量
-            if ai_config.ai_enabled and ai_config.api_key:
-                os.environ['OPENAI_API_KEY'] = ai_config.api_key
+            # 本进程立即使用新配置（其他工作进程按版本戳刷新），旧配置的客户端在进行中的调用结束后关闭
+            get_ai_settings_cache().invalidate()
+            get_registry().retain_only(ai_config.provider, ai_config.api_key)
             
             flash('AI配置保存成功', 'success')
             return redirect(url_for('ai.ai_config'))
@@ -57,10 +65,26 @@ def ai_config():
     
     return render_template('ai/config.html', form=form, config=ai_config, title='AI配置')
 
+def _enqueue_job(kind, params, data):
+    """创建AI任务并立即返回任务编号，客户端轮询 status_url 获取结果"""
+    # 获取系统配置（进程内缓存，不查询数据库）
+    settings = get_ai_settings()
+    
+    if not settings.enabled:
+        return jsonify({'error': 'AI功能未启用'}), 400
+    
+    try:
+        job = get_queue().submit(kind, params, current_user.id, settings, bypass_cache=_bypass_cache(data))
+    except AIJobQueueFull as e:
+        return jsonify({'error': str(e)}), 503
+    
+    return jsonify({**job.to_dict(), 'status_url': url_for('ai.get_ai_job', job_id=job.id)}), 202
+
 @ai_bp.route('/improve-bug', methods=['POST'])
+@query_budget(3)
 @login_required
 def api_improve_bug():
-    """API：优化缺陷描述"""
+    """API：优化缺陷描述（异步任务）"""
     data = request.json
     user_input = data.get('description', '')
     bug_type = data.get('bug_type', '')
@@ -68,28 +92,13 @@ def api_improve_bug():
     if not user_input:
         return jsonify({'error': '缺少描述内容'}), 400
     
-    # 获取系统配置
-    ai_config = AIConfig.query.first()
-    
-    # 创建AI服务实例
-    provider = ai_config.provider if ai_config else 'openai'
-    api_key = ai_config.api_key if ai_config else os.getenv('OPENAI_API_KEY')
-    ai_enabled = ai_config.ai_enabled if ai_config else False
-    
-    if not ai_enabled:
-        return jsonify({'error': 'AI功能未启用'}), 400
-    
-    ai_service = AIService(api_key=api_key, provider=provider)
-    
-    # 调用AI服务
-    result = ai_service.improve_bug_description(user_input, bug_type)
-    
-    return jsonify(result)
+    return _enqueue_job('improve_bug', {'description': user_input, 'bug_type': bug_type}, data)
 
 @ai_bp.route('/improve-test-case', methods=['POST'])
+@query_budget(3)
 @login_required
 def api_improve_test_case():
-    """API：优化测试用例"""
+    """API：优化测试用例（异步任务）"""
     data = request.json
     description = data.get('description', '')
     module = data.get('module', '')
@@ -97,51 +106,88 @@ def api_improve_test_case():
     if not description:
         return jsonify({'error': '缺少测试用例描述'}), 400
     
-    # 获取系统配置
-    ai_config = AIConfig.query.first()
-    
-    # 创建AI服务实例
-    provider = ai_config.provider if ai_config else 'openai'
-    api_key = ai_config.api_key if ai_config else os.getenv('OPENAI_API_KEY')
-    ai_enabled = ai_config.ai_enabled if ai_config else False
-    
-    if not ai_enabled:
-        return jsonify({'error': 'AI功能未启用'}), 400
-    
-    ai_service = AIService(api_key=api_key, provider=provider)
-    
-    # 调用AI服务
-    result = ai_service.improve_test_case(description, module)
-    
-    return jsonify(result)
+    return _enqueue_job('improve_test_case', {'description': description, 'module': module}, data)
 
 @ai_bp.route('/classify-bug', methods=['POST'])
+@query_budget(3)
 @login_required
 def api_classify_bug():
-    """API：分类缺陷"""
+    """API：分类缺陷（异步任务）"""
     data = request.json
     description = data.get('description', '')
     
     if not description:
         return jsonify({'error': '缺少描述内容'}), 400
     
-    # 获取系统配置
-    ai_config = AIConfig.query.first()
-    
-    # 创建AI服务实例
-    provider = ai_config.provider if ai_config else 'openai'
-    api_key = ai_config.api_key if ai_config else os.getenv('OPENAI_API_KEY')
-    ai_enabled = ai_config.ai_enabled if ai_config else False
+    return _enqueue_job('classify_bug', {'description': description}, data)
+
+def _stream_events(events_for, data):
+    """以 Server-Sent Events 流式返回AI生成的字段；同时进行的流式请求已满时返回503，客户端改用任务接口"""
+    # 获取系统配置（进程内缓存，不查询数据库）
+    settings = get_ai_settings()
     
-    if not ai_enabled:
+    if not settings.enabled:
         return jsonify({'error': 'AI功能未启用'}), 400
     
-    ai_service = AIService(api_key=api_key, provider=provider)
+    # 先创建服务再占用名额，创建失败时不占用名额
+    ai_service = AIService(api_key=settings.api_key, provider=settings.provider, bypass_cache=_bypass_cache(data))
+    
+    def generate():
+        for event, payload in events_for(ai_service):
+            yield ai_stream.format_event(event, payload)
+    
+    slots = ai_stream.get_slots()
+    if not slots.acquire(blocking=False):
+        return jsonify({'error': 'AI生成请求过多，请稍后重试'}), 503
+    
+    try:
+        response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'  # 关闭反向代理的响应缓冲
+        # 生成器可能在开始前就被丢弃（客户端断开），在响应关闭时释放名额
+        response.call_on_close(slots.release)
+    except BaseException:
+        slots.release()
+        raise
+    return response
+
+@ai_bp.route('/improve-bug/stream', methods=['POST'])
+@query_budget(1)
+@login_required
+def api_improve_bug_stream():
+    """API：流式优化缺陷描述（SSE）"""
+    data = request.json
+    user_input = data.get('description', '')
+    bug_type = data.get('bug_type', '')
     
-    # 调用AI服务
-    classification = ai_service.classify_bug(description)
+    if not user_input:
+        return jsonify({'error': '缺少描述内容'}), 400
     
-    return jsonify(classification)
+    return _stream_events(lambda service: service.stream_bug_description(user_input, bug_type), data)
+
+@ai_bp.route('/improve-test-case/stream', methods=['POST'])
+@query_budget(1)
+@login_required
+def api_improve_test_case_stream():
+    """API：流式优化测试用例（SSE）"""
+    data = request.json
+    description = data.get('description', '')
+    module = data.get('module', '')
+    
+    if not description:
+        return jsonify({'error': '缺少测试用例描述'}), 400
+    
+    return _stream_events(lambda service: service.stream_test_case(description, module), data)
+
+@ai_bp.route('/jobs/<int:job_id>', methods=['GET'])
+@query_budget(3)
+@login_required
+def get_ai_job(job_id):
+    """API：AI任务状态，完成后包含结果（result）或错误信息（error）"""
+    job = get_job(job_id, current_user.id)
+    if job is None:
+        return jsonify({'error': '任务不存在'}), 404
+    return jsonify(job.to_dict())
 
 @ai_bp.route('/suggest-similar-bugs', methods=['POST'])
 @login_required
@@ -166,18 +212,14 @@ def api_suggest_similar_bugs():
             'description': bug.description
         })
     
-    # 获取系统配置
-    ai_config = AIConfig.query.first()
+    # 获取系统配置（进程内缓存，不查询数据库）
+    settings = get_ai_settings()
     
-    # 创建AI服务实例
-    provider = ai_config.provider if ai_config else 'openai'
-    api_key = ai_config.api_key if ai_config else os.getenv('OPENAI_API_KEY')
-    ai_enabled = ai_config.ai_enabled if ai_config else False
-    
-    if not ai_enabled:
+    if not settings.enabled:
         return jsonify({'error': 'AI功能未启用'}), 400
     
-    ai_service = AIService(api_key=api_key, provider=provider)
+    # 创建AI服务实例
+    ai_service = AIService(api_key=settings.api_key, provider=settings.provider)
     
     # 调用AI服务
     similar_bugs = ai_service.suggest_similar_bugs(description, bugs_data)
@@ -185,22 +227,18 @@ def api_suggest_similar_bugs():
     return jsonify({'similar_bugs': similar_bugs})
 
 @ai_bp.route('/test-connection', methods=['POST'])
+@query_budget(1)
 @login_required
 def api_test_connection():
     """API：测试AI连接"""
-    # 获取系统配置
-    ai_config = AIConfig.query.first()
-    
-    # 创建AI服务实例
-    provider = ai_config.provider if ai_config else 'openai'
-    api_key = ai_config.api_key if ai_config else os.getenv('OPENAI_API_KEY')
-    ai_enabled = ai_config.ai_enabled if ai_config else False
-    ai_service = AIService(api_key=api_key, provider=provider)
+    # 获取系统配置（进程内缓存，不查询数据库）
+    settings = get_ai_settings()
     
     # 测试连接
-    if not ai_enabled or not api_key:
+    if not settings.enabled or not settings.api_key:
         return jsonify({'connected': False, 'message': 'AI功能未启用或未配置API密钥'})
     
+    ai_service = AIService(api_key=settings.api_key, provider=settings.provider)
     connected = ai_service.test_connection()
     message = "连接成功" if connected else "连接失败，请检查API密钥"
     
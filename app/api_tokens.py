@@ -0,0 +1,34 @@
+from flask import Blueprint, request, jsonify
+from flask_login import login_required, current_user
+from app.services import token_service
+from app.services.query_budget import query_budget
+
+api_tokens_bp = Blueprint('api_tokens', __name__)
+
+@api_tokens_bp.route('/api/tokens', methods=['POST'])
+@login_required
+def create_api_token():
+    """创建个人API令牌，如 {"name": "CI", "expires_in_days": 90}；令牌明文只在响应中返回这一次"""
+    payload = request.get_json(silent=True)
+    payload = payload if isinstance(payload, dict) else {}
+    try:
+        token, raw = token_service.create_token(current_user.id, payload.get('name'), payload.get('expires_in_days'))
+    except token_service.ApiTokenError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({**token.to_dict(), 'token': raw}), 201
+
+@api_tokens_bp.route('/api/tokens', methods=['GET'])
+@query_budget(2)
+@login_required
+def list_api_tokens():
+    """当前用户的API令牌列表（不含令牌明文）"""
+    return jsonify({'items': [token.to_dict() for token in token_service.list_tokens(current_user.id)]})
+
+@api_tokens_bp.route('/api/tokens/<int:token_id>', methods=['DELETE'])
+@login_required
+def revoke_api_token(token_id):
+    """撤销API令牌"""
+    token = token_service.revoke_token(current_user.id, token_id)
+    if token is None:
+        return jsonify({'error': '令牌不存在'}), 404
+    return jsonify(token.to_dict())
@@ -3,6 +3,7 @@ from flask_login import login_user, logout_user, login_required, current_user
 from app import db 
 from app.models import User 
 from app.forms import RegistrationForm, LoginForm 
+from app.services.passwords import PasswordHasherBusy 
 
 # 创建认证蓝图 
 auth_bp = Blueprint('auth', __name__) 
@@ -33,6 +34,10 @@ def register():
             flash('注册成功！请登录您的账号', 'success')
             return redirect(url_for('auth.login'))
             
+        except PasswordHasherBusy as e:
+            db.session.rollback()
+            flash(str(e), 'warning')
+            return render_template('auth/register.html', form=form, title='注册'), 503
         except Exception as e:
             db.session.rollback()
             flash(f'注册失败：{str(e)}', 'danger')
@@ -53,8 +58,22 @@ def login():
         # 查找用户
         user = User.query.filter_by(email=form.email.data).first()
         
-        # 验证用户和密码
-        if user is None or not user.check_password(form.password.data):
+        # 验证用户和密码（在有上限的线程池中计算，过载时返回503）
+        try:
+            valid = user is not None and user.check_password(form.password.data)
+        except PasswordHasherBusy as e:
+            flash(str(e), 'warning')
+            return render_template('auth/login.html', form=form, title='登录'), 503
+        
+        if valid and user.password_needs_rehash():
+            # 旧算法或旧成本参数生成的哈希，按当前配置重新计算；过载时留到下次登录
+            try:
+                user.set_password(form.password.data)
+                db.session.commit()
+            except PasswordHasherBusy:
+                pass
+        
+        if not valid:
             flash('邮箱或密码错误', 'danger')
         else:
             # 登录用户
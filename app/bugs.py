@@ -1,55 +1,85 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify 
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, abort 
 from flask_login import login_required, current_user 
 from app import db 
 from app.models import Bug, User 
 from app.forms import BugForm, BugSearchForm 
+from app.services import stats_service, search_service, import_service, export_service, bulk_service, projection 
+from app.services.pagination import cached_keyset_paginate, filter_args 
+from app.services.query_budget import query_budget 
+from app.services.conditional import conditional_get 
+from sqlalchemy.orm import joinedload 
 from datetime import datetime 
 
 bugs_bp = Blueprint('bugs', __name__) 
 
+# 列表与API查询统一预加载创建人和处理人，避免逐行懒加载 
+BUG_LIST_OPTIONS = (joinedload(Bug.creator), joinedload(Bug.assignee)) 
+
+# 编号的最大值（SQLite INTEGER 为64位有符号整数），输入联想中超出的数字不按编号查找 
+MAX_RECORD_ID = 2 ** 63 - 1 
+
+def _filtered_bug_query(form): 
+    """根据搜索表单构建缺陷查询""" 
+    query = Bug.query 
+    
+    if form.keyword.data: 
+        query = query.filter(search_service.keyword_filter('bug', form.keyword.data)) 
+    
+    if form.status.data: 
+        query = query.filter_by(status=form.status.data) 
+    
+    if form.severity.data: 
+        query = query.filter_by(severity=form.severity.data) 
+    
+    return query 
+
+def _filtered_bug_total(form, query, bug_counts): 
+    """获取筛选结果总数：能从状态计数器得到时直接读取，否则仅在显式请求时统计""" 
+    if not form.keyword.data and not form.severity.data: 
+        if form.status.data: 
+            return bug_counts.get(form.status.data, 0) 
+        return bug_counts['total'] 
+    
+    if request.args.get('with_count', type=int): 
+        return query.order_by(None).count() 
+    
+    return None 
+
+def _bug_list_key(form): 
+    """列表缓存键：筛选条件""" 
+    return (form.keyword.data, form.status.data, form.severity.data, request.args.get('with_count', type=int)) 
+
 @bugs_bp.route('/bugs') 
+@query_budget(3) 
 @login_required 
 def bug_list(): 
     """缺陷列表页"""
     try:
-        page = request.args.get('page', 1, type=int) 
+        cursor = request.args.get('cursor') 
         per_page = 10 
         
         form = BugSearchForm(request.args) 
         
-        # 构建查询 
-        query = Bug.query 
+        # 构建查询并应用筛选条件 
+        query = _filtered_bug_query(form).options(*BUG_LIST_OPTIONS) 
         
-        # 应用筛选条件 
-        if form.keyword.data: 
-            keyword = f"%{form.keyword.data}%" 
-            query = query.filter(db.or_( 
-                Bug.title.like(keyword), 
-                Bug.description.like(keyword) 
-            )) 
+        # 统计数据（读取增量维护的状态计数器） 
+        bug_counts = stats_service.get_status_counts('bug') 
+        total_bugs = bug_counts['total'] 
+        new_bugs = bug_counts.get('new', 0) 
+        in_progress_bugs = bug_counts.get('in_progress', 0) 
+        fixed_bugs = bug_counts.get('fixed', 0) 
         
-        if form.status.data: 
-            query = query.filter_by(status=form.status.data) 
-        
-        if form.severity.data: 
-            query = query.filter_by(severity=form.severity.data) 
-        
-        # 按创建时间倒序排列 
-        query = query.order_by(Bug.created_at.desc()) 
-        
-        # 分页 
-        bugs_pagination = query.paginate(page=page, per_page=per_page, error_out=False) 
+        # 按创建时间倒序的游标分页 
+        bugs_pagination = cached_keyset_paginate(query, Bug, 'bug', _bug_list_key(form), cursor=cursor, 
+                                                 per_page=per_page, 
+                                                 total=lambda: _filtered_bug_total(form, query, bug_counts)) 
         bugs = bugs_pagination.items 
         
-        # 统计数据 
-        total_bugs = Bug.query.count() 
-        new_bugs = Bug.query.filter_by(status='new').count() 
-        in_progress_bugs = Bug.query.filter_by(status='in_progress').count() 
-        fixed_bugs = Bug.query.filter_by(status='fixed').count() 
-        
         return render_template('bugs/list.html', 
                              bugs=bugs, 
                              pagination=bugs_pagination, 
+                             filter_args=filter_args(request.args), 
                              form=form, 
                              total_bugs=total_bugs, 
                              new_bugs=new_bugs, 
@@ -61,6 +91,7 @@ def bug_list():
         return render_template('bugs/list.html', 
                              bugs=[], 
                              pagination=None, 
+                             filter_args={}, 
                              form=BugSearchForm(), 
                              total_bugs=0, 
                              new_bugs=0, 
@@ -102,17 +133,15 @@ def create_bug():
     return render_template('bugs/create.html', form=form, title='创建缺陷') 
 
 @bugs_bp.route('/bugs/<int:bug_id>') 
+@query_budget(3) 
 @login_required 
+@conditional_get('bug', 'bug_id', html=True) 
 def bug_detail(bug_id): 
-    """缺陷详情页"""
-    bug = Bug.query.get_or_404(bug_id) 
-    
-    # 获取所有用户（用于分配下拉框） 
-    users = User.query.all() 
+    """缺陷详情页（分配人员通过输入联想异步查询，不再加载全部用户）"""
+    bug = Bug.query.options(*BUG_LIST_OPTIONS).filter_by(id=bug_id).first_or_404() 
     
     return render_template('bugs/detail.html', 
                          bug=bug, 
-                         users=users, 
                          title=f'缺陷 #{bug.id}') 
 
 @bugs_bp.route('/bugs/<int:bug_id>/edit', methods=['GET', 'POST']) 
@@ -205,16 +234,28 @@ def update_bug_status(bug_id):
     
     return redirect(url_for('bugs.bug_detail', bug_id=bug_id)) 
 
+@bugs_bp.route('/api/bugs/bulk-update', methods=['POST']) 
+@query_budget(12) 
+@login_required 
+def bulk_update_bugs(): 
+    """批量更新缺陷状态、处理人或严重程度（一条UPDATE语句、一次提交）""" 
+    return bulk_service.bulk_update_response('bug') 
+
 @bugs_bp.route('/bugs/<int:bug_id>/assign', methods=['POST']) 
 @login_required 
 def assign_bug(bug_id): 
     """分配缺陷给用户"""
     bug = Bug.query.get_or_404(bug_id) 
     assignee_id = request.form.get('assignee_id') 
+    # 输入框中的用户名：没有选中候选项（编号为空）时按用户名查找，只有两者都为空才取消分配 
+    assignee_name = (request.form.get('assignee_name') or '').strip() 
     
-    if assignee_id: 
+    if assignee_id or assignee_name: 
         try: 
-            user = User.query.get(int(assignee_id)) 
+            if assignee_id: 
+                user = User.query.get(int(assignee_id)) 
+            else: 
+                user = User.query.filter_by(username=assignee_name).first() 
             if user: 
                 bug.assigned_to = user.id 
                 bug.updated_at = datetime.utcnow() 
@@ -235,8 +276,114 @@ def assign_bug(bug_id):
     return redirect(url_for('bugs.bug_detail', bug_id=bug_id)) 
 
 @bugs_bp.route('/api/bugs/<int:bug_id>', methods=['GET']) 
+@query_budget(3) 
 @login_required 
+@conditional_get('bug', 'bug_id') 
 def get_bug_json(bug_id): 
-    """获取缺陷JSON数据（用于API）"""
-    bug = Bug.query.get_or_404(bug_id) 
-    return jsonify(bug.to_dict())
\ No newline at end of file
+    """获取缺陷JSON数据（用于API），fields 参数指定返回的字段，如 fields=id,status,severity""" 
+    try: 
+        fields = projection.parse_fields('bug', request.args.get('fields')) 
+    except projection.FieldsetError as e: 
+        return jsonify({'error': str(e)}), 400 
+    
+    row = projection.project('bug', Bug.query.filter(Bug.id == bug_id), fields).first() 
+    if row is None: 
+        abort(404) 
+    return jsonify(projection.serialize(row, fields)) 
+
+@bugs_bp.route('/api/bugs', methods=['GET']) 
+@query_budget(3) 
+@login_required 
+def list_bugs_json(): 
+    """获取缺陷列表JSON数据（游标分页，筛选参数与列表页一致，fields 参数指定返回的字段）""" 
+    form = BugSearchForm(request.args) 
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100) 
+    try: 
+        fields = projection.parse_fields('bug', request.args.get('fields')) 
+    except projection.FieldsetError as e: 
+        return jsonify({'error': str(e)}), 400 
+    
+    query = _filtered_bug_query(form) 
+    bug_counts = stats_service.get_status_counts('bug') 
+    page = cached_keyset_paginate(projection.project('bug', query, fields), Bug, 'bug', _bug_list_key(form), 
+                                  cursor=request.args.get('cursor'), per_page=per_page, 
+                                  total=lambda: _filtered_bug_total(form, query, bug_counts)) 
+    
+    return jsonify({ 
+        'items': [projection.serialize(row, fields) for row in page.items], 
+        'pagination': page.to_dict() 
+    }) 
+
+@bugs_bp.route('/api/bugs/typeahead', methods=['GET']) 
+@query_budget(3) 
+@login_required 
+def bug_typeahead(): 
+    """API：按编号或标题前缀查找缺陷（输入联想）""" 
+    keyword = request.args.get('q', '').strip() 
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 20) 
+    
+    if not keyword: 
+        return jsonify({'items': []}) 
+    
+    columns = (Bug.id, Bug.title, Bug.status) 
+    rows = [] 
+    
+    # 输入编号时优先按主键精确匹配（只接受ASCII数字，过长的数字超出整数范围） 
+    record_id = keyword.lstrip('#') 
+    if record_id.isascii() and record_id.isdigit() and len(record_id) <= 19 and int(record_id) <= MAX_RECORD_ID: 
+        rows.extend(db.session.execute( 
+            db.select(*columns).where(Bug.id == int(record_id)) 
+        ).all()) 
+    
+    rows.extend(db.session.execute( 
+        db.select(*columns) 
+        .where(search_service.prefix_filter(Bug.title, keyword)) 
+        .order_by(Bug.title) 
+        .limit(limit) 
+    ).all()) 
+    
+    items = [] 
+    seen = set() 
+    for row in rows: 
+        if row.id not in seen: 
+            seen.add(row.id) 
+            items.append({'id': row.id, 'title': row.title, 'status': row.status}) 
+    
+    return jsonify({'items': items[:limit]}) 
+
+@bugs_bp.route('/api/users/typeahead', methods=['GET']) 
+@query_budget(2) 
+@login_required 
+def user_typeahead(): 
+    """API：按用户名前缀查找用户（缺陷分配的输入联想）""" 
+    keyword = request.args.get('q', '').strip() 
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 20) 
+    
+    if not keyword: 
+        return jsonify({'items': []}) 
+    
+    rows = db.session.execute( 
+        db.select(User.id, User.username) 
+        .where(search_service.prefix_filter(User.username, keyword)) 
+        .order_by(User.username) 
+        .limit(limit) 
+    ).all() 
+    
+    return jsonify({'items': [{'id': row.id, 'username': row.username} for row in rows]}) 
+
+@bugs_bp.route('/api/bugs/import', methods=['POST']) 
+@login_required 
+def import_bugs(): 
+    """批量导入缺陷（CSV/JSON/NDJSON，流式返回进度和每行错误）""" 
+    return import_service.import_response('bug', current_user.id)  
+
+@bugs_bp.route('/api/bugs/export') 
+@login_required 
+def export_bugs(): 
+    """流式导出缺陷（CSV/NDJSON，筛选参数与列表页一致）""" 
+    fmt = request.args.get('format', 'csv') 
+    if fmt not in export_service.EXPORT_FORMATS: 
+        return jsonify({'error': f'不支持的导出格式：{fmt}'}), 400 
+    
+    form = BugSearchForm(request.args) 
+    return export_service.export_response('bug', _filtered_bug_query(form), fmt) 
@@ -0,0 +1,118 @@
+import click
+from flask.cli import AppGroup
+from app import db, migrations
+from app.models import User
+from app.services import search_service, import_service, stats_service
+
+# 数据库迁移命令组
+db_cli = AppGroup('db', help='数据库迁移管理')
+
+
+@db_cli.command('upgrade')
+@click.option('--target', type=int, default=None, help='目标版本，默认升级到最新版本')
+def upgrade_database(target):
+    """执行尚未应用的迁移"""
+    applied = migrations.upgrade(db.engine, target)
+    for migration in applied:
+        click.echo(f'已升级到版本 {migration.version:03d}：{migration.description}')
+    if not applied:
+        click.echo('数据库已是最新版本')
+
+
+@db_cli.command('downgrade')
+@click.option('--target', type=int, required=True, help='目标版本，0 表示回退全部迁移')
+def downgrade_database(target):
+    """回退迁移到指定版本"""
+    for migration in migrations.downgrade(db.engine, target):
+        click.echo(f'已回退版本 {migration.version:03d}：{migration.description}')
+
+
+@db_cli.command('current')
+def current_database_version():
+    """显示当前数据库版本"""
+    with db.engine.begin() as connection:
+        click.echo(f'当前版本：{migrations.current_version(connection):03d}')
+
+
+@db_cli.command('history')
+def migration_history():
+    """列出所有迁移"""
+    with db.engine.begin() as connection:
+        current = migrations.current_version(connection)
+    for migration in migrations.discover():
+        mark = '*' if migration.version <= current else ' '
+        click.echo(f'{mark} {migration.version:03d} {migration.description}')
+
+
+# 全文检索索引管理命令组
+search_cli = AppGroup('search', help='全文检索索引管理')
+
+
+@search_cli.command('rebuild')
+@click.option('--entity', type=click.Choice(list(search_service.SEARCH_INDEXES)), multiple=True,
+              help='只重建指定实体的索引，默认全部重建')
+def rebuild_search_index(entity):
+    """根据现有数据重建全文检索索引"""
+    for name in entity or search_service.SEARCH_INDEXES:
+        total = search_service.rebuild_index(name)
+        click.echo(f'{name}: 已索引 {total} 条记录')
+
+
+# 状态计数器管理命令组
+stats_cli = AppGroup('stats', help='状态计数器（列表页统计卡片）管理')
+
+
+@stats_cli.command('reconcile')
+@click.option('--entity', type=click.Choice(list(stats_service.ENTITY_MODELS)), multiple=True,
+              help='只核对指定实体，默认全部核对')
+def reconcile_status_counts(entity):
+    """核对状态计数器与实际数据，不一致时重建"""
+    for name in entity or stats_service.ENTITY_MODELS:
+        drift = stats_service.reconcile_status_counts(name)
+        if not drift:
+            click.echo(f'{name}: 计数器与数据一致')
+            continue
+        details = '，'.join(f'{status} {stored} -> {actual}' for status, (stored, actual) in sorted(drift.items()))
+        click.echo(f'{name}: 已重建（{details}）')
+
+
+# 数据导入导出命令组
+data_cli = AppGroup('data', help='测试用例和缺陷的批量导入导出')
+
+
+@data_cli.command('import')
+@click.argument('entity', type=click.Choice(list(import_service.IMPORT_ENTITIES)))
+@click.argument('file', type=click.File('rb'))
+@click.option('--user', 'username', required=True, help='记录的创建人用户名')
+@click.option('--format', 'fmt', type=click.Choice(import_service.IMPORT_FORMATS), default=None,
+              help='文件格式，默认按扩展名判断')
+@click.option('--batch-size', type=int, default=500, show_default=True, help='每批写入的行数')
+def import_data(entity, file, username, fmt, batch_size):
+    """从 CSV/JSON/NDJSON 文件批量导入测试用例或缺陷"""
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        raise click.BadParameter(f'用户不存在：{username}', param_hint='--user')
+
+    def progress(report):
+        click.echo(f'已处理 {report.processed} 行，导入 {report.imported} 行，失败 {report.failed} 行', err=True)
+
+    try:
+        report = import_service.import_records(entity, file, fmt or import_service.detect_format(file.name),
+                                               user.id, batch_size=batch_size, progress=progress)
+    except import_service.ImportFileError as e:
+        raise click.ClickException(str(e))
+
+    for error in report.errors:
+        messages = '；'.join(f'{field}: {"，".join(items)}' for field, items in error['errors'].items())
+        click.echo(f'第 {error["row"]} 行：{messages}')
+    if report.failed > len(report.errors):
+        click.echo(f'另有 {report.failed - len(report.errors)} 行错误未列出')
+    click.echo(f'导入完成：共 {report.processed} 行，成功 {report.imported} 行，失败 {report.failed} 行')
+
+
+def register_commands(app):
+    """注册命令行工具"""
+    app.cli.add_command(db_cli)
+    app.cli.add_command(search_cli)
+    app.cli.add_command(stats_cli)
+    app.cli.add_command(data_cli)
@@ -0,0 +1,128 @@
+"""
+响应压缩
+
+按请求的 Accept-Encoding 协商使用 brotli（需安装 brotli 包）或 gzip 压缩HTML、JSON等文本响应。
+小于阈值的响应不压缩；流式响应（导出、导入进度）逐块压缩并刷新，不缓冲整个响应；
+text/event-stream 不压缩，避免事件被压缩缓冲延迟。
+"""
+import zlib
+from typing import Iterable, Iterator, Optional
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，未安装时只使用 gzip
+    brotli = None
+
+# 同等质量时优先使用的编码
+PREFERRED_ENCODINGS = ('br', 'gzip')
+
+def available_encodings():
+    """当前环境支持的编码"""
+    return [encoding for encoding in PREFERRED_ENCODINGS if encoding != 'br' or brotli is not None]
+
+
+def choose_encoding(accept_encodings, encodings: Iterable[str]) -> Optional[str]:
+    """
+    按 Accept-Encoding 选择编码：质量值最高者优先，相同时按 encodings 的顺序
+
+    Returns:
+        客户端不接受任何可用编码时返回None
+    """
+    best, best_quality = None, 0
+    for encoding in encodings:
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class Compressor:
+    """gzip / brotli 增量压缩器的统一接口"""
+
+    def __init__(self, encoding: str, level: int):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=level)
+        else:
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == 'br':
+            return self._compressor.process(data)
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        """输出已压缩的数据，流可以继续写入"""
+        if self.encoding == 'br':
+            return self._compressor.flush()
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+def compress(data: bytes, encoding: str, level: int) -> bytes:
+    """一次性压缩完整的响应体"""
+    compressor = Compressor(encoding, level)
+    return compressor.compress(data) + compressor.finish()
+
+
+def compress_stream(chunks: Iterable, encoding: str, level: int) -> Iterator[bytes]:
+    """逐块压缩流式响应，每块之后刷新，保证客户端能及时收到已生成的数据"""
+    compressor = Compressor(encoding, level)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            if chunk:
+                yield compressor.compress(chunk) + compressor.flush()
+        yield compressor.finish()
+    finally:
+        # 客户端提前断开时关闭原始生成器，释放其持有的请求上下文和数据库游标
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def _compress_response(response):
+    """after_request：按需压缩响应（COMPRESS_* 配置见 app/config.py）"""
+    config = current_app.config
+
+    if not config['COMPRESS_ENABLED']:
+        return response
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return response
+    if response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return response
+    if response.mimetype not in config['COMPRESS_MIMETYPES']:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    streamed = response.is_streamed
+    if not streamed and (response.content_length or 0) < config['COMPRESS_MIN_SIZE']:
+        return response
+
+    encoding = choose_encoding(request.accept_encodings, available_encodings())
+    if encoding is None:
+        return response
+    level = config['COMPRESS_BR_LEVEL'] if encoding == 'br' else config['COMPRESS_LEVEL']
+
+    if streamed:
+        response.response = compress_stream(response.response, encoding, level)
+        response.headers.pop('Content-Length', None)
+    else:
+        response.set_data(compress(response.get_data(), encoding, level))
+
+    response.headers['Content-Encoding'] = encoding
+    # 压缩后的字节不同，强ETag降为弱ETag（条件请求按弱比较匹配）
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app) -> None:
+    """注册响应压缩"""
+    app.after_request(_compress_response)
@@ -0,0 +1,158 @@
+import os
+
+
+def env_int(name: str, default: int) -> int:
+    """读取整数类型的环境变量"""
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def env_bool(name: str, default: bool) -> bool:
+    """读取布尔类型的环境变量"""
+    value = os.environ.get(name)
+    if value in (None, ''):
+        return default
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+
+def normalize_uri(uri: str) -> str:
+    """部分托管平台提供的是 postgres:// 形式，SQLAlchemy 只识别 postgresql://"""
+    if uri and uri.startswith('postgres://'):
+        uri = 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+
+def database_uri() -> str:
+    """
+    数据库连接地址
+
+    优先使用 DATABASE_URL（可为 PostgreSQL/MySQL），未设置时使用本地SQLite文件。
+    """
+    return normalize_uri(os.environ.get('DATABASE_URL') or 'sqlite:///test_platform.db')
+
+
+def engine_options(uri: str, prefix: str = 'DB') -> dict:
+    """
+    数据库引擎连接池配置
+
+    SQLite内存数据库由 Flask-SQLAlchemy 使用单连接池，不做调整。
+
+    Args:
+        uri: 数据库连接地址
+        prefix: 环境变量前缀，只读连接池使用 DB_READ（未设置时沿用 DB_ 的配置）
+    """
+    if uri.startswith('sqlite') and (':memory:' in uri or uri in ('sqlite://', 'sqlite:///')):
+        return {}
+
+    def setting(name, default):
+        return env_int(f'{prefix}_{name}', env_int(f'DB_{name}', default))
+
+    options = {
+        'pool_size': setting('POOL_SIZE', 5),
+        'max_overflow': setting('MAX_OVERFLOW', 10),
+        'pool_timeout': setting('POOL_TIMEOUT', 30),
+        'pool_recycle': setting('POOL_RECYCLE', 1800),
+        'pool_pre_ping': env_bool('DB_POOL_PRE_PING', not uri.startswith('sqlite'))
+    }
+    if uri.startswith('sqlite'):
+        # SQLite驱动层的锁等待时间（秒），与 busy_timeout 保持一致
+        options['connect_args'] = {'timeout': env_int('SQLITE_BUSY_TIMEOUT_MS', 5000) / 1000}
+    return options
+
+
+class Config:
+    """应用配置，均可通过环境变量覆盖"""
+    SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-key-for-testing-change-in-production'
+
+    # CSRF检查由 token_service.init_api_tokens 注册的钩子执行，携带有效API令牌的请求跳过检查
+    WTF_CSRF_CHECK_DEFAULT = False
+    # API令牌哈希的密钥，默认使用 SECRET_KEY（更换后已发放的令牌全部失效）
+    API_TOKEN_HASH_KEY = os.environ.get('API_TOKEN_HASH_KEY')
+
+    # 数据库
+    SQLALCHEMY_DATABASE_URI = database_uri()
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # 只读连接：配置了 DATABASE_READ_URL（只读副本）时使用该地址，
+    # 否则SQLite文件数据库以 mode=ro 方式打开同一文件（依赖WAL实现读写互不阻塞）
+    SQLALCHEMY_READ_DATABASE_URI = normalize_uri(os.environ.get('DATABASE_READ_URL'))
+    DATABASE_READ_ROUTING = env_bool('DATABASE_READ_ROUTING', bool(SQLALCHEMY_READ_DATABASE_URI))
+    # 写请求之后的这段时间内，同一会话的读请求仍走主库（读己之写）
+    DATABASE_READ_AFTER_WRITE_SECONDS = env_int('DATABASE_READ_AFTER_WRITE_SECONDS', 5)
+
+    # SQLite连接参数：每个新连接建立时执行
+    SQLITE_PRAGMAS = {
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'busy_timeout': env_int('SQLITE_BUSY_TIMEOUT_MS', 5000),
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'cache_size': -env_int('SQLITE_CACHE_SIZE_KB', 20000),  # 负数表示以KB为单位
+        'mmap_size': env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024),
+        'temp_store': 'MEMORY'
+    }
+
+    # 响应压缩：按 Accept-Encoding 使用 br（已安装 brotli 时）或 gzip，小于阈值（字节）的响应不压缩
+    COMPRESS_ENABLED = env_bool('COMPRESS_ENABLED', True)
+    COMPRESS_MIN_SIZE = env_int('COMPRESS_MIN_SIZE', 500)
+    COMPRESS_LEVEL = env_int('COMPRESS_LEVEL', 6)  # gzip 1-9
+    COMPRESS_BR_LEVEL = env_int('COMPRESS_BR_LEVEL', 4)  # brotli 0-11
+    COMPRESS_MIMETYPES = (
+        'text/html', 'text/css', 'text/plain', 'text/csv', 'text/xml', 'text/javascript',
+        'application/json', 'application/x-ndjson', 'application/javascript', 'application/xml'
+    )
+
+    # 缓存：memory 为进程内LRU，sqlite 为多个工作进程共享的缓存文件（默认 instance/cache.db），null 不缓存
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'sqlite')
+    CACHE_SQLITE_PATH = os.environ.get('CACHE_SQLITE_PATH')
+    CACHE_DEFAULT_TTL = env_int('CACHE_DEFAULT_TTL', 300)
+    CACHE_MAX_ENTRIES = env_int('CACHE_MAX_ENTRIES', 10000)
+
+    # 当前用户身份缓存（每个工作进程各自持有），用户修改后失效
+    USER_CACHE_TTL = env_int('USER_CACHE_TTL', 60)
+    USER_CACHE_MAX_ENTRIES = env_int('USER_CACHE_MAX_ENTRIES', 10000)
+
+    # 密码哈希：scrypt（默认）、pbkdf2 或 argon2（需安装 argon2-cffi），登录时把旧哈希升级为当前配置
+    PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'scrypt')
+    PASSWORD_SCRYPT_N = env_int('PASSWORD_SCRYPT_N', 2 ** 15)
+    PASSWORD_SCRYPT_R = env_int('PASSWORD_SCRYPT_R', 8)
+    PASSWORD_SCRYPT_P = env_int('PASSWORD_SCRYPT_P', 1)
+    PASSWORD_PBKDF2_ITERATIONS = env_int('PASSWORD_PBKDF2_ITERATIONS', 600000)
+    PASSWORD_ARGON2_TIME_COST = env_int('PASSWORD_ARGON2_TIME_COST', 3)
+    PASSWORD_ARGON2_MEMORY_COST = env_int('PASSWORD_ARGON2_MEMORY_COST', 65536)  # KiB
+    PASSWORD_ARGON2_PARALLELISM = env_int('PASSWORD_ARGON2_PARALLELISM', 4)
+    # 每个工作进程同时计算哈希的线程数、允许等待的请求数和等待超时（秒）
+    PASSWORD_HASH_WORKERS = env_int('PASSWORD_HASH_WORKERS', 2)
+    PASSWORD_HASH_QUEUE = env_int('PASSWORD_HASH_QUEUE', 16)
+    PASSWORD_HASH_TIMEOUT = env_int('PASSWORD_HASH_TIMEOUT', 10)
+
+    # AI配置：每个工作进程缓存当前配置，每隔 AI_CONFIG_CHECK_INTERVAL 秒检查版本戳，
+    # 快照超过 AI_CONFIG_MAX_AGE 秒时强制重新加载
+    AI_CONFIG_CHECK_INTERVAL = env_int('AI_CONFIG_CHECK_INTERVAL', 5)
+    AI_CONFIG_MAX_AGE = env_int('AI_CONFIG_MAX_AGE', 300)
+
+    # AI响应缓存：相同请求参数的结果保存在数据库中（所有工作进程共享），过期时间（秒）和条目上限
+    AI_RESPONSE_CACHE_ENABLED = env_bool('AI_RESPONSE_CACHE_ENABLED', True)
+    AI_RESPONSE_CACHE_TTL = env_int('AI_RESPONSE_CACHE_TTL', 7 * 24 * 3600)
+    AI_RESPONSE_CACHE_MAX_ENTRIES = env_int('AI_RESPONSE_CACHE_MAX_ENTRIES', 5000)
+
+    # AI任务：每个工作进程执行AI任务的线程数（0表示在请求中同步执行）、允许排队的任务数，
+    # 未完成任务视为失败的超时秒数，已完成任务的保留秒数
+    AI_JOB_WORKERS = env_int('AI_JOB_WORKERS', 4)
+    AI_JOB_QUEUE = env_int('AI_JOB_QUEUE', 32)
+    AI_JOB_STALE_SECONDS = env_int('AI_JOB_STALE_SECONDS', 600)
+    AI_JOB_RETENTION = env_int('AI_JOB_RETENTION', 24 * 3600)
+
+    # AI流式输出：每个工作进程同时进行的流式请求数（每个请求在生成期间占用一个请求线程）
+    AI_STREAM_MAX_CONCURRENT = env_int('AI_STREAM_MAX_CONCURRENT', 4)
+
+    # AI服务客户端：每个工作进程按服务商和密钥复用客户端及其HTTP连接池（保持连接，避免每次调用重新握手）
+    AI_BASE_URL = os.environ.get('AI_BASE_URL')  # 覆盖服务商的默认地址（如代理或自建兼容服务）
+    AI_HTTP_MAX_CONNECTIONS = env_int('AI_HTTP_MAX_CONNECTIONS', 20)
+    AI_HTTP_MAX_KEEPALIVE = env_int('AI_HTTP_MAX_KEEPALIVE', 10)
+    AI_HTTP_KEEPALIVE_EXPIRY = env_int('AI_HTTP_KEEPALIVE_EXPIRY', 60)  # 空闲连接保留秒数
+    AI_HTTP_CONNECT_TIMEOUT = env_int('AI_HTTP_CONNECT_TIMEOUT', 5)
+    AI_HTTP_READ_TIMEOUT = env_int('AI_HTTP_READ_TIMEOUT', 60)
+    AI_HTTP_POOL_TIMEOUT = env_int('AI_HTTP_POOL_TIMEOUT', 10)  # 连接池已满时等待空闲连接的秒数
+    AI_HTTP_CA_BUNDLE = os.environ.get('AI_HTTP_CA_BUNDLE')  # 自签名或内部CA签发证书的服务使用的CA文件
+    AI_HTTP_MAX_RETRIES = env_int('AI_HTTP_MAX_RETRIES', 2)  # SDK对连接错误、429和5xx的重试次数
+    AI_CLIENT_MAX_ENTRIES = env_int('AI_CLIENT_MAX_ENTRIES', 4)  # 同时保留的客户端数（不同服务商或密钥）
@@ -0,0 +1,185 @@
+"""数据库引擎调优与读写分离"""
+import os
+import time
+from typing import Mapping, Optional
+from flask import current_app, g, has_request_context, request, request_started, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+
+# 只读引擎保存在 app.extensions 中的键名
+READ_ENGINE_KEY = 'sqlalchemy_read_engine'
+
+# 会话中记录"在此时间之前读请求走主库"的键名
+PRIMARY_UNTIL_KEY = '_db_primary_until'
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# 只读连接上不执行的参数：journal_mode 需要写权限，synchronous 只影响写入
+_WRITE_ONLY_PRAGMAS = ('journal_mode', 'synchronous')
+
+
+def is_memory_database(engine) -> bool:
+    """是否为SQLite内存数据库"""
+    return engine.url.database in (None, '', ':memory:')
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas: Mapping[str, object]) -> None:
+    """
+    在原始DBAPI连接上执行 PRAGMA 设置
+
+    journal_mode 等设置需要在事务之外执行，因此直接使用驱动游标而不经过SQLAlchemy事务。
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+
+def configure_sqlite_engine(engine, pragmas: Mapping[str, object]) -> None:
+    """
+    为SQLite引擎注册连接事件，每个新建连接都会应用 pragmas
+
+    内存数据库不支持WAL，跳过 journal_mode 和 mmap_size。
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+
+    pragmas = dict(pragmas)
+    if is_memory_database(engine):
+        pragmas.pop('journal_mode', None)
+        pragmas.pop('mmap_size', None)
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, pragmas)
+
+
+def lock_for_write(connection, rows=None) -> None:
+    """
+    在当前事务中先取得写锁，之后读取的、据以计算写入内容的数据在提交前不会被并发事务修改
+
+    SQLite 整个数据库只有一个写锁：事务尚未开始时以 BEGIN IMMEDIATE 开始（pysqlite 不为 SELECT
+    开启事务；事务已开始说明已执行过写语句，已持有写锁）。其他数据库以 SELECT ... FOR UPDATE
+    锁定 rows 查询到的行。
+
+    Args:
+        connection: 当前事务所用的数据库连接
+        rows: 要锁定的行的查询，如 select(table.c.id).where(...)
+    """
+    if connection.dialect.name == 'sqlite':
+        if not connection.connection.dbapi_connection.in_transaction:
+            connection.exec_driver_sql('BEGIN IMMEDIATE')
+        return
+    if rows is not None:
+        connection.execute(rows.with_for_update())
+
+
+def sqlite_read_only_uri(engine) -> Optional[str]:
+    """根据SQLite文件数据库引擎生成以 mode=ro 打开同一文件的连接地址"""
+    if engine.dialect.name != 'sqlite' or is_memory_database(engine):
+        return None
+    path = os.path.abspath(engine.url.database)
+    return f'sqlite:///file:{path}?mode=ro&uri=true'
+
+
+def init_read_engine(app, db) -> None:
+    """
+    按配置创建只读引擎
+
+    未开启 DATABASE_READ_ROUTING，或既没有只读副本地址、主库也不是SQLite文件时，
+    所有查询仍使用主库。
+    """
+    old_engine = app.extensions.pop(READ_ENGINE_KEY, None)
+    if old_engine is not None:
+        old_engine.dispose()
+    if not app.config.get('DATABASE_READ_ROUTING'):
+        return
+
+    from app.config import engine_options
+
+    with app.app_context():
+        uri = app.config.get('SQLALCHEMY_READ_DATABASE_URI') or sqlite_read_only_uri(db.engine)
+    if not uri:
+        return
+
+    engine = create_engine(uri, **engine_options(uri, prefix='DB_READ'))
+    pragmas = {name: value for name, value in app.config.get('SQLITE_PRAGMAS', {}).items()
+               if name not in _WRITE_ONLY_PRAGMAS}
+    configure_sqlite_engine(engine, pragmas)
+    app.extensions[READ_ENGINE_KEY] = engine
+
+
+def init_engines(app, db) -> None:
+    """为应用的所有数据库引擎应用调优配置"""
+    with app.app_context():
+        for engine in db.engines.values():
+            configure_sqlite_engine(engine, app.config.get('SQLITE_PRAGMAS', {}))
+    init_read_engine(app, db)
+
+    request_started.connect(_route_request, app)
+    app.after_request(_remember_write)
+
+
+def _route_request(sender, **extra):
+    """
+    请求开始时决定本次请求的读查询是否走只读引擎
+
+    只有读方法的请求才会路由，且同一会话刚执行过写请求时仍走主库，保证读己之写。
+    """
+    g.pop('db_pinned_primary', None)
+    g.db_read_only = (
+        READ_ENGINE_KEY in sender.extensions
+        and request.method in READ_METHODS
+        and session.get(PRIMARY_UNTIL_KEY, 0) <= time.time()
+    )
+
+
+def _remember_write(response):
+    """写请求结束后，在会话中记录读己之写的截止时间"""
+    if READ_ENGINE_KEY in current_app.extensions and request.method not in READ_METHODS:
+        window = current_app.config.get('DATABASE_READ_AFTER_WRITE_SECONDS', 0)
+        if window > 0:
+            session[PRIMARY_UNTIL_KEY] = time.time() + window
+    return response
+
+
+class RoutingSession(Session):
+    """
+    读写分离的会话
+
+    读请求中的 SELECT 语句发送到只读引擎；刷新、显式获取连接、锁定读取等写操作
+    使用主库，并且一旦在当前事务中使用过主库，后续查询也留在主库，避免读不到
+    本事务尚未提交的修改。
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or engine is not self._db.engines.get(None):
+            return engine
+
+        read_engine = self._read_engine(clause)
+        if read_engine is not None:
+            return read_engine
+
+        if has_request_context():
+            g.db_pinned_primary = True
+        return engine
+
+    def _read_engine(self, clause):
+        """当前语句可以使用的只读引擎，不可用时返回None"""
+        if self._flushing or not has_request_context():
+            return None
+        if not g.get('db_read_only') or g.get('db_pinned_primary'):
+            return None
+        if not getattr(clause, 'is_select', False) or getattr(clause, '_for_update_arg', None) is not None:
+            return None
+        return current_app.extensions.get(READ_ENGINE_KEY)
+
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def _unpin_primary(session, transaction):
+    """顶层事务结束后，下一个事务重新开始路由"""
+    if transaction.parent is None and has_request_context():
+        g.pop('db_pinned_primary', None)
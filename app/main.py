@@ -1,4 +1,9 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, request, jsonify
+from flask_login import login_required
+from app.services import search_service
+from app.services.identity import get_identity_cache
+from app.services.ai_clients import get_registry
+from app.services import ai_response_cache
 
 main_bp = Blueprint('main', __name__)
 
@@ -6,3 +11,29 @@ main_bp = Blueprint('main', __name__)
 def index():
     """首页"""
     return render_template('index.html', title='智能测试平台')
+
+@main_bp.route('/api/search')
+@login_required
+def api_search():
+    """API：全文检索缺陷或测试用例，按相关度排序"""
+    keyword = request.args.get('q', '').strip()
+    entity = request.args.get('type', 'bug')
+    limit = min(request.args.get('limit', 20, type=int), 100)
+    
+    if entity not in search_service.SEARCH_INDEXES:
+        return jsonify({'error': '不支持的检索类型'}), 400
+    
+    if not keyword:
+        return jsonify({'error': '缺少检索关键词'}), 400
+    
+    return jsonify({'results': search_service.search(entity, keyword, limit=limit)})
+
+@main_bp.route('/api/metrics')
+@login_required
+def api_metrics():
+    """API：本工作进程的缓存命中统计和AI客户端数"""
+    return jsonify({
+        'user_loader': get_identity_cache().stats(),
+        'ai_clients': get_registry().stats(),
+        'ai_response_cache': ai_response_cache.get_stats().to_dict()
+    })
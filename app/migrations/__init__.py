@@ -0,0 +1,118 @@
+"""
+数据库迁移
+
+迁移脚本位于 versions 目录，文件名形如 v001_initial.py，版本号取自文件名。
+每个脚本提供 upgrade(connection) 和 downgrade(connection) 两个函数，
+已执行的版本记录在 schema_version 表中。
+每次执行升级或回退后都会更换共享缓存的全部代号（见 app.services.cache），
+在应用之外恢复的数据库执行一次升级即可不再读到旧缓存。
+
+迁移操作（见 ops 模块）都是幂等的：对于升级前由 db.create_all() 创建的旧数据库，
+已存在的表和索引会被跳过，缺失的部分会被补齐。
+"""
+import importlib
+import pkgutil
+import re
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select, insert, delete, func
+from app.services import cache
+
+# 迁移版本记录表（独立于业务模型的元数据）
+_metadata = MetaData()
+schema_version = Table(
+    'schema_version', _metadata,
+    Column('version', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('applied_at', DateTime, nullable=False)
+)
+
+_VERSION_PATTERN = re.compile(r'^v(\d+)_(\w+)$')
+
+
+class Migration(NamedTuple):
+    """迁移脚本"""
+    version: int
+    name: str
+    module: object
+
+    @property
+    def description(self) -> str:
+        return (self.module.__doc__ or self.name).strip().splitlines()[0]
+
+
+def discover() -> List[Migration]:
+    """按版本号顺序列出所有迁移脚本"""
+    from app.migrations import versions
+
+    migrations = []
+    for info in pkgutil.iter_modules(versions.__path__):
+        match = _VERSION_PATTERN.match(info.name)
+        if match:
+            module = importlib.import_module(f'{versions.__name__}.{info.name}')
+            migrations.append(Migration(int(match.group(1)), match.group(2), module))
+    return sorted(migrations, key=lambda m: m.version)
+
+
+def current_version(connection) -> int:
+    """当前数据库已执行到的迁移版本，未执行过迁移时为0"""
+    schema_version.create(connection, checkfirst=True)
+    return connection.execute(select(func.coalesce(func.max(schema_version.c.version), 0))).scalar()
+
+
+def upgrade(engine, target: Optional[int] = None) -> List[Migration]:
+    """
+    升级数据库到指定版本
+
+    每个迁移在独立事务中执行，并在同一事务中记录版本号。
+
+    Args:
+        engine: 数据库引擎
+        target: 目标版本，默认为最新版本
+
+    Returns:
+        本次执行的迁移列表
+    """
+    with engine.begin() as connection:
+        current = current_version(connection)
+
+    applied = []
+    for migration in discover():
+        if migration.version <= current or (target is not None and migration.version > target):
+            continue
+        with engine.begin() as connection:
+            migration.module.upgrade(connection)
+            connection.execute(insert(schema_version).values(
+                version=migration.version,
+                name=migration.name,
+                applied_at=datetime.utcnow()
+            ))
+        applied.append(migration)
+    cache.bump_all()
+    return applied
+
+
+def downgrade(engine, target: int) -> List[Migration]:
+    """
+    回退数据库到指定版本
+
+    Args:
+        engine: 数据库引擎
+        target: 目标版本，0 表示回退全部迁移
+
+    Returns:
+        本次回退的迁移列表
+    """
+    with engine.begin() as connection:
+        current = current_version(connection)
+
+    reverted = []
+    for migration in reversed(discover()):
+        if migration.version > current or migration.version <= target:
+            continue
+        with engine.begin() as connection:
+            migration.module.downgrade(connection)
+            connection.execute(delete(schema_version).where(schema_version.c.version == migration.version))
+        reverted.append(migration)
+    cache.bump_all()
+    return reverted
@@ -0,0 +1,88 @@
+"""
+幂等的迁移操作
+
+迁移脚本在自己的 MetaData 中定义该版本的表、字段和索引，不引用 db.metadata，
+模型之后的修改不会改变已有版本的结构。
+"""
+from sqlalchemy import Column, Index, Integer, MetaData, Table, inspect
+from sqlalchemy.schema import CreateTable
+
+
+def has_table(connection, table_name: str) -> bool:
+    """检查表是否存在"""
+    return inspect(connection).has_table(table_name)
+
+
+def has_index(connection, table_name: str, index_name: str) -> bool:
+    """检查索引是否存在"""
+    if not has_table(connection, table_name):
+        return False
+    return any(ix['name'] == index_name for ix in inspect(connection).get_indexes(table_name))
+
+
+def has_column(connection, table_name: str, column_name: str) -> bool:
+    """检查字段是否存在"""
+    return any(col['name'] == column_name for col in inspect(connection).get_columns(table_name))
+
+
+def reference_tables(metadata: MetaData, *table_names: str) -> None:
+    """在迁移的元数据中声明外键引用的已有表（只含 id 主键，仅用于生成外键约束，不会被创建）"""
+    for name in table_names:
+        if name not in metadata.tables:
+            Table(name, metadata, Column('id', Integer, primary_key=True))
+
+
+def index(table_name: str, index_name: str, *column_names: str, unique: bool = False) -> Index:
+    """按表名和字段名定义已有表上的索引"""
+    table = Table(table_name, MetaData(), *(Column(name) for name in column_names))
+    return Index(index_name, *(table.c[name] for name in column_names), unique=unique)
+
+
+def create_table(connection, table: Table, indexes: bool = True) -> None:
+    """
+    创建表，已存在时跳过
+
+    Args:
+        connection: 数据库连接
+        table: 表定义
+        indexes: 是否同时创建表上声明的索引（由后续迁移单独创建索引时传False）
+    """
+    if not has_table(connection, table.name):
+        connection.execute(CreateTable(table))
+    if indexes:
+        for index in table.indexes:
+            create_index(connection, index)
+
+
+def drop_table(connection, table: Table) -> None:
+    """删除表，不存在时跳过"""
+    table.drop(connection, checkfirst=True)
+
+
+def create_index(connection, index: Index) -> None:
+    """创建索引，已存在时跳过"""
+    if not has_index(connection, index.table.name, index.name):
+        index.create(connection)
+
+
+def drop_index(connection, index: Index) -> None:
+    """删除索引，不存在时跳过"""
+    if has_index(connection, index.table.name, index.name):
+        index.drop(connection)
+
+
+def add_column(connection, table_name: str, column: Column) -> None:
+    """为已有表添加字段，已存在时跳过"""
+    if has_column(connection, table_name, column.name):
+        return
+    column_type = column.type.compile(dialect=connection.dialect)
+    ddl = f'ALTER TABLE {table_name} ADD COLUMN {column.name} {column_type}'
+    if column.server_default is not None:
+        ddl += f' DEFAULT {column.server_default.arg}'
+    connection.exec_driver_sql(ddl)
+
+
+def drop_column(connection, table_name: str, column_name: str) -> None:
+    """删除字段，不存在时跳过"""
+    if has_column(connection, table_name, column_name):
+        connection.exec_driver_sql(f'ALTER TABLE {table_name} DROP COLUMN {column_name}')
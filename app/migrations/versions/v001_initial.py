@@ -0,0 +1,87 @@
+"""初始数据表：用户、缺陷、测试用例、关联表、AI配置、状态计数器"""
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, MetaData, String, Table, Text
+from app.migrations import ops
+
+metadata = MetaData()
+
+user = Table(
+    'user', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('username', String(100), nullable=False, unique=True),
+    Column('email', String(100), nullable=False, unique=True),
+    Column('password_hash', String(200), nullable=False),
+    Column('created_at', DateTime)
+)
+
+bug = Table(
+    'bug', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('title', String(200), nullable=False),
+    Column('description', Text, nullable=False),
+    Column('status', String(20)),
+    Column('severity', String(20)),
+    Column('priority', String(10)),
+    Column('bug_type', String(30)),
+    Column('environment', String(20)),
+    Column('reproduction_steps', Text),
+    Column('expected_result', Text),
+    Column('actual_result', Text),
+    Column('ai_suggested_title', String(200)),
+    Column('ai_suggested_category', String(30)),
+    Column('created_by', Integer, ForeignKey('user.id'), nullable=False),
+    Column('assigned_to', Integer, ForeignKey('user.id')),
+    Column('created_at', DateTime),
+    Column('updated_at', DateTime),
+    Column('closed_at', DateTime)
+)
+
+test_case = Table(
+    'test_case', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('title', String(200), nullable=False),
+    Column('description', Text, nullable=False),
+    Column('steps', Text, nullable=False),
+    Column('expected_result', Text, nullable=False),
+    Column('status', String(20)),
+    Column('priority', String(10)),
+    Column('test_type', String(30)),
+    Column('module', String(50)),
+    Column('preconditions', Text),
+    Column('created_by', Integer, ForeignKey('user.id'), nullable=False),
+    Column('created_at', DateTime),
+    Column('updated_at', DateTime)
+)
+
+bug_testcase_association = Table(
+    'bug_testcase_association', metadata,
+    Column('bug_id', Integer, ForeignKey('bug.id'), primary_key=True),
+    Column('testcase_id', Integer, ForeignKey('test_case.id'), primary_key=True)
+)
+
+ai_config = Table(
+    'ai_config', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('provider', String(20)),
+    Column('api_key', String(200)),
+    Column('ai_enabled', Boolean),
+    Column('updated_at', DateTime)
+)
+
+status_counter = Table(
+    'status_counter', metadata,
+    Column('entity', String(30), primary_key=True),
+    Column('status', String(20), primary_key=True),
+    Column('count', Integer, nullable=False)
+)
+
+TABLES = [user, bug, test_case, bug_testcase_association, ai_config, status_counter]
+
+
+def upgrade(connection):
+    for table in TABLES:
+        ops.create_table(connection, table)
+
+
+def downgrade(connection):
+    for table in reversed(TABLES):
+        ops.drop_table(connection, table)
@@ -0,0 +1,12 @@
+"""全文检索索引表（FTS5），并为已有数据建立索引"""
+from app.services import search_service
+
+
+def upgrade(connection):
+    if search_service.create_search_tables(connection):
+        for entity in search_service.SEARCH_INDEXES:
+            search_service.populate_index(connection, entity)
+
+
+def downgrade(connection):
+    search_service.drop_search_tables(connection)
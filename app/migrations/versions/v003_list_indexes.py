@@ -0,0 +1,26 @@
+"""列表页筛选与游标分页使用的二级索引"""
+from app.migrations import ops
+
+INDEXES = [
+    ops.index('bug', 'ix_bug_created_at_id', 'created_at', 'id'),
+    ops.index('bug', 'ix_bug_status_created_at_id', 'status', 'created_at', 'id'),
+    ops.index('bug', 'ix_bug_severity_created_at_id', 'severity', 'created_at', 'id'),
+    ops.index('bug', 'ix_bug_assigned_to', 'assigned_to'),
+    ops.index('bug', 'ix_bug_created_by', 'created_by'),
+    ops.index('test_case', 'ix_test_case_created_at_id', 'created_at', 'id'),
+    ops.index('test_case', 'ix_test_case_status_created_at_id', 'status', 'created_at', 'id'),
+    ops.index('test_case', 'ix_test_case_test_type_created_at_id', 'test_type', 'created_at', 'id'),
+    ops.index('test_case', 'ix_test_case_module', 'module'),
+    ops.index('test_case', 'ix_test_case_created_by', 'created_by'),
+    ops.index('bug_testcase_association', 'ix_bug_testcase_association_testcase_id', 'testcase_id', 'bug_id')
+]
+
+
+def upgrade(connection):
+    for index in INDEXES:
+        ops.create_index(connection, index)
+
+
+def downgrade(connection):
+    for index in reversed(INDEXES):
+        ops.drop_index(connection, index)
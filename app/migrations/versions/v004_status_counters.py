@@ -0,0 +1,11 @@
+"""根据已有数据初始化状态计数器"""
+from app.services import stats_service
+
+
+def upgrade(connection):
+    for entity in stats_service.ENTITY_MODELS:
+        stats_service.initialize_status_counts(connection, entity)
+
+
+def downgrade(connection):
+    stats_service.invalidate_status_counts(connection, stats_service.ENTITY_MODELS)
@@ -0,0 +1,12 @@
+"""缺陷标题索引，用于输入联想的前缀查找"""
+from app.migrations import ops
+
+TITLE_INDEX = ops.index('bug', 'ix_bug_title', 'title')
+
+
+def upgrade(connection):
+    ops.create_index(connection, TITLE_INDEX)
+
+
+def downgrade(connection):
+    ops.drop_index(connection, TITLE_INDEX)
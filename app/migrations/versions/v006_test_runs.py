@@ -0,0 +1,54 @@
+"""测试执行轮次与执行结果表，测试用例最近执行时间字段"""
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Index, Integer, MetaData, String, Table, Text
+from app.migrations import ops
+
+metadata = MetaData()
+ops.reference_tables(metadata, 'user', 'test_case')
+
+test_run = Table(
+    'test_run', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(200), nullable=False),
+    Column('description', Text),
+    Column('status', String(20)),
+    Column('environment', String(20)),
+    Column('total_count', Integer, nullable=False),
+    Column('passed_count', Integer, nullable=False),
+    Column('failed_count', Integer, nullable=False),
+    Column('blocked_count', Integer, nullable=False),
+    Column('duration_ms', BigInteger, nullable=False),
+    Column('created_by', Integer, ForeignKey('user.id'), nullable=False),
+    Column('started_at', DateTime),
+    Column('finished_at', DateTime),
+    Column('created_at', DateTime),
+    Column('updated_at', DateTime),
+    Index('ix_test_run_created_at_id', 'created_at', 'id')
+)
+
+test_result = Table(
+    'test_result', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('run_id', Integer, ForeignKey('test_run.id'), nullable=False),
+    Column('test_case_id', Integer, ForeignKey('test_case.id'), nullable=False),
+    Column('status', String(20), nullable=False),
+    Column('duration_ms', Integer, nullable=False),
+    Column('comment', Text),
+    Column('executed_by', Integer, ForeignKey('user.id')),
+    Column('executed_at', DateTime),
+    Index('ix_test_result_run_id_test_case_id', 'run_id', 'test_case_id', 'id'),
+    Index('ix_test_result_test_case_id_id', 'test_case_id', 'id')
+)
+
+TABLES = [test_run, test_result]
+
+
+def upgrade(connection):
+    ops.add_column(connection, 'test_case', Column('last_executed_at', DateTime))
+    for table in TABLES:
+        ops.create_table(connection, table)
+
+
+def downgrade(connection):
+    for table in reversed(TABLES):
+        ops.drop_table(connection, table)
+    ops.drop_column(connection, 'test_case', 'last_executed_at')
@@ -0,0 +1,26 @@
+"""个人API令牌表"""
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, MetaData, String, Table
+from app.migrations import ops
+
+metadata = MetaData()
+ops.reference_tables(metadata, 'user')
+
+api_token = Table(
+    'api_token', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, ForeignKey('user.id'), nullable=False, index=True),
+    Column('name', String(100), nullable=False),
+    Column('token_hash', String(64), nullable=False, unique=True),
+    Column('prefix', String(12), nullable=False),
+    Column('expires_at', DateTime),
+    Column('revoked_at', DateTime),
+    Column('created_at', DateTime)
+)
+
+
+def upgrade(connection):
+    ops.create_table(connection, api_token)
+
+
+def downgrade(connection):
+    ops.drop_table(connection, api_token)
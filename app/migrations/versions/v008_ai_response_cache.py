@@ -0,0 +1,25 @@
+"""AI响应缓存表"""
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, Text
+from app.migrations import ops
+
+metadata = MetaData()
+
+ai_response_cache = Table(
+    'ai_response_cache', metadata,
+    Column('key', String(64), primary_key=True),
+    Column('provider', String(20), nullable=False),
+    Column('model', String(50), nullable=False),
+    Column('response', Text, nullable=False),
+    Column('hit_count', Integer, nullable=False),
+    Column('created_at', DateTime),
+    Column('expires_at', DateTime, nullable=False, index=True),
+    Column('last_used_at', DateTime, nullable=False, index=True)
+)
+
+
+def upgrade(connection):
+    ops.create_table(connection, ai_response_cache)
+
+
+def downgrade(connection):
+    ops.drop_table(connection, ai_response_cache)
@@ -0,0 +1,28 @@
+"""AI任务表"""
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, MetaData, String, Table, Text
+from app.migrations import ops
+
+metadata = MetaData()
+ops.reference_tables(metadata, 'user')
+
+ai_job = Table(
+    'ai_job', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('kind', String(30), nullable=False),
+    Column('status', String(20), nullable=False),
+    Column('params', Text, nullable=False),
+    Column('result', Text),
+    Column('error', Text),
+    Column('created_by', Integer, ForeignKey('user.id'), nullable=False, index=True),
+    Column('created_at', DateTime, index=True),
+    Column('started_at', DateTime),
+    Column('finished_at', DateTime)
+)
+
+
+def upgrade(connection):
+    ops.create_table(connection, ai_job)
+
+
+def downgrade(connection):
+    ops.drop_table(connection, ai_job)
@@ -0,0 +1,13 @@
+"""全文检索索引补充中文单字词项，按现有数据重建索引"""
+from app.services import search_service
+
+
+def upgrade(connection):
+    if search_service.is_index_ready(connection):
+        for entity in search_service.SEARCH_INDEXES:
+            search_service.populate_index(connection, entity)
+
+
+def downgrade(connection):
+    # 多出的单字词项不影响二元组查询，保留现有索引
+    pass
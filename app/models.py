@@ -1,7 +1,8 @@
 from . import db
 from flask_login import UserMixin
+import json
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.services.passwords import hash_password, needs_rehash, verify_password
 
 class User(UserMixin, db.Model):
     """用户模型"""
@@ -15,12 +16,16 @@ class User(UserMixin, db.Model):
         return f'<User {self.username}>'
     
     def set_password(self, password):
-        """设置密码（加密存储）"""
-        self.password_hash = generate_password_hash(password)
+        """设置密码（按 PASSWORD_HASHER 配置的算法加密存储）"""
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
-        """验证密码"""
-        return check_password_hash(self.password_hash, password)
+        """验证密码（支持旧算法生成的哈希）"""
+        return verify_password(self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        """密码哈希的算法或成本是否与当前配置不同，需要在登录成功后重新计算"""
+        return needs_rehash(self.password_hash)
     
     def to_dict(self):
         """转换为字典，用于JSON响应"""
@@ -78,6 +83,16 @@ class Bug(db.Model):
     creator = db.relationship('User', foreign_keys=[created_by], backref=db.backref('created_bugs', lazy='dynamic'))
     assignee = db.relationship('User', foreign_keys=[assigned_to], backref=db.backref('assigned_bugs', lazy='dynamic'))
     
+    # 索引：与列表页的筛选条件和 (created_at, id) 倒序分页保持一致
+    __table_args__ = (
+        db.Index('ix_bug_created_at_id', 'created_at', 'id'),
+        db.Index('ix_bug_status_created_at_id', 'status', 'created_at', 'id'),
+        db.Index('ix_bug_severity_created_at_id', 'severity', 'created_at', 'id'),
+        db.Index('ix_bug_assigned_to', 'assigned_to'),
+        db.Index('ix_bug_created_by', 'created_by'),
+        db.Index('ix_bug_title', 'title'),
+    )
+    
     def __repr__(self):
         return f'<Bug {self.id}: {self.title}>'
     
@@ -134,7 +149,9 @@ class Bug(db.Model):
 # 缺陷和测试用例的多对多关联表
 bug_testcase_association = db.Table('bug_testcase_association',
     db.Column('bug_id', db.Integer, db.ForeignKey('bug.id'), primary_key=True),
-    db.Column('testcase_id', db.Integer, db.ForeignKey('test_case.id'), primary_key=True)
+    db.Column('testcase_id', db.Integer, db.ForeignKey('test_case.id'), primary_key=True),
+    # 主键 (bug_id, testcase_id) 之外的反向查询索引
+    db.Index('ix_bug_testcase_association_testcase_id', 'testcase_id', 'bug_id')
 )
 
 class TestCase(db.Model):
@@ -167,6 +184,9 @@ class TestCase(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # 最近一次执行时间（status 为最近一次执行结果，由测试执行记录冗余维护）
+    last_executed_at = db.Column(db.DateTime)
+    
     # 与缺陷的多对多关系（通过关联表）
     bugs = db.relationship('Bug',
                           secondary=bug_testcase_association,
@@ -176,6 +196,24 @@ class TestCase(db.Model):
     creator = db.relationship('User', foreign_keys=[created_by],
                                backref=db.backref('created_test_cases', lazy='dynamic'))
     
+    # 关联缺陷数量（聚合子查询，列表查询中通过 undefer 随主查询一次性加载）
+    linked_bug_count = db.column_property(
+        db.select(db.func.count(bug_testcase_association.c.bug_id))
+        .where(bug_testcase_association.c.testcase_id == id)
+        .correlate_except(bug_testcase_association)
+        .scalar_subquery(),
+        deferred=True
+    )
+    
+    # 索引：与列表页的筛选条件和 (created_at, id) 倒序分页保持一致
+    __table_args__ = (
+        db.Index('ix_test_case_created_at_id', 'created_at', 'id'),
+        db.Index('ix_test_case_status_created_at_id', 'status', 'created_at', 'id'),
+        db.Index('ix_test_case_test_type_created_at_id', 'test_type', 'created_at', 'id'),
+        db.Index('ix_test_case_module', 'module'),
+        db.Index('ix_test_case_created_by', 'created_by'),
+    )
+    
     def __repr__(self):
         return f'<TestCase {self.id}: {self.title}>'
     
@@ -195,8 +233,9 @@ class TestCase(db.Model):
             'created_by': self.created_by,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'last_executed_at': self.last_executed_at.isoformat() if self.last_executed_at else None,
             'creator_name': self.creator.username if self.creator else None,
-            'bug_count': len(self.bugs)
+            'bug_count': self.bug_count
         }
     
     def get_status_display(self):
@@ -231,8 +270,125 @@ class TestCase(db.Model):
     
     @property
     def bug_count(self):
-        """获取关联的缺陷数量"""
-        return len(self.bugs)
+        """获取关联的缺陷数量（不加载缺陷记录本身）"""
+        if self.id is None or 'bugs' in self.__dict__:
+            return len(self.bugs)
+        return self.linked_bug_count
+
+class TestRun(db.Model):
+    """测试执行轮次模型：汇总数据随执行结果的写入增量维护"""
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text)
+    
+    # 状态：running, completed, aborted
+    status = db.Column(db.String(20), default='running')
+    
+    # 环境：development, test, production
+    environment = db.Column(db.String(20), default='test')
+    
+    # 汇总数据：按每个用例在本轮中的最新结果统计
+    total_count = db.Column(db.Integer, nullable=False, default=0)
+    passed_count = db.Column(db.Integer, nullable=False, default=0)
+    failed_count = db.Column(db.Integer, nullable=False, default=0)
+    blocked_count = db.Column(db.Integer, nullable=False, default=0)
+    duration_ms = db.Column(db.BigInteger, nullable=False, default=0)
+    
+    # 关联字段
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    
+    # 时间戳
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # 关系
+    creator = db.relationship('User', foreign_keys=[created_by],
+                              backref=db.backref('created_test_runs', lazy='dynamic'))
+    results = db.relationship('TestResult', backref='run', lazy='dynamic')
+    
+    __table_args__ = (
+        db.Index('ix_test_run_created_at_id', 'created_at', 'id'),
+    )
+    
+    def __repr__(self):
+        return f'<TestRun {self.id}: {self.name}>'
+    
+    @property
+    def pass_rate(self):
+        """通过率（百分比），尚无结果时为None"""
+        if not self.total_count:
+            return None
+        return round(self.passed_count * 100.0 / self.total_count, 1)
+    
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'description': self.description,
+            'status': self.status,
+            'environment': self.environment,
+            'total_count': self.total_count,
+            'passed_count': self.passed_count,
+            'failed_count': self.failed_count,
+            'blocked_count': self.blocked_count,
+            'duration_ms': self.duration_ms,
+            'pass_rate': self.pass_rate,
+            'created_by': self.created_by,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+    
+    def get_status_display(self):
+        """获取状态的中文显示"""
+        status_map = {
+            'running': '执行中',
+            'completed': '已完成',
+            'aborted': '已中止'
+        }
+        return status_map.get(self.status, self.status)
+
+class TestResult(db.Model):
+    """测试执行结果模型：只追加写入，同一用例在一轮中重复执行时以最新结果为准"""
+    id = db.Column(db.Integer, primary_key=True)
+    run_id = db.Column(db.Integer, db.ForeignKey('test_run.id'), nullable=False)
+    test_case_id = db.Column(db.Integer, db.ForeignKey('test_case.id'), nullable=False)
+    
+    # 结果：passed, failed, blocked
+    status = db.Column(db.String(20), nullable=False)
+    
+    duration_ms = db.Column(db.Integer, nullable=False, default=0)
+    comment = db.Column(db.Text)
+    executed_by = db.Column(db.Integer, db.ForeignKey('user.id'))
+    executed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # 关系
+    test_case = db.relationship('TestCase', backref=db.backref('results', lazy='dynamic'))
+    
+    # 索引：按轮次分页读取结果、查找用例在本轮中的上一次结果、查看用例的执行历史
+    __table_args__ = (
+        db.Index('ix_test_result_run_id_test_case_id', 'run_id', 'test_case_id', 'id'),
+        db.Index('ix_test_result_test_case_id_id', 'test_case_id', 'id'),
+    )
+    
+    def __repr__(self):
+        return f'<TestResult run={self.run_id} case={self.test_case_id} {self.status}>'
+    
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'id': self.id,
+            'run_id': self.run_id,
+            'test_case_id': self.test_case_id,
+            'status': self.status,
+            'duration_ms': self.duration_ms,
+            'comment': self.comment,
+            'executed_by': self.executed_by,
+            'executed_at': self.executed_at.isoformat() if self.executed_at else None
+        }
 
 class AIConfig(db.Model):
     """AI配置模型"""
@@ -254,3 +410,101 @@ class AIConfig(db.Model):
             'ai_enabled': self.ai_enabled,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
+
+class StatusCounter(db.Model):
+    """状态计数器模型：按实体和状态保存的计数，由写路径增量维护"""
+    entity = db.Column(db.String(30), primary_key=True)  # 实体类型：bug, test_case
+    status = db.Column(db.String(20), primary_key=True)  # 状态值，_total 表示总数
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<StatusCounter {self.entity}.{self.status}={self.count}>'
+
+class ApiToken(db.Model):
+    """个人API令牌模型：只保存令牌的带密钥哈希，明文仅在创建时返回一次"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    name = db.Column(db.String(100), nullable=False)
+    token_hash = db.Column(db.String(64), nullable=False, unique=True)  # HMAC-SHA256，按此列查找
+    prefix = db.Column(db.String(12), nullable=False)  # 令牌开头几位，便于用户辨认
+    expires_at = db.Column(db.DateTime)
+    revoked_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # 关系
+    user = db.relationship('User', backref=db.backref('api_tokens', lazy='dynamic'))
+    
+    def __repr__(self):
+        return f'<ApiToken {self.id}: {self.name}>'
+    
+    def is_active(self, now=None):
+        """令牌是否可用（未撤销且未过期）"""
+        now = now or datetime.utcnow()
+        return self.revoked_at is None and (self.expires_at is None or self.expires_at > now)
+    
+    def to_dict(self):
+        """转换为字典（不包含令牌哈希）"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'prefix': self.prefix,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+            'revoked_at': self.revoked_at.isoformat() if self.revoked_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class AIResponseCache(db.Model):
+    """AI响应缓存模型：按请求参数的哈希保存解析后的AI结果"""
+    key = db.Column(db.String(64), primary_key=True)  # 服务商、模型、提示词和生成参数的SHA-256
+    provider = db.Column(db.String(20), nullable=False)
+    model = db.Column(db.String(50), nullable=False)
+    response = db.Column(db.Text, nullable=False)  # JSON
+    hit_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    last_used_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)  # LRU淘汰依据
+    
+    def __repr__(self):
+        return f'<AIResponseCache {self.key[:12]} {self.provider}/{self.model}>'
+
+class AIJob(db.Model):
+    """AI任务模型：AI请求在后台线程池中执行，状态和结果持久化供客户端轮询"""
+    id = db.Column(db.Integer, primary_key=True)
+    
+    # 任务类型：improve_bug, improve_test_case, classify_bug
+    kind = db.Column(db.String(30), nullable=False)
+    
+    # 状态：queued, running, succeeded, failed
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    
+    params = db.Column(db.Text, nullable=False)  # JSON，请求参数（不含API密钥）
+    result = db.Column(db.Text)  # JSON
+    error = db.Column(db.Text)
+    
+    # 关联字段
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    
+    # 时间戳
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<AIJob {self.id}: {self.kind} {self.status}>'
+    
+    @property
+    def finished(self):
+        return self.status in ('succeeded', 'failed')
+    
+    def to_dict(self):
+        """转换为字典（任务完成后包含结果或错误信息）"""
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'result': json.loads(self.result) if self.result else None,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
@@ -0,0 +1,156 @@
+"""
+AI服务客户端
+
+每个工作进程按（服务商、地址、密钥）缓存 openai.OpenAI 客户端，客户端持有保持连接的HTTP连接池，
+连续的AI调用复用已建立的TLS连接，不再每次请求新建客户端、重新握手。
+AI配置修改后密钥或服务商变化，自然得到新的客户端；保存配置时不再保留其余客户端。
+
+不再保留的客户端可能仍在被其他请求线程或AI任务线程使用，因此不立即关闭：
+注册表只是不再持有它，最后一个使用者释放后客户端被回收，连接池随之关闭。
+"""
+import atexit
+import hashlib
+import os
+import ssl
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Optional, Tuple
+import openai
+from flask import current_app, has_app_context
+
+try:
+    import httpx
+except ImportError:  # 新版 openai SDK 依赖 httpx2（接口与 httpx 相同）
+    import httpx2 as httpx
+
+# 客户端注册表保存在 app.extensions 中的键名
+REGISTRY_KEY = 'ai_clients'
+
+# 各服务商的默认地址（兼容OpenAI API规范）
+BASE_URLS = {
+    'deepseek': 'https://api.deepseek.com/v1',
+    'openai': 'https://api.openai.com/v1'
+}
+
+
+def base_url_for(provider: str, config=None) -> str:
+    """服务商的API地址，配置了 AI_BASE_URL 时以配置为准"""
+    override = config.get('AI_BASE_URL') if config else None
+    return override or BASE_URLS.get(provider, BASE_URLS['openai'])
+
+
+def create_client(provider: str, api_key: str, config) -> openai.OpenAI:
+    """按 AI_HTTP_* 配置创建带连接池的客户端"""
+    ca_bundle = config.get('AI_HTTP_CA_BUNDLE')
+    http_client = openai.DefaultHttpxClient(
+        verify=ssl.create_default_context(cafile=ca_bundle) if ca_bundle else True,
+        limits=httpx.Limits(max_connections=config['AI_HTTP_MAX_CONNECTIONS'],
+                            max_keepalive_connections=config['AI_HTTP_MAX_KEEPALIVE'],
+                            keepalive_expiry=config['AI_HTTP_KEEPALIVE_EXPIRY']),
+        timeout=httpx.Timeout(config['AI_HTTP_READ_TIMEOUT'], connect=config['AI_HTTP_CONNECT_TIMEOUT'],
+                              pool=config['AI_HTTP_POOL_TIMEOUT'])
+    )
+    client = openai.OpenAI(api_key=api_key, base_url=base_url_for(provider, config),
+                           max_retries=config['AI_HTTP_MAX_RETRIES'], http_client=http_client)
+    # 客户端被回收时关闭连接池（openai 不会关闭调用方传入的 http_client）
+    weakref.finalize(client, _close_in_owner, http_client, os.getpid())
+    return client
+
+
+def _close_in_owner(http_client, pid: int) -> None:
+    """只在创建连接池的进程中关闭，fork出的子进程不能关闭与父进程共用的连接"""
+    if os.getpid() == pid:
+        http_client.close()
+
+
+class AIClientRegistry:
+    """
+    按（服务商、地址、密钥）缓存的客户端，超过上限时不再保留最久未用的
+
+    客户端（httpx连接池）是线程安全的，同一进程的所有请求线程共用；
+    进程fork后连接不能继承，检测到进程号变化时丢弃全部客户端重新创建。
+    不再保留的客户端由仍在使用它的调用持有到调用结束，回收时关闭（见 create_client）。
+    """
+
+    def __init__(self, config, max_entries: int = 4):
+        self.config = config
+        self.max_entries = max_entries
+        self._clients = OrderedDict()
+        self._retired = weakref.WeakSet()  # 不再保留、但仍被调用持有的客户端
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self.created = 0
+
+    def _key(self, provider: str, api_key: str) -> Tuple[str, str, str]:
+        # 只保存密钥的摘要作为键
+        return provider, base_url_for(provider, self.config), hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+
+    def get(self, provider: str, api_key: str) -> openai.OpenAI:
+        """获取（必要时创建）客户端"""
+        key = self._key(provider, api_key)
+        with self._lock:
+            if self._pid != os.getpid():
+                self._clients.clear()
+                self._pid = os.getpid()
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                return client
+            client = self._clients[key] = create_client(provider, api_key, self.config)
+            self.created += 1
+            while len(self._clients) > self.max_entries:
+                self._retired.add(self._clients.popitem(last=False)[1])
+        return client
+
+    def retain_only(self, provider: str, api_key: Optional[str]) -> None:
+        """只保留当前配置的客户端（AI配置保存后调用），其余客户端在使用结束后回收"""
+        keep = self._key(provider, api_key) if api_key else None
+        with self._lock:
+            for key in [key for key in self._clients if key != keep]:
+                self._retired.add(self._clients.pop(key))
+
+    def close(self) -> None:
+        """立即关闭全部客户端（进程退出时调用，见 init_ai_clients）"""
+        with self._lock:
+            clients = list(self._clients.values()) + list(self._retired)
+            self._clients.clear()
+            self._retired.clear()
+            if self._pid != os.getpid():
+                # fork出的子进程只丢弃继承来的客户端，不关闭父进程的连接
+                return
+        for client in clients:
+            client.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'clients': len(self._clients), 'retired': len(self._retired), 'created': self.created}
+
+
+def init_ai_clients(app) -> None:
+    """创建客户端注册表并保存到 app.extensions（客户端在首次调用时才创建），进程退出时关闭全部客户端"""
+    registry = AIClientRegistry(app.config, app.config['AI_CLIENT_MAX_ENTRIES'])
+    app.extensions[REGISTRY_KEY] = registry
+    # 只持有弱引用，不让退出钩子延长已丢弃的应用（如测试中逐个创建的应用）的生命周期
+    atexit.register(_close_at_exit, weakref.ref(registry))
+
+
+def _close_at_exit(registry_ref) -> None:
+    registry = registry_ref()
+    if registry is not None:
+        registry.close()
+
+
+def get_registry() -> Optional[AIClientRegistry]:
+    """当前应用的客户端注册表"""
+    return current_app.extensions.get(REGISTRY_KEY) if has_app_context() else None
+
+
+def get_client(provider: str, api_key: str) -> openai.OpenAI:
+    """复用的客户端；没有应用上下文时（如离线脚本）按默认配置（Config 中的 AI_HTTP_*）创建一次性客户端"""
+    registry = get_registry()
+    if registry is None:
+        from app.config import Config
+        config = {name: getattr(Config, name) for name in dir(Config) if name.startswith('AI_')}
+        return create_client(provider, api_key, config)
+    return registry.get(provider, api_key)
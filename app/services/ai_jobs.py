@@ -0,0 +1,166 @@
+"""
+AI任务队列
+
+调用服务商的一次往返可能需要数十秒。AI接口只创建任务记录并立即返回任务编号，
+任务在每个工作进程内有上限的线程池中执行（AI_JOB_WORKERS），状态和结果写入 ai_job 表，
+客户端轮询任务状态。请求线程不再等待服务商，服务商变慢时增删改查页面不受影响。
+
+排队的任务超过 AI_JOB_QUEUE 时拒绝新任务；执行任务的进程退出后遗留的未完成任务，
+超过 AI_JOB_STALE_SECONDS 后在查询时标记为失败。AI_JOB_WORKERS=0 时任务在请求中同步执行。
+"""
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+from flask import current_app
+from app import db
+from app.models import AIJob
+from app.services.ai_service import AIService
+from app.services.ai_settings import AISettings
+
+# 任务队列保存在 app.extensions 中的键名
+QUEUE_KEY = 'ai_job_queue'
+
+# 每创建这么多个任务清理一次超过保留期的已完成任务
+PRUNE_INTERVAL = 100
+
+# 任务类型及其执行函数，参数为请求中对应的字段
+JOB_KINDS: Dict[str, Callable[[AIService, Dict[str, Any]], Dict[str, Any]]] = {
+    'improve_bug': lambda service, params: service.improve_bug_description(
+        params['description'], params.get('bug_type')),
+    'improve_test_case': lambda service, params: service.improve_test_case(
+        params['description'], params.get('module')),
+    'classify_bug': lambda service, params: service.classify_bug(params['description'])
+}
+
+
+class AIJobQueueFull(RuntimeError):
+    """排队的AI任务过多"""
+
+
+class AIJobQueue:
+    """
+    有上限的任务线程池：最多 workers 个任务同时执行，最多 workers + queue_size 个任务在执行或排队
+
+    线程在首次提交任务时才启动，兼容预加载应用后fork工作进程。
+    """
+
+    def __init__(self, app, workers: int, queue_size: int):
+        self.app = app
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ai-job') if workers else None
+        self._slots = threading.BoundedSemaphore(workers + queue_size) if workers else None
+        self.created = 0
+
+    def submit(self, kind: str, params: Dict[str, Any], user_id: int, settings: AISettings,
+               bypass_cache: bool = False) -> AIJob:
+        """
+        创建任务记录并提交执行
+
+        Raises:
+            AIJobQueueFull: 排队的任务已满
+        """
+        if self._slots is not None and not self._slots.acquire(blocking=False):
+            raise AIJobQueueFull('AI任务过多，请稍后重试')
+        try:
+            job = AIJob(kind=kind, params=json.dumps(params, ensure_ascii=False), created_by=user_id)
+            db.session.add(job)
+            db.session.flush()
+            job_id = job.id
+            db.session.commit()
+        except BaseException:
+            if self._slots is not None:
+                self._slots.release()
+            raise
+
+        self.created += 1
+        if self.created % PRUNE_INTERVAL == 0:
+            prune_jobs()
+
+        if self._executor is None:
+            self._run_in_app(job_id, settings, bypass_cache)
+            db.session.refresh(job)
+            return job
+        future = self._executor.submit(self._run_in_app, job_id, settings, bypass_cache)
+        future.add_done_callback(lambda _: self._slots.release())
+        return job
+
+    def _run_in_app(self, job_id: int, settings: AISettings, bypass_cache: bool) -> None:
+        """使用独立的应用上下文和数据库会话执行任务"""
+        with self.app.app_context():
+            try:
+                run_job(job_id, settings, bypass_cache)
+            finally:
+                db.session.remove()
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+
+def run_job(job_id: int, settings: AISettings, bypass_cache: bool = False) -> None:
+    """执行任务并保存结果，服务返回的错误和执行中的异常都记为失败"""
+    job = db.session.get(AIJob, job_id)
+    if job is None or job.status != 'queued':
+        return
+    job.status = 'running'
+    job.started_at = datetime.utcnow()
+    db.session.commit()
+
+    try:
+        service = AIService(api_key=settings.api_key, provider=settings.provider, bypass_cache=bypass_cache)
+        result = JOB_KINDS[job.kind](service, json.loads(job.params))
+    except Exception as e:
+        current_app.logger.exception(f"AI job {job_id} failed")
+        db.session.rollback()
+        result = {'error': f'AI生成失败：{type(e).__name__}: {str(e)}'}
+
+    if 'error' in result:
+        values = {'status': 'failed', 'error': result['error']}
+    else:
+        values = {'status': 'succeeded', 'result': json.dumps(result, ensure_ascii=False)}
+    values['finished_at'] = datetime.utcnow()
+    # 只结束仍在执行的任务：超时已被标记为失败的任务，客户端已经收到失败，不再改写
+    updated = AIJob.query.filter_by(id=job_id, status='running').update(values, synchronize_session=False)
+    db.session.commit()
+    if not updated:
+        current_app.logger.warning(f"AI job {job_id} finished after it was marked as timed out")
+
+
+def init_ai_jobs(app) -> None:
+    """创建任务队列并保存到 app.extensions（AI_JOB_* 配置见 app/config.py）"""
+    app.extensions[QUEUE_KEY] = AIJobQueue(app, app.config['AI_JOB_WORKERS'], app.config['AI_JOB_QUEUE'])
+
+
+def get_queue() -> AIJobQueue:
+    return current_app.extensions[QUEUE_KEY]
+
+
+def get_job(job_id: int, user_id: int) -> Optional[AIJob]:
+    """
+    用户的任务，遗留的未完成任务超时后标记为失败
+
+    Returns:
+        任务不存在或不属于该用户时返回None
+    """
+    job = AIJob.query.filter_by(id=job_id, created_by=user_id).first()
+    if job is None or job.finished:
+        return job
+    stale_before = datetime.utcnow() - timedelta(seconds=current_app.config['AI_JOB_STALE_SECONDS'])
+    if (job.started_at or job.created_at) < stale_before:
+        # 以未完成为条件，不覆盖同时完成的任务结果
+        AIJob.query.filter(AIJob.id == job.id, AIJob.status.in_(('queued', 'running'))).update(
+            {'status': 'failed', 'error': 'AI任务超时', 'finished_at': datetime.utcnow()},
+            synchronize_session=False)
+        db.session.commit()
+        db.session.refresh(job)
+    return job
+
+
+def prune_jobs() -> None:
+    """删除超过保留期（AI_JOB_RETENTION 秒）的已完成任务"""
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config['AI_JOB_RETENTION'])
+    AIJob.query.filter(AIJob.status.in_(('succeeded', 'failed')), AIJob.created_at < cutoff) \
+        .delete(synchronize_session=False)
+    db.session.commit()
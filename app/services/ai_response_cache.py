@@ -0,0 +1,137 @@
+"""
+AI响应缓存
+
+同一缺陷在编辑页重复打开、同一草稿重复提交时，发给服务商的提示词完全相同。
+这里按（服务商、模型、系统提示词、规范化后的提示词、温度、最大令牌数）的哈希
+把解析后的结果保存在 ai_response_cache 表中，所有工作进程共享，重复请求不再调用服务商。
+
+缓存项在 AI_RESPONSE_CACHE_TTL 秒后过期；每写入 PRUNE_INTERVAL 次清理一次过期项，
+并按最近使用时间淘汰超出 AI_RESPONSE_CACHE_MAX_ENTRIES 的部分。
+出错的结果不缓存；请求可以跳过缓存读取（结果仍会写入，相当于刷新）。
+"""
+import hashlib
+import json
+import threading
+import unicodedata
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import AIResponseCache
+
+# 命中统计保存在 app.extensions 中的键名
+STATS_KEY = 'ai_response_cache_stats'
+
+# 每写入这么多次清理一次过期项并把条目数控制在上限内
+PRUNE_INTERVAL = 50
+
+
+class CacheStats:
+    """本工作进程的命中统计"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.stores = 0
+        self._lock = threading.Lock()
+
+    def record(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def to_dict(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'bypassed': self.bypassed,
+            'stores': self.stores,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+def init_ai_response_cache(app) -> None:
+    """创建命中统计并保存到 app.extensions（AI_RESPONSE_CACHE_* 配置见 app/config.py）"""
+    app.extensions[STATS_KEY] = CacheStats()
+
+
+def get_stats() -> CacheStats:
+    return current_app.extensions[STATS_KEY]
+
+
+def normalize_prompt(prompt: str) -> str:
+    """统一全角/半角字符，合并每行内的连续空白并去掉首尾空行"""
+    prompt = unicodedata.normalize('NFKC', prompt or '')
+    lines = (' '.join(line.split()) for line in prompt.strip().splitlines())
+    return '\n'.join(lines)
+
+
+def make_key(provider: str, model: str, system_prompt: Optional[str], prompt: str,
+             temperature: float, max_tokens: int) -> str:
+    """缓存键：请求参数的SHA-256"""
+    payload = json.dumps([provider, model, normalize_prompt(system_prompt or ''), normalize_prompt(prompt),
+                          round(float(temperature), 3), max_tokens], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def enabled() -> bool:
+    return current_app.config['AI_RESPONSE_CACHE_ENABLED']
+
+
+def lookup(key: str) -> Optional[Dict[str, Any]]:
+    """
+    读取未过期的缓存结果，命中时更新最近使用时间
+
+    Returns:
+        未命中时返回None
+    """
+    entry = db.session.get(AIResponseCache, key)
+    now = datetime.utcnow()
+    if entry is None or entry.expires_at <= now:
+        get_stats().record('misses')
+        return None
+    entry.last_used_at = now
+    entry.hit_count += 1
+    result = json.loads(entry.response)
+    db.session.commit()
+    get_stats().record('hits')
+    return result
+
+
+def store(key: str, provider: str, model: str, result: Dict[str, Any]) -> None:
+    """写入（或覆盖）缓存结果"""
+    now = datetime.utcnow()
+    entry = db.session.get(AIResponseCache, key)
+    if entry is None:
+        entry = AIResponseCache(key=key, provider=provider, model=model)
+        db.session.add(entry)
+    entry.response = json.dumps(result, ensure_ascii=False)
+    entry.hit_count = 0
+    entry.created_at = entry.last_used_at = now
+    entry.expires_at = now + timedelta(seconds=current_app.config['AI_RESPONSE_CACHE_TTL'])
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # 其他工作进程同时写入了相同的请求，保留对方的结果
+        db.session.rollback()
+        return
+
+    stats = get_stats()
+    stats.record('stores')
+    if stats.stores % PRUNE_INTERVAL == 0:
+        prune()
+
+
+def prune() -> None:
+    """删除过期项，超出上限时按最近使用时间淘汰"""
+    table = AIResponseCache.__table__
+    db.session.execute(table.delete().where(table.c.expires_at <= datetime.utcnow()))
+    cutoff = db.session.execute(
+        db.select(table.c.last_used_at).order_by(table.c.last_used_at.desc())
+        .offset(current_app.config['AI_RESPONSE_CACHE_MAX_ENTRIES']).limit(1)
+    ).scalar()
+    if cutoff is not None:
+        db.session.execute(table.delete().where(table.c.last_used_at <= cutoff))
+    db.session.commit()
@@ -1,40 +1,33 @@
 import os
 import json
 import re
-from typing import Dict, List, Optional, Any
-import openai
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 from flask import current_app
+from app.services import ai_clients, ai_response_cache, ai_stream
 
 class AIService:
     """AI服务类，支持OpenAI和DeepSeek等兼容OpenAI API规范的服务"""
     
-    def __init__(self, api_key: str = None, provider: str = "openai"):
+    def __init__(self, api_key: str = None, provider: str = "openai", bypass_cache: bool = False):
         """
         初始化AI服务
         
         Args:
             api_key: API密钥，如果为None则从环境变量读取
             provider: AI服务提供商，支持"openai"、"deepseek"或其他兼容OpenAI API规范的服务
+            bypass_cache: 为True时不读取响应缓存，总是调用服务商（结果仍写入缓存）
         """
         # 优先级：1. 传入的api_key 2. 环境变量 3. None
         self.api_key = api_key or os.getenv('OPENAI_API_KEY')
         self.provider = provider.lower()
+        self.bypass_cache = bypass_cache
         self.client = None
         self.enabled = bool(self.api_key)
         
         if self.enabled:
             try:
-                # 根据不同提供商设置不同的基础URL
-                base_urls = {
-                    "deepseek": "https://api.deepseek.com/v1",
-                    "openai": "https://api.openai.com/v1"
-                }
-                
-                # 创建客户端，支持不同提供商
-                self.client = openai.OpenAI(
-                    api_key=self.api_key,
-                    base_url=base_urls.get(self.provider, "https://api.openai.com/v1")
-                )
+                # 复用本进程中该服务商和密钥的客户端（保持连接的连接池，见 ai_clients）
+                self.client = ai_clients.get_client(self.provider, self.api_key)
             except Exception as e:
                 current_app.logger.error(f"Failed to initialize AI client: {e}")
                 self.enabled = False
@@ -60,6 +53,18 @@ class AIService:
         if "error" in result:
             return result
         
+        return self._complete_bug_result(result)
+    
+    def stream_bug_description(self, user_input: str, bug_type: str = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        流式优化缺陷描述，事件同 _stream_ai_api
+        """
+        prompt = self._create_bug_improvement_prompt(user_input, bug_type)
+        system_prompt = "你是一个专业的测试工程师，擅长分析和描述软件缺陷。"
+        return self._stream_ai_api(prompt, system_prompt, self._complete_bug_result)
+    
+    def _complete_bug_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """补全缺陷优化结果中缺少的字段"""
         # 确保所有必要字段都存在
         result.setdefault("improved_title", "AI生成的缺陷标题")
         result.setdefault("improved_description", "AI生成的缺陷描述")
@@ -97,6 +102,22 @@ class AIService:
             current_app.logger.error(f"Test case AI error: {result['error']}")
             return result
         
+        result = self._complete_test_case_result(result)
+        
+        current_app.logger.info(f"Test case final result: {result}")
+        
+        return result
+    
+    def stream_test_case(self, user_input: str, module: str = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        流式优化测试用例，事件同 _stream_ai_api
+        """
+        prompt = self._create_test_case_improvement_prompt(user_input, module)
+        system_prompt = "你是一个专业的测试工程师，擅长设计全面的测试用例。"
+        return self._stream_ai_api(prompt, system_prompt, self._complete_test_case_result)
+    
+    def _complete_test_case_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """补全测试用例优化结果中缺少的字段"""
         # 确保所有必要字段都存在
         result.setdefault("improved_title", "AI生成的测试用例标题")
         result.setdefault("improved_description", "AI生成的测试用例描述")
@@ -110,8 +131,6 @@ class AIService:
         if not isinstance(result.get("improved_steps"), list):
             result["improved_steps"] = self._ensure_steps_array(result.get("improved_steps", []))
         
-        current_app.logger.info(f"Test case final result: {result}")
-        
         return result
     
     def _create_test_case_improvement_prompt(self, user_input: str, module: str = None) -> str:
@@ -182,11 +201,12 @@ class AIService:
                 "error": "AI服务未正确配置或初始化失败，请检查配置"
             }
         
-        # 模型映射，移到通用方法中避免重复
-        models = {
-            "deepseek": "deepseek-chat",
-            "openai": "gpt-3.5-turbo"
-        }
+        model = self._model_name()
+        
+        # 相同请求参数的结果直接从响应缓存返回
+        cache_key, cached = self._cached_response(model, prompt, system_prompt, max_tokens, temperature)
+        if cached is not None:
+            return cached
         
         max_retries = 2
         retry_count = 0
@@ -198,9 +218,9 @@ class AIService:
                     messages.append({"role": "system", "content": system_prompt})
                 messages.append({"role": "user", "content": prompt})
                 
-                current_app.logger.info(f"Calling AI service with provider: {self.provider}, model: {models.get(self.provider, 'gpt-3.5-turbo')}, retry: {retry_count}")
+                current_app.logger.info(f"Calling AI service with provider: {self.provider}, model: {model}, retry: {retry_count}")
                 response = self.client.chat.completions.create(
-                    model=models.get(self.provider, "gpt-3.5-turbo"),
+                    model=model,
                     messages=messages,
                     temperature=temperature,
                     max_tokens=max_tokens
@@ -210,7 +230,7 @@ class AIService:
                 current_app.logger.info(f"AI response received: {result_text[:100]}...")
                 
                 # 统一使用_parse_json_response方法解析响应
-                return self._parse_json_response(result_text)
+                result = self._parse_json_response(result_text)
                 
             except Exception as e:
                 current_app.logger.error(f"Error in _call_ai_api (retry {retry_count}/{max_retries}): {type(e).__name__}: {str(e)}")
@@ -219,6 +239,100 @@ class AIService:
                     return {
                         "error": f"AI生成失败：{type(e).__name__}: {str(e)}"
                     }
+            else:
+                # 出错的结果不缓存；调用方会修改返回的字典，缓存的是修改前的副本
+                if cache_key and "error" not in result:
+                    ai_response_cache.store(cache_key, self.provider, model, result)
+                return result
+    
+    def _stream_ai_api(self, prompt: str, system_prompt: str, complete: Callable[[Dict[str, Any]], Dict[str, Any]],
+                       max_tokens: int = 500, temperature: float = 0.3) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        流式AI API调用，按生成进度产生事件
+        
+        Args:
+            prompt: 用户提示词
+            system_prompt: 系统提示词
+            complete: 补全最终结果缺少字段的函数
+            
+        Yields:
+            ("field", {"name": 字段名, "value": 值})：某个字段已生成完整
+            ("done", 结果)：生成结束，结果与非流式调用相同
+            ("error", {"error": 错误信息})
+        """
+        if not self.enabled or not self.client:
+            yield "error", {"error": "AI服务未正确配置或初始化失败，请检查配置"}
+            return
+        
+        model = self._model_name()
+        cache_key, cached = self._cached_response(model, prompt, system_prompt, max_tokens, temperature)
+        if cached is not None:
+            result = complete(cached)
+            for name, value in result.items():
+                yield "field", {"name": name, "value": value}
+            yield "done", result
+            return
+        
+        messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": prompt}]
+        extractor = ai_stream.JSONFieldExtractor()
+        parts = []
+        stream = None
+        try:
+            current_app.logger.info(f"Streaming AI service with provider: {self.provider}, model: {model}")
+            stream = self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True
+            )
+            for text in ai_stream.iter_text(stream):
+                parts.append(text)
+                for name, value in extractor.feed(text):
+                    yield "field", {"name": name, "value": value}
+        except Exception as e:
+            current_app.logger.error(f"Error in _stream_ai_api: {type(e).__name__}: {str(e)}")
+            yield "error", {"error": f"AI生成失败：{type(e).__name__}: {str(e)}"}
+            return
+        finally:
+            # 客户端断开时关闭与服务商的连接，停止生成
+            if stream is not None and hasattr(stream, "close"):
+                stream.close()
+        
+        result = self._parse_json_response("".join(parts))
+        if "error" in result:
+            yield "error", {"error": result["error"]}
+            return
+        if cache_key:
+            ai_response_cache.store(cache_key, self.provider, model, result)
+        yield "done", complete(result)
+    
+    def _model_name(self) -> str:
+        """服务商对应的模型"""
+        models = {
+            "deepseek": "deepseek-chat",
+            "openai": "gpt-3.5-turbo"
+        }
+        return models.get(self.provider, "gpt-3.5-turbo")
+    
+    def _cached_response(self, model: str, prompt: str, system_prompt: Optional[str], max_tokens: int,
+                         temperature: float) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """
+        查询响应缓存
+        
+        Returns:
+            (缓存键, 缓存的结果)，未启用缓存时缓存键为None，未命中或跳过缓存时结果为None
+        """
+        if not ai_response_cache.enabled():
+            return None, None
+        cache_key = ai_response_cache.make_key(self.provider, model, system_prompt, prompt, temperature, max_tokens)
+        if self.bypass_cache:
+            ai_response_cache.get_stats().record('bypassed')
+            return cache_key, None
+        cached = ai_response_cache.lookup(cache_key)
+        if cached is not None:
+            current_app.logger.info(f"AI response served from cache: {cache_key[:12]}")
+        return cache_key, cached
     
     def suggest_similar_bugs(self, bug_description: str, existing_bugs: List[Dict]) -> List[Dict]:
         """
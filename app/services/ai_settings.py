@@ -0,0 +1,90 @@
+"""
+当前AI配置的进程内缓存
+
+AI接口每次请求都需要服务商、密钥和启用状态。这里在工作进程内保存一份配置快照，
+每隔 AI_CONFIG_CHECK_INTERVAL 秒读取一次 ai_config 命名空间的缓存代号（版本戳），
+代号变化时才重新查询数据库，AI请求本身不查询数据库。
+
+AI配置保存的事务提交后代号被更换（见 cache 模块）。使用共享的 sqlite 缓存后端时，
+所有工作进程最迟在检查间隔后得到新配置；快照超过 AI_CONFIG_MAX_AGE 秒时无论代号是否变化都重新加载，
+作为 memory/null 后端或直接修改数据库时的兜底。
+"""
+import os
+import threading
+import time
+from typing import NamedTuple, Optional
+from flask import current_app
+from app import db
+from app.models import AIConfig
+from app.services import cache
+
+# 配置缓存保存在 app.extensions 中的键名
+AI_SETTINGS_KEY = 'ai_settings'
+
+
+class AISettings(NamedTuple):
+    """AI配置快照"""
+    provider: str
+    api_key: Optional[str]
+    enabled: bool
+
+
+def read_ai_settings() -> AISettings:
+    """从数据库读取AI配置，尚未保存过配置时使用环境变量中的密钥且不启用"""
+    row = db.session.execute(
+        db.select(AIConfig.provider, AIConfig.api_key, AIConfig.ai_enabled).order_by(AIConfig.id).limit(1)
+    ).first()
+    if row is None:
+        return AISettings('openai', os.getenv('OPENAI_API_KEY'), False)
+    return AISettings(row.provider or 'openai', row.api_key, bool(row.ai_enabled))
+
+
+class AISettingsCache:
+    """按版本戳刷新的AI配置快照"""
+
+    def __init__(self, check_interval: int = 5, max_age: int = 300):
+        self.check_interval = check_interval
+        self.max_age = max_age
+        self._settings = None
+        self._generation = None
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> AISettings:
+        """当前配置，到检查时间时比较版本戳"""
+        now = time.monotonic()
+        settings = self._settings
+        if settings is not None and now - self._checked_at < self.check_interval:
+            return settings
+        with self._lock:
+            if self._settings is not None and now - self._checked_at < self.check_interval:
+                return self._settings
+            generation = cache.get_cache().generation('ai_config')
+            if (self._settings is None or generation != self._generation
+                    or now - self._loaded_at >= self.max_age):
+                self._settings = read_ai_settings()
+                self._generation = generation
+                self._loaded_at = now
+            self._checked_at = now
+            return self._settings
+
+    def invalidate(self) -> None:
+        """下次读取时重新检查（本进程保存配置后调用，立即生效）"""
+        with self._lock:
+            self._settings = None
+
+
+def init_ai_settings(app) -> None:
+    """创建配置缓存并保存到 app.extensions（AI_CONFIG_* 配置见 app/config.py）"""
+    app.extensions[AI_SETTINGS_KEY] = AISettingsCache(app.config['AI_CONFIG_CHECK_INTERVAL'],
+                                                      app.config['AI_CONFIG_MAX_AGE'])
+
+
+def get_ai_settings_cache() -> AISettingsCache:
+    return current_app.extensions[AI_SETTINGS_KEY]
+
+
+def get_ai_settings() -> AISettings:
+    """当前AI配置"""
+    return get_ai_settings_cache().get()
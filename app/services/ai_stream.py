@@ -0,0 +1,158 @@
+"""
+AI流式输出
+
+服务商以 stream=True 逐段返回生成的文本，JSONFieldExtractor 在文本到达时增量扫描
+顶层JSON对象，每个字段的值一完整就立即给出，表单可以在后面的字段（如测试步骤）
+还在生成时先填入标题。事件以 Server-Sent Events 格式发送给浏览器。
+
+流式请求在整个生成过程中占用一个请求线程，每个工作进程同时进行的流式请求不超过
+AI_STREAM_MAX_CONCURRENT，超出时客户端改用AI任务接口。
+"""
+import json
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from flask import current_app
+
+# 流式请求名额保存在 app.extensions 中的键名
+SLOTS_KEY = 'ai_stream_slots'
+
+
+class JSONFieldExtractor:
+    """
+    顶层JSON对象字段的增量提取器
+
+    feed() 接收新到达的文本，返回本次完整的（字段名, 值）列表，每个字段只返回一次。
+    对象开始之前的内容（如 ```json 代码块标记）被忽略；无法解析的字段值被跳过，
+    由最终对完整文本的解析兜底。
+    """
+
+    def __init__(self):
+        self._buffer = ''
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._state = 'start'  # start, key, colon, value, after_value, end
+        self._key_start = None
+        self._key = None
+        self._value_start = None
+        self._value_kind = None  # string, container, scalar
+        self._emitted = set()
+
+    @property
+    def finished(self) -> bool:
+        """顶层对象是否已结束"""
+        return self._state == 'end'
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        self._buffer += text
+        fields = []
+        while self._pos < len(self._buffer) and self._state != 'end':
+            field = self._scan(self._buffer[self._pos], self._pos)
+            if field is not None:
+                fields.append(field)
+            self._pos += 1
+        return fields
+
+    def _scan(self, char: str, index: int) -> Optional[Tuple[str, Any]]:
+        if self._state == 'start':
+            if char == '{':
+                self._depth = 1
+                self._state = 'key'
+            return None
+
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif char == '\\':
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+                if self._depth == 1 and self._state == 'key':
+                    self._key = self._decode(self._key_start, index + 1)
+                    self._state = 'colon'
+                elif self._depth == 1 and self._value_kind == 'string':
+                    return self._end_value(index + 1)
+            return None
+
+        if char == '"':
+            self._in_string = True
+            if self._depth == 1 and self._state == 'key':
+                self._key_start = index
+            elif self._depth == 1 and self._state == 'value' and self._value_kind is None:
+                self._start_value(index, 'string')
+            return None
+
+        if char in '{[':
+            if self._depth == 1 and self._state == 'value' and self._value_kind is None:
+                self._start_value(index, 'container')
+            self._depth += 1
+            return None
+
+        if char in '}]':
+            self._depth -= 1
+            field = None
+            if self._depth == 1 and self._value_kind == 'container':
+                field = self._end_value(index + 1)
+            elif self._depth == 0:
+                if self._value_kind == 'scalar':
+                    field = self._end_value(index)
+                self._state = 'end'
+            return field
+
+        if self._depth != 1:
+            return None
+        if self._state == 'colon' and char == ':':
+            self._state = 'value'
+        elif char == ',':
+            field = self._end_value(index) if self._value_kind == 'scalar' else None
+            self._state = 'key'
+            return field
+        elif self._state == 'value' and self._value_kind is None and not char.isspace():
+            self._start_value(index, 'scalar')
+        return None
+
+    def _start_value(self, index: int, kind: str) -> None:
+        self._value_start = index
+        self._value_kind = kind
+
+    def _end_value(self, end: int) -> Optional[Tuple[str, Any]]:
+        key, start = self._key, self._value_start
+        self._value_start = self._value_kind = self._key = None
+        self._state = 'after_value'
+        if not isinstance(key, str) or key in self._emitted:
+            return None
+        try:
+            value = json.loads(self._buffer[start:end])
+        except ValueError:
+            return None
+        self._emitted.add(key)
+        return key, value
+
+    def _decode(self, start: int, end: int) -> Optional[str]:
+        try:
+            return json.loads(self._buffer[start:end])
+        except ValueError:
+            return None
+
+
+def format_event(event: str, data: Dict[str, Any]) -> str:
+    """一条SSE消息（数据为单行JSON）"""
+    return f'event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'
+
+
+def init_ai_stream(app) -> None:
+    """创建流式请求名额并保存到 app.extensions（AI_STREAM_MAX_CONCURRENT 配置见 app/config.py）"""
+    app.extensions[SLOTS_KEY] = threading.BoundedSemaphore(app.config['AI_STREAM_MAX_CONCURRENT'])
+
+
+def get_slots() -> threading.BoundedSemaphore:
+    """流式请求名额，非阻塞地 acquire，响应关闭时 release"""
+    return current_app.extensions[SLOTS_KEY]
+
+
+def iter_text(stream) -> Iterator[str]:
+    """服务商流式响应中的文本片段"""
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
@@ -0,0 +1,180 @@
+"""
+测试用例与缺陷的批量更新
+
+一次请求中的所有记录通过一条 UPDATE ... WHERE id IN (...) 语句在同一事务中更新，
+与逐条更新的页面保持相同的业务规则（关闭时间记录、状态计数器维护）。
+"""
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+from flask import jsonify, request
+from sqlalchemy import case, func, select, update
+from app import db
+from app.database import lock_for_write
+from app.models import Bug, TestCase, User
+from app.services import cache, stats_service
+
+BUG_STATUSES = ('new', 'in_progress', 'fixed', 'closed', 'reopened')
+BUG_SEVERITIES = ('critical', 'high', 'medium', 'low')
+TEST_CASE_STATUSES = ('not_run', 'passed', 'failed', 'blocked')
+
+# 从已关闭改为这些状态时清除关闭时间（与 update_bug_status 一致）
+REOPEN_STATUSES = ('new', 'in_progress', 'reopened')
+
+# 单次请求允许更新的最大记录数
+MAX_BULK_IDS = 5000
+
+# 可批量更新的实体：实体名称 -> (模型, 字段 -> 允许的取值，None 表示由专门的校验处理)
+BULK_ENTITIES = {
+    'bug': (Bug, {'status': BUG_STATUSES, 'severity': BUG_SEVERITIES, 'assigned_to': None}),
+    'test_case': (TestCase, {'status': TEST_CASE_STATUSES})
+}
+
+
+class BulkUpdateError(ValueError):
+    """批量更新参数无效"""
+
+
+def parse_ids(raw_ids: Any) -> List[int]:
+    """校验并去重记录编号列表"""
+    if not isinstance(raw_ids, list) or not raw_ids:
+        raise BulkUpdateError('ids 必须是非空数组')
+    try:
+        ids = sorted({int(value) for value in raw_ids})
+    except (TypeError, ValueError):
+        raise BulkUpdateError('ids 只能包含整数')
+    if len(ids) > MAX_BULK_IDS:
+        raise BulkUpdateError(f'单次最多更新 {MAX_BULK_IDS} 条记录')
+    return ids
+
+
+def parse_changes(entity: str, payload: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    从请求数据中提取要更新的字段并校验取值
+
+    Raises:
+        BulkUpdateError: 没有要更新的字段或取值无效
+    """
+    fields = BULK_ENTITIES[entity][1]
+    changes = {name: payload[name] for name in fields if name in payload}
+    if not changes:
+        raise BulkUpdateError(f'请至少指定一个要更新的字段：{", ".join(fields)}')
+
+    for name, value in changes.items():
+        allowed = fields[name]
+        if allowed is not None and value not in allowed:
+            raise BulkUpdateError(f'{name} 的取值无效：{value}')
+
+    if 'assigned_to' in changes and changes['assigned_to'] not in (None, ''):
+        try:
+            assignee_id = int(changes['assigned_to'])
+        except (TypeError, ValueError):
+            raise BulkUpdateError('assigned_to 必须是用户编号')
+        if db.session.get(User, assignee_id) is None:
+            raise BulkUpdateError('用户不存在')
+        changes['assigned_to'] = assignee_id
+    elif 'assigned_to' in changes:
+        changes['assigned_to'] = None  # 取消分配
+
+    return changes
+
+
+def _closed_at_value(table, new_status: str, now: datetime):
+    """
+    按新状态计算 closed_at：关闭时记录时间（已关闭的保留原时间），
+    从已关闭重新打开时清除，其余情况保持不变
+    """
+    was_closed = func.coalesce(table.c.status, '') == 'closed'
+    if new_status == 'closed':
+        return case((was_closed, table.c.closed_at), else_=now)
+    if new_status in REOPEN_STATUSES:
+        return case((was_closed, None), else_=table.c.closed_at)
+    return table.c.closed_at
+
+
+def apply_bulk_update(connection, entity: str, ids: Iterable[int], values: Mapping[str, Any],
+                      now: Optional[datetime] = None) -> int:
+    """
+    在当前事务中以一条 UPDATE 语句批量更新记录（不提交）
+
+    更新状态时同时维护关闭时间和状态计数器：先取得写锁，再按旧状态分组计数并更新，
+    并发的修改不会落在计数和更新之间。
+
+    Args:
+        connection: 当前事务所用的数据库连接
+        entity: 实体名称，bug 或 test_case
+        ids: 记录编号
+        values: 要写入的字段取值
+        now: 更新时间，默认为当前时间
+
+    Returns:
+        实际更新的记录数
+    """
+    table = BULK_ENTITIES[entity][0].__table__
+    ids = list(ids)
+    now = now or datetime.utcnow()
+
+    values = dict(values, updated_at=now)
+    new_status = values.get('status')
+    if new_status is not None:
+        # 先按旧状态分组计数，用于增量维护状态计数器
+        lock_for_write(connection, select(table.c.id).where(table.c.id.in_(ids)).order_by(table.c.id))
+        old_counts = connection.execute(
+            select(table.c.status, func.count()).where(table.c.id.in_(ids)).group_by(table.c.status)
+        ).all()
+        if 'closed_at' in table.c:
+            values['closed_at'] = _closed_at_value(table, new_status, now)
+
+    result = connection.execute(update(table).where(table.c.id.in_(ids)).values(**values))
+    cache.invalidate(entity)
+
+    if new_status is not None:
+        deltas = Counter()
+        for status, count in old_counts:
+            deltas[status] -= count
+            deltas[new_status] += count
+        stats_service.apply_status_deltas(connection, entity, deltas)
+
+    return result.rowcount
+
+
+def bulk_update(entity: str, ids: Iterable[int], changes: Mapping[str, Any]) -> Dict[str, int]:
+    """
+    以一条 UPDATE 语句批量更新记录并提交
+
+    Args:
+        entity: 实体名称，bug 或 test_case
+        ids: 记录编号
+        changes: 已校验的字段取值（见 parse_changes）
+
+    Returns:
+        {'requested': 请求的记录数, 'updated': 实际更新的记录数}
+    """
+    ids = list(ids)
+    try:
+        updated = apply_bulk_update(db.session.connection(), entity, ids, changes)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return {'requested': len(ids), 'updated': updated}
+
+
+def bulk_update_response(entity: str):
+    """
+    处理批量更新请求
+
+    请求体为JSON，如 {"ids": [1, 2, 3], "status": "passed"}，参数无效时返回400。
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({'error': '请求体必须是JSON对象'}), 400
+
+    try:
+        ids = parse_ids(payload.get('ids'))
+        changes = parse_changes(entity, payload)
+    except BulkUpdateError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify(bulk_update(entity, ids, changes))
@@ -0,0 +1,323 @@
+"""
+缓存
+
+提供两种后端：
+  memory  进程内LRU缓存，适合单进程部署
+  sqlite  多个 gunicorn 工作进程共享的SQLite缓存文件，无需额外服务
+
+缓存键包含所属命名空间（bug、test_case、user、api_token、ai_config）的当前代号（generation），
+缺陷、测试用例、用户、API令牌或AI配置的写入提交后更换代号，旧的缓存项不再被读取，随LRU淘汰或过期清理。
+
+sqlite 后端的代号保存在缓存文件中，而不是应用数据库中：数据库建表（after_create）和每次执行
+迁移命令（flask db upgrade/downgrade）时更换全部代号。在应用之外恢复或重建数据库后，
+应执行一次 flask db upgrade（没有待执行的迁移时也会更换代号）或删除缓存文件；
+所有缓存项都有过期时间，作为绕过应用直接修改数据时的兜底。
+"""
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from app import db
+from app.models import AIConfig, ApiToken, Bug, TestCase, User
+
+# 缓存后端保存在 app.extensions 中的键名
+CACHE_KEY = 'cache'
+
+# 会话中记录待更换代号的命名空间的键名
+_PENDING_KEY = 'cache_invalidate'
+
+# 写入时需要失效的模型及其命名空间
+CACHED_MODELS = {
+    Bug: 'bug',
+    TestCase: 'test_case',
+    User: 'user',
+    ApiToken: 'api_token',
+    AIConfig: 'ai_config'
+}
+
+_MISSING = object()
+
+
+def _new_generation() -> str:
+    return os.urandom(8).hex()
+
+
+class NullCache:
+    """不缓存（CACHE_BACKEND=null）"""
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return default
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        pass
+
+    def delete(self, key: str) -> None:
+        pass
+
+    def generation(self, namespace: str) -> str:
+        return '0'
+
+    def bump(self, namespace: str) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+
+class MemoryCache(NullCache):
+    """
+    进程内LRU缓存
+
+    每个工作进程各自持有，代号也只在本进程内更换，多进程部署应使用 SQLiteCache。
+    """
+
+    def __init__(self, max_entries: int = 10000, default_ttl: int = 300):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.time() + (ttl or self.default_ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def generation(self, namespace):
+        with self._lock:
+            return self._generations.setdefault(namespace, _new_generation())
+
+    def bump(self, namespace):
+        with self._lock:
+            self._generations[namespace] = _new_generation()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+
+
+class SQLiteCache(NullCache):
+    """
+    基于SQLite文件的共享缓存
+
+    同一台机器上的所有工作进程读写同一个文件（WAL模式，读写互不阻塞），
+    代号保存在独立的表中，任一进程更换后其他进程立即可见。
+    每个线程使用自己的连接，进程fork后重新建立连接。
+    """
+
+    # 每写入这么多次清理一次过期项并把条目数控制在上限内
+    PRUNE_INTERVAL = 200
+
+    # 命中时距上次记录超过这么多秒才更新最近访问时间，读取通常不写缓存文件、不争用写锁
+    TOUCH_INTERVAL = 60
+
+    def __init__(self, path: str, max_entries: int = 10000, default_ttl: int = 300, timeout: float = 5):
+        self.path = path
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.timeout = timeout
+        self._local = threading.local()
+        self._writes = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS cache_entry ('
+                               'key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+                               'expires_at REAL NOT NULL, accessed_at REAL NOT NULL)')
+            connection.execute('CREATE INDEX IF NOT EXISTS ix_cache_entry_accessed_at ON cache_entry (accessed_at)')
+            connection.execute('CREATE TABLE IF NOT EXISTS cache_generation ('
+                               'namespace TEXT PRIMARY KEY, generation TEXT NOT NULL)')
+
+    def _connect(self) -> sqlite3.Connection:
+        """当前线程的连接"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, key, default=None):
+        now = time.time()
+        connection = self._connect()
+        try:
+            row = connection.execute('SELECT value, expires_at, accessed_at FROM cache_entry WHERE key = ?',
+                                     (key,)).fetchone()
+        except sqlite3.OperationalError:
+            # 缓存文件不可用（如被长时间锁定）时当作未命中，不影响请求
+            return default
+        if row is None or row[1] < now:
+            return default
+        if row[2] < now - self.TOUCH_INTERVAL:
+            try:
+                connection.execute('UPDATE cache_entry SET accessed_at = ? WHERE key = ?', (now, key))
+            except sqlite3.OperationalError:
+                pass  # 只影响淘汰顺序
+        return pickle.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        try:
+            self._connect().execute(
+                'INSERT OR REPLACE INTO cache_entry (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)',
+                (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), now + (ttl or self.default_ttl), now)
+            )
+            self._writes += 1
+            if self._writes % self.PRUNE_INTERVAL == 0:
+                self.prune()
+        except sqlite3.OperationalError:
+            # 写锁超时时放弃写入，下次未命中时重新计算
+            pass
+
+    def delete(self, key):
+        self._connect().execute('DELETE FROM cache_entry WHERE key = ?', (key,))
+
+    def prune(self) -> None:
+        """删除过期项，超出上限时按最近访问时间淘汰"""
+        connection = self._connect()
+        connection.execute('DELETE FROM cache_entry WHERE expires_at < ?', (time.time(),))
+        connection.execute('DELETE FROM cache_entry WHERE key IN (SELECT key FROM cache_entry '
+                           'ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)', (self.max_entries,))
+
+    def generation(self, namespace):
+        connection = self._connect()
+        row = connection.execute('SELECT generation FROM cache_generation WHERE namespace = ?',
+                                 (namespace,)).fetchone()
+        if row is not None:
+            return row[0]
+        connection.execute('INSERT OR IGNORE INTO cache_generation (namespace, generation) VALUES (?, ?)',
+                           (namespace, _new_generation()))
+        return connection.execute('SELECT generation FROM cache_generation WHERE namespace = ?',
+                                  (namespace,)).fetchone()[0]
+
+    def bump(self, namespace):
+        self._connect().execute('INSERT OR REPLACE INTO cache_generation (namespace, generation) VALUES (?, ?)',
+                                (namespace, _new_generation()))
+
+    def clear(self):
+        connection = self._connect()
+        connection.execute('DELETE FROM cache_entry')
+        connection.execute('DELETE FROM cache_generation')
+
+
+def create_cache(config, instance_path: str):
+    """按配置创建缓存后端（CACHE_* 配置见 app/config.py）"""
+    backend = config['CACHE_BACKEND']
+    if backend == 'memory':
+        return MemoryCache(config['CACHE_MAX_ENTRIES'], config['CACHE_DEFAULT_TTL'])
+    if backend == 'sqlite':
+        path = config['CACHE_SQLITE_PATH'] or os.path.join(instance_path, 'cache.db')
+        return SQLiteCache(path, config['CACHE_MAX_ENTRIES'], config['CACHE_DEFAULT_TTL'])
+    if backend == 'null':
+        return NullCache()
+    raise ValueError(f'不支持的缓存后端：{backend}')
+
+
+def init_cache(app) -> None:
+    """创建缓存后端并保存到 app.extensions"""
+    app.extensions[CACHE_KEY] = create_cache(app.config, app.instance_path)
+
+
+def get_cache():
+    """当前应用的缓存后端，没有应用上下文时不缓存"""
+    if not has_app_context():
+        return NullCache()
+    return current_app.extensions.get(CACHE_KEY) or NullCache()
+
+
+def bump_all() -> None:
+    """更换所有命名空间的代号，之前的缓存项全部不再被读取"""
+    cache = get_cache()
+    for namespace in sorted(set(CACHED_MODELS.values())):
+        cache.bump(namespace)
+
+
+def make_key(cache, namespace: str, key: Hashable) -> str:
+    """由命名空间、当前代号和键的内容生成缓存键"""
+    digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+    return f'{namespace}:{cache.generation(namespace)}:{digest}'
+
+
+def remember(namespace: str, key: Hashable, loader: Callable[[], Any], ttl: Optional[int] = None) -> Any:
+    """
+    读取缓存，未命中时调用 loader 计算并写入
+
+    Args:
+        namespace: 命名空间，写入该实体后缓存失效
+        key: 可哈希的键内容（如参数元组）
+        loader: 计算缓存值的函数，返回值需可被 pickle
+        ttl: 过期时间（秒），默认使用 CACHE_DEFAULT_TTL
+    """
+    cache = get_cache()
+    cache_key = make_key(cache, namespace, key)
+    value = cache.get(cache_key, _MISSING)
+    if value is _MISSING:
+        value = loader()
+        cache.set(cache_key, value, ttl)
+    return value
+
+
+def invalidate(*namespaces: str) -> None:
+    """
+    在当前数据库事务提交后更换这些命名空间的代号
+
+    提交前更换会让并发请求把旧数据写入新代号下，因此延迟到 after_commit；
+    事务回滚时放弃。供绕过ORM的批量写路径调用，ORM写入由会话事件自动处理。
+    """
+    db.session.info.setdefault(_PENDING_KEY, set()).update(namespaces)
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _bump_after_create(target, connection, **kw):
+    """建表后更换全部代号，缓存文件中旧数据库的缓存项不会被新数据库读取"""
+    bump_all()
+
+
+@event.listens_for(db.session, 'after_flush')
+def _track_writes(session, flush_context):
+    """记录本事务中写入的缓存相关模型（CACHED_MODELS）"""
+    namespaces = {CACHED_MODELS[type(obj)] for obj in (*session.new, *session.dirty, *session.deleted)
+                  if type(obj) in CACHED_MODELS}
+    if namespaces:
+        session.info.setdefault(_PENDING_KEY, set()).update(namespaces)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _bump_after_commit(session):
+    cache = get_cache()
+    for namespace in session.info.pop(_PENDING_KEY, ()):
+        cache.bump(namespace)
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _discard_after_rollback(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
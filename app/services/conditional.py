@@ -0,0 +1,145 @@
+"""
+条件请求（ETag / Last-Modified）
+
+资源的版本由 (id, updated_at) 以及关联集合的版本组成，通过一次主键/索引查询获得，
+客户端携带的 If-None-Match 或 If-Modified-Since 与之匹配时直接返回304，
+不再加载和渲染资源本身。
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Any, NamedTuple, Optional, Tuple
+from flask import abort, make_response, request, session
+from flask_login import current_user
+from sqlalchemy import func, select
+from app import db
+from app.models import Bug, TestCase, bug_testcase_association
+
+# 页面中的CSRF令牌有效期为1小时，按半小时分段纳入HTML页面的ETag，
+# 保证浏览器复用的页面中的令牌不会过期
+HTML_ETAG_PERIOD = 1800
+
+CACHE_CONTROL = 'private, no-cache'
+
+
+class Validators(NamedTuple):
+    """资源的缓存校验信息"""
+    etag: str
+    last_modified: Optional[datetime]
+
+
+def _bug_version(resource_id: int) -> Optional[Tuple[Any, ...]]:
+    """缺陷的版本：修改时间（主键查询）"""
+    row = db.session.execute(select(Bug.updated_at).where(Bug.id == resource_id)).first()
+    return None if row is None else (row.updated_at,)
+
+
+def _test_case_version(resource_id: int) -> Optional[Tuple[Any, ...]]:
+    """
+    测试用例的版本：修改时间及关联缺陷集合的版本
+
+    关联集合的版本由关联数、关联缺陷编号之和以及关联缺陷的最新修改时间组成，
+    经关联表的 (testcase_id, bug_id) 索引和缺陷主键一次查得。
+    """
+    assoc = bug_testcase_association
+    row = db.session.execute(
+        select(TestCase.updated_at, func.count(assoc.c.bug_id), func.coalesce(func.sum(assoc.c.bug_id), 0),
+               func.max(Bug.updated_at))
+        .select_from(TestCase)
+        .outerjoin(assoc, assoc.c.testcase_id == TestCase.id)
+        .outerjoin(Bug, Bug.id == assoc.c.bug_id)
+        .where(TestCase.id == resource_id)
+        .group_by(TestCase.id)
+    ).first()
+    return None if row is None else tuple(row)
+
+
+_VERSIONS = {
+    'bug': _bug_version,
+    'test_case': _test_case_version
+}
+
+
+def _last_modified(version: Tuple[Any, ...]) -> Optional[datetime]:
+    """版本中最新的修改时间（UTC）"""
+    times = [value for value in version if isinstance(value, datetime)]
+    if not times:
+        return None
+    return max(times).replace(microsecond=0, tzinfo=timezone.utc)
+
+
+def get_validators(entity: str, resource_id: int, html: bool = False) -> Optional[Validators]:
+    """
+    查询资源的ETag和最后修改时间
+
+    JSON响应随 fields 参数变化，ETag中加入该参数；
+    HTML页面包含当前用户相关内容和CSRF令牌，ETag中加入用户、会话令牌和时间分段，
+    此时不提供 Last-Modified（仅凭时间无法区分这些差异）。
+
+    Returns:
+        资源不存在时返回None
+    """
+    version = _VERSIONS[entity](resource_id)
+    if version is None:
+        return None
+
+    parts = [entity, resource_id, *version, request.args.get('fields')]
+    if html:
+        parts += [current_user.get_id(), session.get('csrf_token'), int(time.time() // HTML_ETAG_PERIOD)]
+    etag = hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+    return Validators(etag, None if html else _last_modified(version))
+
+
+def is_not_modified(validators: Validators) -> bool:
+    """
+    请求的条件头是否表明客户端缓存仍然有效（If-None-Match 优先于 If-Modified-Since）
+
+    If-None-Match 按弱比较匹配：压缩后的响应携带的是弱ETag（见 app/compression.py）
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(validators.etag)
+    if request.if_modified_since and validators.last_modified:
+        return validators.last_modified <= request.if_modified_since
+    return False
+
+
+def apply_validators(response, validators: Validators):
+    """为响应设置 ETag、Last-Modified 和 Cache-Control"""
+    response.set_etag(validators.etag)
+    if validators.last_modified:
+        response.last_modified = validators.last_modified
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return response
+
+
+def conditional_get(entity: str, id_arg: str, html: bool = False):
+    """
+    为资源视图提供条件请求支持
+
+    放在 login_required 之后（内层），资源不存在时返回404；
+    有待显示的闪现消息时页面内容会变化，不做缓存校验。
+
+    Args:
+        entity: 实体名称，bug 或 test_case
+        id_arg: 视图中资源编号参数的名称
+        html: 是否为HTML页面
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if html and session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            validators = get_validators(entity, kwargs[id_arg], html=html)
+            if validators is None:
+                abort(404)
+            if is_not_modified(validators):
+                return apply_validators(make_response('', 304), validators)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                apply_validators(response, validators)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,104 @@
+"""
+当前用户的身份缓存
+
+Flask-Login 在每个已登录请求开始时调用 user_loader。这里按用户编号在工作进程内缓存
+轻量的身份对象（编号、用户名、邮箱），命中时不查询数据库。
+
+用户被修改或删除的事务提交后，user 命名空间的缓存代号会被更换（见 cache 模块）。
+使用共享的 sqlite 缓存后端时，其他工作进程也能立即看到代号变化；
+使用 memory 后端时，其他进程最迟在 USER_CACHE_TTL 秒后失效。
+"""
+import threading
+import time
+from typing import Dict, Optional
+from flask import current_app
+from flask_login import UserMixin
+from app import db
+from app.models import User
+from app.services import cache
+
+# 身份缓存保存在 app.extensions 中的键名
+IDENTITY_CACHE_KEY = 'user_identity_cache'
+
+
+class UserIdentity(UserMixin):
+    """当前用户的身份信息，只包含页面和接口使用的字段"""
+
+    def __init__(self, id: int, username: str, email: str):
+        self.id = id
+        self.username = username
+        self.email = email
+
+    def __repr__(self):
+        return f'<UserIdentity {self.username}>'
+
+
+class IdentityCache:
+    """按用户编号缓存身份对象，带过期时间、容量上限和命中统计"""
+
+    def __init__(self, ttl: int = 60, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, generation: str) -> Optional[UserIdentity]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] == generation and entry[2] > time.time():
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def set(self, identity: UserIdentity, generation: str) -> None:
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                # 超出上限时整体清空，活跃用户会很快重新缓存
+                self._entries.clear()
+            self._entries[identity.id] = (identity, generation, time.time() + self.ttl)
+
+    def stats(self) -> Dict[str, float]:
+        """命中统计"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            'size': len(self._entries)
+        }
+
+
+def init_identity_cache(app) -> None:
+    """创建身份缓存并保存到 app.extensions（USER_CACHE_* 配置见 app/config.py）"""
+    app.extensions[IDENTITY_CACHE_KEY] = IdentityCache(app.config['USER_CACHE_TTL'],
+                                                       app.config['USER_CACHE_MAX_ENTRIES'])
+
+
+def get_identity_cache() -> IdentityCache:
+    return current_app.extensions[IDENTITY_CACHE_KEY]
+
+
+def load_identity(user_id: int) -> Optional[UserIdentity]:
+    """
+    按编号加载当前用户，优先读取缓存
+
+    Returns:
+        用户不存在时返回None（Flask-Login 视为未登录）
+    """
+    identity_cache = get_identity_cache()
+    generation = cache.get_cache().generation('user')
+    identity = identity_cache.get(user_id, generation)
+    if identity is not None:
+        return identity
+
+    row = db.session.execute(
+        db.select(User.id, User.username, User.email).where(User.id == user_id)
+    ).first()
+    if row is None:
+        return None
+    identity = UserIdentity(row.id, row.username, row.email)
+    identity_cache.set(identity, generation)
+    return identity
@@ -0,0 +1,323 @@
+"""
+测试用例与缺陷的批量导入
+
+上传文件按行流式解析（CSV、NDJSON，以及逐个元素解析的JSON数组），不会整体读入内存。
+每行使用与创建页面相同的表单规则校验，校验通过的行按批次以 executemany 写入，
+每批独立提交，并在同一事务中维护状态计数器和全文索引。
+"""
+import codecs
+import csv
+import io
+import json
+import os
+from collections import Counter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from flask import Response, jsonify, request, stream_with_context
+from sqlalchemy import insert
+from werkzeug.datastructures import MultiDict
+from wtforms.fields.core import UnboundField
+from app import db
+from app.forms import BugForm, TestCaseForm
+from app.models import Bug, TestCase
+from app.services import search_service, stats_service
+
+# 可导入的实体：实体名称 -> (模型, 校验表单, 导入时固定写入的字段)
+IMPORT_ENTITIES = {
+    'test_case': (TestCase, TestCaseForm, {}),
+    'bug': (Bug, BugForm, {'status': 'new'})
+}
+
+IMPORT_FORMATS = ('csv', 'json', 'ndjson')
+
+# 报告中保留的错误行数上限，超出部分只计数
+MAX_REPORTED_ERRORS = 1000
+
+_READ_SIZE = 64 * 1024
+
+
+class ImportFileError(ValueError):
+    """导入文件无法解析（格式错误），不同于单行校验失败"""
+
+
+class ImportReport:
+    """导入结果：处理行数、成功行数以及每行的错误信息"""
+
+    def __init__(self, entity: str):
+        self.entity = entity
+        self.processed = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    def add_error(self, row: int, messages: Dict[str, List[str]]) -> None:
+        """记录一行的错误"""
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row, 'errors': messages})
+
+    def to_dict(self, with_errors: bool = True) -> Dict[str, Any]:
+        data = {
+            'entity': self.entity,
+            'processed': self.processed,
+            'imported': self.imported,
+            'failed': self.failed
+        }
+        if with_errors:
+            data['errors'] = self.errors
+        return data
+
+
+def detect_format(filename: Optional[str], default: str = 'csv') -> str:
+    """根据文件扩展名判断导入格式（.jsonl 视为 NDJSON）"""
+    ext = os.path.splitext(filename or '')[1].lower().lstrip('.')
+    if ext == 'jsonl':
+        return 'ndjson'
+    return ext if ext in IMPORT_FORMATS else default
+
+
+def _text_stream(stream) -> io.TextIOBase:
+    """将二进制流包装为UTF-8文本流（兼容Excel导出的BOM）"""
+    if isinstance(stream, io.TextIOBase):
+        return stream
+    return io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+
+def _iter_csv(stream) -> Iterator[Tuple[int, Any]]:
+    """逐行读取CSV，行号从数据的第一行（表头之后）记为2"""
+    reader = csv.DictReader(_text_stream(stream))
+    for record in reader:
+        yield reader.line_num, record
+
+
+def _iter_ndjson(stream) -> Iterator[Tuple[int, Any]]:
+    """逐行读取NDJSON，空行跳过，无法解析的行作为该行的错误返回"""
+    for line_no, line in enumerate(_text_stream(stream), start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except ValueError as e:
+            yield line_no, ImportFileError(f'JSON格式错误：{e}')
+
+
+def _iter_json_array(stream) -> Iterator[Tuple[int, Any]]:
+    """
+    逐个元素解析顶层JSON数组，缓冲区只保留尚未解析完的元素
+
+    行号为元素在数组中的序号（从1开始）。
+    """
+    decoder = json.JSONDecoder()
+    reader = codecs.getincrementaldecoder('utf-8-sig')()
+    buffer = ''
+    started = False
+    index = 0
+    eof = False
+
+    while True:
+        if not eof:
+            chunk = stream.read(_READ_SIZE)
+            if isinstance(chunk, bytes):
+                chunk = reader.decode(chunk, final=not chunk)
+            eof = not chunk
+            buffer += chunk
+
+        buffer = buffer.lstrip()
+        if not started:
+            if not buffer:
+                if eof:
+                    raise ImportFileError('文件为空')
+                continue
+            if buffer[0] != '[':
+                raise ImportFileError('JSON文件的顶层必须是数组')
+            buffer = buffer[1:]
+            started = True
+            continue
+
+        if buffer.startswith(','):
+            buffer = buffer[1:].lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            record, end = decoder.raw_decode(buffer)
+        except ValueError as e:
+            if eof:
+                raise ImportFileError(f'JSON格式错误：{e}')
+            continue  # 元素不完整，继续读取
+        index += 1
+        buffer = buffer[end:]
+        yield index, record
+
+
+_PARSERS = {
+    'csv': _iter_csv,
+    'ndjson': _iter_ndjson,
+    'json': _iter_json_array
+}
+
+
+def iter_records(stream, fmt: str) -> Iterator[Tuple[int, Any]]:
+    """
+    流式读取导入文件
+
+    Args:
+        stream: 二进制或文本文件对象
+        fmt: csv、json 或 ndjson
+
+    Returns:
+        (行号, 记录) 的迭代器；记录为字典，或表示该行无法解析的 ImportFileError
+    """
+    if fmt not in _PARSERS:
+        raise ImportFileError(f'不支持的导入格式：{fmt}')
+    return _PARSERS[fmt](stream)
+
+
+def form_fields(entity: str) -> List[str]:
+    """表单中与模型字段对应的字段名（即导入文件可提供的列）"""
+    model, form_class, _ = IMPORT_ENTITIES[entity]
+    return [name for name in model.__table__.c.keys()
+            if isinstance(getattr(form_class, name, None), UnboundField)]
+
+
+def validate_record(entity: str, record: Any) -> Tuple[Optional[Dict[str, Any]], Dict[str, List[str]]]:
+    """
+    使用创建页面的表单规则校验一行数据
+
+    未提供的下拉字段使用模型默认值，与在页面上不修改默认选项一致。
+
+    Returns:
+        (可写入的字段字典, 错误信息)，校验失败时字段字典为None
+    """
+    if isinstance(record, ImportFileError):
+        return None, {'row': [str(record)]}
+    if not isinstance(record, dict):
+        return None, {'row': ['每行数据必须是对象']}
+
+    model, form_class, _ = IMPORT_ENTITIES[entity]
+    columns = model.__table__.c
+    fields = form_fields(entity)
+
+    data = MultiDict()
+    for name in fields:
+        value = record.get(name)
+        if value in (None, '') and columns[name].default is not None:
+            value = columns[name].default.arg
+        if value is not None:
+            data[name] = str(value).strip()
+
+    form = form_class(formdata=data, meta={'csrf': False})
+    if not form.validate():
+        return None, {name: list(messages) for name, messages in form.errors.items()}
+
+    return {name: form[name].data or None for name in fields}, {}
+
+
+def _insert_batch(entity: str, rows: List[Dict[str, Any]]) -> None:
+    """在一个事务中批量写入一批记录，并同步状态计数器和全文索引"""
+    model = IMPORT_ENTITIES[entity][0]
+    table = model.__table__
+    connection = db.session.connection()
+
+    # 多行写入时只有 sort_by_parameter_order 保证返回的编号与 rows 顺序一致，全文索引据此对应记录
+    ids = connection.execute(insert(table).returning(table.c.id, sort_by_parameter_order=True),
+                             rows).scalars().all()
+
+    deltas = Counter(row['status'] for row in rows)
+    deltas[stats_service.TOTAL_KEY] = len(rows)
+    stats_service.apply_status_deltas(connection, entity, deltas)
+
+    if search_service.is_index_ready(connection):
+        search_service.index_documents(connection, entity,
+                                       [dict(row, id=row_id) for row, row_id in zip(rows, ids)])
+    db.session.commit()
+
+
+def iter_import(entity: str, stream, fmt: str, user_id: int,
+                batch_size: int = 500) -> Iterator[ImportReport]:
+    """
+    流式导入测试用例或缺陷，每写入一批后产出当前的导入报告
+
+    校验失败的行记录在报告中并跳过，不影响其他行；每写入一批提交一次，
+    中途出错时已提交的批次保留。
+
+    Args:
+        entity: 实体名称，bug 或 test_case
+        stream: 上传的文件对象
+        fmt: csv、json 或 ndjson
+        user_id: 记录的创建人
+        batch_size: 每批写入的行数
+
+    Raises:
+        ImportFileError: 文件整体无法解析（例如JSON顶层不是数组）
+    """
+    fixed = dict(IMPORT_ENTITIES[entity][2], created_by=user_id)
+    report = ImportReport(entity)
+    batch: List[Dict[str, Any]] = []
+
+    try:
+        for row_no, record in iter_records(stream, fmt):
+            report.processed += 1
+            values, errors = validate_record(entity, record)
+            if errors:
+                report.add_error(row_no, errors)
+                continue
+            batch.append(dict(values, **fixed))
+            if len(batch) >= batch_size:
+                _insert_batch(entity, batch)
+                report.imported += len(batch)
+                batch.clear()
+                yield report
+        if batch:
+            _insert_batch(entity, batch)
+            report.imported += len(batch)
+    except Exception:
+        db.session.rollback()
+        raise
+    yield report
+
+
+def import_records(entity: str, stream, fmt: str, user_id: int, batch_size: int = 500,
+                   progress: Optional[Callable[[ImportReport], None]] = None) -> ImportReport:
+    """
+    流式导入测试用例或缺陷（参数见 iter_import）
+
+    Args:
+        progress: 每批写入后调用的回调，参数为当前的导入报告
+
+    Returns:
+        导入报告
+    """
+    report = ImportReport(entity)
+    for report in iter_import(entity, stream, fmt, user_id, batch_size):
+        if progress:
+            progress(report)
+    return report
+
+
+def import_response(entity: str, user_id: int) -> Response:
+    """
+    处理导入请求，以NDJSON流式返回进度
+
+    文件通过 multipart 的 file 字段上传，或直接作为请求体发送（此时需用 format 参数指定格式）。
+    每写入一批输出一行 {"type": "progress", ...}，最后输出 {"type": "result", ...}
+    （包含每行的错误），文件无法解析时输出 {"type": "error", ...}。
+    """
+    upload = request.files.get('file')
+    stream = upload.stream if upload else request.stream
+    fmt = request.args.get('format') or detect_format(upload.filename if upload else None)
+    batch_size = min(max(request.args.get('batch_size', 500, type=int), 1), 5000)
+
+    if fmt not in IMPORT_FORMATS:
+        return jsonify({'error': f'不支持的导入格式：{fmt}'}), 400
+
+    def generate():
+        report = ImportReport(entity)
+        try:
+            for report in iter_import(entity, stream, fmt, user_id, batch_size):
+                yield json.dumps(dict(report.to_dict(with_errors=False), type='progress'),
+                                 ensure_ascii=False) + '\n'
+        except ImportFileError as e:
+            yield json.dumps(dict(report.to_dict(), type='error', message=str(e)), ensure_ascii=False) + '\n'
+            return
+        yield json.dumps(dict(report.to_dict(), type='result'), ensure_ascii=False) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
@@ -0,0 +1,91 @@
+"""
+缺陷与测试用例的关联
+
+直接在关联表上执行集合操作：关联使用忽略冲突的 INSERT ... SELECT，
+解除关联使用 DELETE ... WHERE IN，无需加载已关联的集合来判断是否存在。
+"""
+from datetime import datetime
+from typing import Iterable
+from sqlalchemy import and_, delete, exists, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+from app.models import Bug, TestCase, bug_testcase_association
+
+# 单次批量关联允许的最大组合数（测试用例数 x 缺陷数）
+MAX_LINK_PAIRS = 100000
+
+
+def _insert_ignore(connection, source):
+    """
+    按数据库方言构造忽略重复关联的 INSERT ... SELECT
+
+    Args:
+        source: 查询 (bug_id, testcase_id) 的 SELECT 语句
+    """
+    table = bug_testcase_association
+    columns = [table.c.bug_id, table.c.testcase_id]
+    dialect = connection.dialect.name
+
+    if dialect == 'sqlite':
+        return sqlite.insert(table).from_select(columns, source).on_conflict_do_nothing()
+    if dialect == 'postgresql':
+        return postgresql.insert(table).from_select(columns, source).on_conflict_do_nothing()
+    if dialect in ('mysql', 'mariadb'):
+        return insert(table).from_select(columns, source).prefix_with('IGNORE')
+
+    # 其他数据库：排除已存在的关联
+    source = source.where(~exists().where(and_(
+        table.c.bug_id == Bug.id, table.c.testcase_id == TestCase.id
+    )))
+    return insert(table).from_select(columns, source)
+
+
+def _touch(connection, test_case_ids: Iterable[int], bug_ids: Iterable[int], now: datetime) -> None:
+    """关联变化后更新两侧的修改时间，使详情页缓存失效"""
+    connection.execute(update(TestCase.__table__).where(TestCase.id.in_(list(test_case_ids))).values(updated_at=now))
+    connection.execute(update(Bug.__table__).where(Bug.id.in_(list(bug_ids))).values(updated_at=now))
+
+
+def link(test_case_ids: Iterable[int], bug_ids: Iterable[int]) -> int:
+    """
+    将一组测试用例与一组缺陷两两关联并提交（一条语句），已存在的关联和不存在的记录被忽略
+
+    Returns:
+        新增的关联数
+    """
+    test_case_ids, bug_ids = list(test_case_ids), list(bug_ids)
+    connection = db.session.connection()
+    try:
+        source = select(Bug.id, TestCase.id).where(Bug.id.in_(bug_ids), TestCase.id.in_(test_case_ids))
+        linked = connection.execute(_insert_ignore(connection, source)).rowcount
+        if linked:
+            _touch(connection, test_case_ids, bug_ids, datetime.utcnow())
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return linked
+
+
+def unlink(test_case_ids: Iterable[int], bug_ids: Iterable[int]) -> int:
+    """
+    解除一组测试用例与一组缺陷之间的所有关联并提交（一条语句）
+
+    Returns:
+        删除的关联数
+    """
+    test_case_ids, bug_ids = list(test_case_ids), list(bug_ids)
+    table = bug_testcase_association
+    connection = db.session.connection()
+    try:
+        unlinked = connection.execute(
+            delete(table).where(table.c.testcase_id.in_(test_case_ids), table.c.bug_id.in_(bug_ids))
+        ).rowcount
+        if unlinked:
+            _touch(connection, test_case_ids, bug_ids, datetime.utcnow())
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return unlinked
+
@@ -0,0 +1,158 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Callable, Hashable, List, Optional, Tuple, Union
+from sqlalchemy import and_, or_
+from app.services import cache
+
+# 游标方向：after 表示下一页（更早的记录），before 表示上一页（更新的记录）
+AFTER = 'after'
+BEFORE = 'before'
+
+
+def encode_cursor(created_at: datetime, record_id: int, direction: str) -> str:
+    """将排序键编码为不透明的游标字符串"""
+    payload = json.dumps([created_at.isoformat() if created_at else None, record_id, direction],
+                         separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int, str]]:
+    """
+    解析游标字符串
+
+    Returns:
+        (created_at, id, direction)，游标为空或无效时返回None
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, record_id, direction = json.loads(base64.urlsafe_b64decode(padded))
+        if direction not in (AFTER, BEFORE) or created_at is None:
+            return None
+        return datetime.fromisoformat(created_at), int(record_id), direction
+    except (ValueError, TypeError, binascii.Error):
+        return None
+
+
+def filter_args(args) -> dict:
+    """去掉分页参数后的查询参数，用于生成翻页链接"""
+    return {key: value for key, value in args.items() if key not in ('cursor', 'page')}
+
+
+class KeysetPage:
+    """基于 (created_at, id) 的游标分页结果"""
+
+    def __init__(self, items: List[Any], has_next: bool, has_prev: bool, per_page: int,
+                 total: Optional[int] = None):
+        self.items = items
+        self.has_next = has_next
+        self.has_prev = has_prev
+        self.per_page = per_page
+        self.total = total
+
+    @property
+    def next_cursor(self) -> Optional[str]:
+        """下一页游标"""
+        if not self.has_next or not self.items:
+            return None
+        last = self.items[-1]
+        return encode_cursor(last.created_at, last.id, AFTER)
+
+    @property
+    def prev_cursor(self) -> Optional[str]:
+        """上一页游标"""
+        if not self.has_prev or not self.items:
+            return None
+        first = self.items[0]
+        return encode_cursor(first.created_at, first.id, BEFORE)
+
+    def to_dict(self) -> dict:
+        """分页元数据，用于JSON响应"""
+        return {
+            'next_cursor': self.next_cursor,
+            'prev_cursor': self.prev_cursor,
+            'per_page': self.per_page,
+            'total': self.total
+        }
+
+
+def keyset_paginate(query, model, cursor: Optional[str] = None, per_page: int = 10,
+                    total: Optional[int] = None) -> KeysetPage:
+    """
+    按创建时间倒序进行游标分页
+
+    无论翻到第几页，都只需在 (created_at, id) 上做一次范围扫描，
+    不使用OFFSET，也不统计总数。
+
+    Args:
+        query: 已应用筛选条件的查询（不要包含排序）
+        model: 查询的模型类，需要有 created_at 和 id 字段
+        cursor: 上一次返回的游标，为空时返回第一页
+        per_page: 每页记录数
+        total: 可选的总数（由调用方从缓存或计数器中获得）
+
+    Returns:
+        KeysetPage 分页结果
+    """
+    position = decode_cursor(cursor)
+
+    if position is None:
+        rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(per_page + 1).all()
+        return KeysetPage(rows[:per_page], has_next=len(rows) > per_page, has_prev=False,
+                          per_page=per_page, total=total)
+
+    created_at, record_id, direction = position
+    if direction == AFTER:
+        rows = query.filter(or_(
+            model.created_at < created_at,
+            and_(model.created_at == created_at, model.id < record_id)
+        )).order_by(model.created_at.desc(), model.id.desc()).limit(per_page + 1).all()
+        return KeysetPage(rows[:per_page], has_next=len(rows) > per_page, has_prev=True,
+                          per_page=per_page, total=total)
+
+    rows = query.filter(or_(
+        model.created_at > created_at,
+        and_(model.created_at == created_at, model.id > record_id)
+    )).order_by(model.created_at.asc(), model.id.asc()).limit(per_page + 1).all()
+    items = list(reversed(rows[:per_page]))
+    return KeysetPage(items, has_next=True, has_prev=len(rows) > per_page,
+                      per_page=per_page, total=total)
+
+
+def cached_keyset_paginate(query, model, namespace: str, key: Hashable, cursor: Optional[str] = None,
+                           per_page: int = 10, total: Union[int, Callable[[], Optional[int]], None] = None
+                           ) -> KeysetPage:
+    """
+    带缓存的游标分页：缓存本页的记录编号和总数，命中时只按主键加载本页记录
+
+    命中后仍在原查询上按编号过滤，缓存中的记录已被删除或不再满足筛选条件时重新查询。
+
+    Args:
+        query: 已应用筛选条件的查询（不要包含排序）
+        model: 查询的模型类
+        namespace: 缓存命名空间（实体名称），写入该实体后缓存失效
+        key: 筛选条件，与 cursor、per_page 一起组成缓存键
+        cursor: 上一次返回的游标
+        per_page: 每页记录数
+        total: 总数，或仅在未命中时调用的计算总数的函数
+    """
+    # 代号在查询之前确定：查询期间有写入提交并更换代号时，本页结果写入旧代号下，不会被读取
+    backend = cache.get_cache()
+    cache_key = cache.make_key(backend, namespace, ('page', key, cursor, per_page))
+    entry = backend.get(cache_key)
+    if entry is not None:
+        rows = query.filter(model.id.in_(entry['ids'])).all() if entry['ids'] else []
+        if len(rows) == len(entry['ids']):
+            by_id = {row.id: row for row in rows}
+            return KeysetPage([by_id[record_id] for record_id in entry['ids']], entry['has_next'],
+                              entry['has_prev'], per_page, entry['total'])
+
+    if callable(total):
+        total = total()
+    page = keyset_paginate(query, model, cursor=cursor, per_page=per_page, total=total)
+    backend.set(cache_key, {'ids': [row.id for row in page.items], 'has_next': page.has_next,
+                            'has_prev': page.has_prev, 'total': total})
+    return page
@@ -0,0 +1,179 @@
+"""
+密码哈希
+
+哈希算法由 PASSWORD_HASHER 配置（scrypt、pbkdf2、argon2），成本参数可调。
+验证时能识别所有算法生成的哈希；登录成功后，若哈希使用的算法或成本与当前配置不同，
+以当前配置重新计算（登录时升级）。
+
+计算哈希是CPU密集型操作，在有上限的线程池中执行：同时计算的数量不超过
+PASSWORD_HASH_WORKERS，等待中的请求超过 PASSWORD_HASH_QUEUE 时立即拒绝，
+集中登录时不会占满所有请求线程和CPU而拖慢其他页面。
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from typing import Callable, Optional
+from flask import current_app, has_app_context
+from werkzeug.security import check_password_hash, generate_password_hash
+
+try:
+    import argon2
+except ImportError:  # argon2-cffi 为可选依赖，仅在配置使用 argon2 时需要
+    argon2 = None
+
+# 哈希算法和线程池保存在 app.extensions 中的键名
+HASHER_KEY = 'password_hasher'
+EXECUTOR_KEY = 'password_hash_executor'
+
+
+class PasswordHasherBusy(RuntimeError):
+    """等待计算哈希的请求过多"""
+
+
+class PBKDF2Hasher:
+    """PBKDF2-SHA256（Werkzeug 格式：pbkdf2:sha256:迭代次数$盐$哈希）"""
+
+    name = 'pbkdf2'
+
+    def __init__(self, iterations: int = 600000):
+        self.method = f'pbkdf2:sha256:{iterations}'
+
+    def hash(self, password: str) -> str:
+        return generate_password_hash(password, method=self.method)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        return password_hash.split('$', 1)[0] != self.method
+
+
+class ScryptHasher(PBKDF2Hasher):
+    """scrypt（Werkzeug 格式：scrypt:n:r:p$盐$哈希），内存占用约为 128 * n * r 字节"""
+
+    name = 'scrypt'
+
+    def __init__(self, n: int = 2 ** 15, r: int = 8, p: int = 1):
+        self.method = f'scrypt:{n}:{r}:{p}'
+
+
+class Argon2Hasher:
+    """Argon2id（PHC 格式：$argon2id$...），需要安装 argon2-cffi"""
+
+    name = 'argon2'
+
+    def __init__(self, time_cost: int = 3, memory_cost: int = 65536, parallelism: int = 4):
+        if argon2 is None:
+            raise RuntimeError('使用 argon2 需要安装 argon2-cffi')
+        self._hasher = argon2.PasswordHasher(time_cost=time_cost, memory_cost=memory_cost,
+                                             parallelism=parallelism)
+
+    def hash(self, password: str) -> str:
+        return self._hasher.hash(password)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        return not password_hash.startswith('$argon2') or self._hasher.check_needs_rehash(password_hash)
+
+
+def create_hasher(config):
+    """按配置创建哈希算法（PASSWORD_* 配置见 app/config.py）"""
+    name = config['PASSWORD_HASHER']
+    if name == 'scrypt':
+        return ScryptHasher(config['PASSWORD_SCRYPT_N'], config['PASSWORD_SCRYPT_R'], config['PASSWORD_SCRYPT_P'])
+    if name == 'pbkdf2':
+        return PBKDF2Hasher(config['PASSWORD_PBKDF2_ITERATIONS'])
+    if name == 'argon2':
+        return Argon2Hasher(config['PASSWORD_ARGON2_TIME_COST'], config['PASSWORD_ARGON2_MEMORY_COST'],
+                            config['PASSWORD_ARGON2_PARALLELISM'])
+    raise ValueError(f'不支持的密码哈希算法：{name}')
+
+
+class BoundedExecutor:
+    """
+    有上限的线程池：最多 workers 个任务同时执行，最多 workers + queue_size 个任务在执行或等待
+
+    hashlib 的 scrypt/pbkdf2 在计算时释放GIL，线程池中的计算可以与其他请求线程并行。
+    """
+
+    def __init__(self, workers: int, queue_size: int, timeout: float):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+
+    def run(self, fn: Callable, *args):
+        """
+        在线程池中执行并等待结果
+
+        Raises:
+            PasswordHasherBusy: 等待的任务已满，或超过 timeout 秒仍未完成
+        """
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy('登录请求过多，请稍后重试')
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise PasswordHasherBusy('登录请求过多，请稍后重试')
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+def init_password_hashing(app) -> None:
+    """创建哈希算法和线程池并保存到 app.extensions（线程在首次使用时才启动，兼容预加载后fork）"""
+    app.extensions[HASHER_KEY] = create_hasher(app.config)
+    app.extensions[EXECUTOR_KEY] = BoundedExecutor(app.config['PASSWORD_HASH_WORKERS'],
+                                                   app.config['PASSWORD_HASH_QUEUE'],
+                                                   app.config['PASSWORD_HASH_TIMEOUT'])
+
+
+def _current_hasher():
+    """当前应用配置的哈希算法，没有应用上下文时（如离线脚本）使用 scrypt 默认参数"""
+    hasher = current_app.extensions.get(HASHER_KEY) if has_app_context() else None
+    return hasher or ScryptHasher()
+
+
+def _run(fn: Callable, *args):
+    """有应用上下文时在线程池中执行，否则直接执行"""
+    executor: Optional[BoundedExecutor] = current_app.extensions.get(EXECUTOR_KEY) if has_app_context() else None
+    if executor is None:
+        return fn(*args)
+    return executor.run(fn, *args)
+
+
+def _verify(password_hash: str, password: str) -> bool:
+    """按哈希的格式选择验证方式，算法参数都编码在哈希中"""
+    if password_hash.startswith('$argon2'):
+        if argon2 is None:
+            return False
+        try:
+            return argon2.PasswordHasher().verify(password_hash, password)
+        except (argon2.exceptions.VerificationError, argon2.exceptions.InvalidHashError):
+            return False
+    return check_password_hash(password_hash, password)
+
+
+def hash_password(password: str) -> str:
+    """
+    以当前配置计算密码哈希
+
+    Raises:
+        PasswordHasherBusy: 线程池已满
+    """
+    return _run(_current_hasher().hash, password)
+
+
+def verify_password(password_hash: str, password: str) -> bool:
+    """
+    验证密码，支持任一算法生成的哈希
+
+    Raises:
+        PasswordHasherBusy: 线程池已满
+    """
+    return _run(_verify, password_hash, password)
+
+
+def needs_rehash(password_hash: str) -> bool:
+    """哈希的算法或成本是否与当前配置不同"""
+    return _current_hasher().needs_rehash(password_hash)
@@ -0,0 +1,102 @@
+"""
+JSON接口与导出的字段投影
+
+按请求的字段（fields=id,status,severity）只查询对应的列，
+创建人、处理人等关联字段仅在被请求时才通过外连接查询，不加载ORM对象。
+"""
+from datetime import datetime
+from typing import Any, Dict, Optional, Sequence
+from sqlalchemy.orm import aliased
+from app.models import Bug, TestCase, User
+
+# 可投影的实体：
+#   default   未指定 fields 时返回的字段（与模型 to_dict 一致）
+#   relations 关联用户名字段 -> 外键列
+#   computed  计算字段 -> 表达式
+FIELDSETS = {
+    'bug': {
+        'model': Bug,
+        'default': ('id', 'title', 'description', 'status', 'severity', 'priority', 'bug_type',
+                    'environment', 'created_by', 'assigned_to', 'created_at', 'updated_at',
+                    'creator_name', 'assignee_name'),
+        'relations': {'creator_name': Bug.created_by, 'assignee_name': Bug.assigned_to},
+        'computed': {}
+    },
+    'test_case': {
+        'model': TestCase,
+        'default': ('id', 'title', 'description', 'steps', 'expected_result', 'status', 'priority',
+                    'test_type', 'module', 'preconditions', 'created_by', 'created_at', 'updated_at',
+                    'last_executed_at', 'creator_name', 'bug_count'),
+        'relations': {'creator_name': TestCase.created_by},
+        'computed': {'bug_count': TestCase.linked_bug_count}
+    }
+}
+
+# 分页需要的排序键，无论是否请求都会查询
+_KEY_FIELDS = ('id', 'created_at')
+
+
+class FieldsetError(ValueError):
+    """请求了不存在的字段"""
+
+
+def available_fields(entity: str) -> Sequence[str]:
+    """实体可请求的全部字段"""
+    spec = FIELDSETS[entity]
+    return tuple(spec['model'].__table__.c.keys()) + tuple(spec['relations']) + tuple(spec['computed'])
+
+
+def parse_fields(entity: str, raw: Optional[str]) -> Sequence[str]:
+    """
+    解析逗号分隔的字段列表，为空时返回默认字段
+
+    Raises:
+        FieldsetError: 包含不存在的字段
+    """
+    if not raw:
+        return FIELDSETS[entity]['default']
+
+    fields = list(dict.fromkeys(name.strip() for name in raw.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in available_fields(entity)]
+    if unknown:
+        raise FieldsetError(f'不支持的字段：{", ".join(unknown)}')
+    return fields or FIELDSETS[entity]['default']
+
+
+def project(entity: str, query, fields: Sequence[str]):
+    """
+    将查询改为只选取指定字段
+
+    Args:
+        entity: 实体名称，bug 或 test_case
+        query: 已应用筛选条件的模型查询
+        fields: 已校验的字段列表
+
+    Returns:
+        结果为具名行（Row）的查询，除请求字段外始终包含 id 和 created_at
+    """
+    spec = FIELDSETS[entity]
+    model = spec['model']
+    columns, joins = [], []
+
+    for name in dict.fromkeys(tuple(_KEY_FIELDS) + tuple(fields)):
+        if name in spec['relations']:
+            user = aliased(User)
+            joins.append((user, spec['relations'][name] == user.id))
+            columns.append(user.username.label(name))
+        elif name in spec['computed']:
+            columns.append(spec['computed'][name].label(name))
+        else:
+            columns.append(getattr(model, name).label(name))
+
+    query = query.with_entities(*columns)
+    for target, onclause in joins:
+        query = query.outerjoin(target, onclause)
+    return query
+
+
+def serialize(row, fields: Sequence[str]) -> Dict[str, Any]:
+    """将投影查询的结果行转换为只包含请求字段的字典"""
+    mapping = row._mapping
+    return {name: mapping[name].isoformat() if isinstance(mapping[name], datetime) else mapping[name]
+            for name in fields}
@@ -0,0 +1,65 @@
+from contextlib import contextmanager
+from functools import wraps
+from flask import current_app, g, has_request_context, request_started
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """视图执行的SQL查询数量超出预算"""
+
+
+def _reset_query_count(sender, **extra):
+    """每个请求开始时重新计数（应用上下文可能被连续的请求复用）"""
+    g.query_count = 0
+
+
+request_started.connect(_reset_query_count)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    """统计当前请求执行的SQL语句数量"""
+    if has_request_context():
+        g.query_count = g.get('query_count', 0) + 1
+
+
+def get_query_count() -> int:
+    """当前请求已执行的SQL语句数量"""
+    return g.get('query_count', 0)
+
+
+def query_budget(limit: int):
+    """
+    为视图设置每次请求的查询预算（包括加载当前用户的查询）
+
+    超出预算时，严格模式（QUERY_BUDGET_STRICT，测试环境默认开启）下抛出
+    QueryBudgetExceeded，否则记录警告日志。
+
+    Args:
+        limit: 允许执行的最大SQL语句数
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            response = view(*args, **kwargs)
+            count = get_query_count()
+            if count > limit:
+                message = f'{view.__name__} 执行了 {count} 条SQL，超出预算 {limit} 条'
+                if current_app.config.get('QUERY_BUDGET_STRICT', current_app.testing):
+                    raise QueryBudgetExceeded(message)
+                current_app.logger.warning(message)
+            return response
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def unbudgeted():
+    """其中执行的SQL不计入当前请求的查询预算，用于偶发的一次性查询（如计数器未初始化时的聚合）"""
+    count = get_query_count() if has_request_context() else None
+    try:
+        yield
+    finally:
+        if count is not None:
+            g.query_count = count
@@ -0,0 +1,377 @@
+import re
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+from markupsafe import escape, Markup
+from sqlalchemy import and_, event, inspect, select, text
+from app import db
+from app.models import Bug, TestCase
+
+# 全文索引定义：实体 -> 模型、FTS5表名、索引字段及BM25权重
+SEARCH_INDEXES = {
+    'bug': {
+        'model': Bug,
+        'table': 'bug_fts',
+        'columns': ['title', 'description', 'reproduction_steps'],
+        'weights': [10.0, 4.0, 1.0]
+    },
+    'test_case': {
+        'model': TestCase,
+        'table': 'test_case_fts',
+        'columns': ['title', 'description', 'steps', 'module'],
+        'weights': [10.0, 4.0, 1.0, 2.0]
+    }
+}
+
+MODEL_ENTITIES = {spec['model']: entity for entity, spec in SEARCH_INDEXES.items()}
+
+# 中日韩统一表意文字（含扩展A区和兼容区）
+_CJK_CHARS = '\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+_CJK_RUN = re.compile(f'[{_CJK_CHARS}]+')
+_QUERY_TOKEN = re.compile(f'[{_CJK_CHARS}]+|[^\\W_{_CJK_CHARS}]+')
+
+# 已确认存在全文索引表的数据库引擎
+_ready_engines = set()
+
+
+def _bigrams(run: str) -> List[str]:
+    """将连续的中文字符切分为重叠的二元组"""
+    if len(run) == 1:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def _index_terms(run: str) -> List[str]:
+    """
+    连续中文字符的索引词项：二元组加上每个单字
+
+    单字查询按单字词项匹配，出现在词尾（只作为二元组后半部分）的字也能命中。
+    """
+    if len(run) == 1:
+        return [run]
+    return _bigrams(run) + list(run)
+
+
+def segment_text(value: Optional[str]) -> str:
+    """
+    将文本转换为可被 unicode61 分词器索引的形式
+
+    中文连续字符切分为二元组和单字并以空格分隔，其余文本保持不变。
+    """
+    if not value:
+        return ''
+    return _CJK_RUN.sub(lambda m: ' ' + ' '.join(_index_terms(m.group())) + ' ', value)
+
+
+def build_match_query(keyword: str) -> Optional[str]:
+    """
+    将用户输入的关键词转换为FTS5 MATCH表达式
+
+    所有词项之间为AND关系；多个汉字按二元组匹配，单个汉字按单字词项匹配，英文词按前缀匹配。
+
+    Returns:
+        MATCH表达式，关键词中没有可检索内容时返回None
+    """
+    terms = []
+    for token in _QUERY_TOKEN.findall(keyword or ''):
+        if _CJK_RUN.fullmatch(token):
+            terms.extend(f'"{gram}"' for gram in _bigrams(token))
+        else:
+            terms.append('"{}"*'.format(token.replace('"', '""')))
+    return ' '.join(terms) if terms else None
+
+
+def is_index_ready(connection=None) -> bool:
+    """检查当前数据库是否支持并已创建全文索引表"""
+    connection = connection or db.session.connection()
+    if connection.dialect.name != 'sqlite':
+        return False
+
+    engine = connection.engine
+    if engine in _ready_engines:
+        return True
+
+    names = {spec['table'] for spec in SEARCH_INDEXES.values()}
+    found = connection.execute(
+        text("SELECT name FROM sqlite_master WHERE type = 'table'")
+    ).scalars().all()
+    if names.issubset(found):
+        _ready_engines.add(engine)
+        return True
+    return False
+
+
+def create_search_tables(connection) -> bool:
+    """
+    创建FTS5全文索引表（SQLite未启用FTS5时跳过）
+
+    Returns:
+        是否已创建
+    """
+    if connection.dialect.name != 'sqlite':
+        return False
+
+    options = connection.exec_driver_sql('PRAGMA compile_options').scalars().all()
+    if 'ENABLE_FTS5' not in options:
+        return False
+
+    for spec in SEARCH_INDEXES.values():
+        columns = ', '.join(spec['columns'])
+        connection.exec_driver_sql(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {spec['table']} "
+            f"USING fts5({columns}, tokenize='unicode61 remove_diacritics 2')"
+        )
+    _ready_engines.add(connection.engine)
+    return True
+
+
+def drop_search_tables(connection) -> None:
+    """删除FTS5全文索引表"""
+    if connection.dialect.name != 'sqlite':
+        return
+    for spec in SEARCH_INDEXES.values():
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {spec['table']}")
+    _ready_engines.discard(connection.engine)
+
+
+def index_documents(connection, entity: str, rows: Iterable[Mapping[str, Any]]) -> None:
+    """
+    写入或更新全文索引文档
+
+    Args:
+        connection: 当前事务所用的数据库连接
+        entity: 实体名称，bug 或 test_case
+        rows: 包含id及索引字段的映射
+    """
+    spec = SEARCH_INDEXES[entity]
+    params = [
+        dict({'rowid': row['id']}, **{col: segment_text(row.get(col)) for col in spec['columns']})
+        for row in rows
+    ]
+    if not params:
+        return
+
+    remove_documents(connection, entity, [p['rowid'] for p in params])
+    columns = ', '.join(spec['columns'])
+    values = ', '.join(f':{col}' for col in spec['columns'])
+    connection.execute(
+        text(f"INSERT INTO {spec['table']} (rowid, {columns}) VALUES (:rowid, {values})"),
+        params
+    )
+
+
+def remove_documents(connection, entity: str, ids: Iterable[int]) -> None:
+    """从全文索引中删除文档"""
+    params = [{'rowid': doc_id} for doc_id in ids]
+    if params:
+        connection.execute(
+            text(f"DELETE FROM {SEARCH_INDEXES[entity]['table']} WHERE rowid = :rowid"),
+            params
+        )
+
+
+def populate_index(connection, entity: str, batch_size: int = 1000) -> int:
+    """
+    清空并根据业务表重新填充全文索引
+
+    Returns:
+        已索引的文档数
+    """
+    spec = SEARCH_INDEXES[entity]
+    model = spec['model']
+    connection.exec_driver_sql(f"DELETE FROM {spec['table']}")
+
+    columns = [model.id] + [getattr(model, col) for col in spec['columns']]
+    result = connection.execute(select(*columns).execution_options(yield_per=batch_size))
+
+    total = 0
+    for partition in result.partitions():
+        rows = [row._asdict() for row in partition]
+        index_documents(connection, entity, rows)
+        total += len(rows)
+    return total
+
+
+def rebuild_index(entity: str) -> int:
+    """
+    根据业务表重建全文索引（索引表不存在时先创建）
+
+    Returns:
+        已索引的文档数
+    """
+    connection = db.session.connection()
+    if not create_search_tables(connection):
+        return 0
+    total = populate_index(connection, entity)
+    db.session.commit()
+    return total
+
+
+def keyword_filter(entity: str, keyword: str):
+    """
+    构建关键词筛选条件
+
+    全文索引可用时通过FTS5匹配，否则退回到标题和描述的LIKE匹配。
+    """
+    spec = SEARCH_INDEXES[entity]
+    model = spec['model']
+    match = build_match_query(keyword)
+
+    if match and is_index_ready():
+        matched_ids = text(f"SELECT rowid FROM {spec['table']} WHERE {spec['table']} MATCH :match")
+        return model.id.in_(matched_ids.bindparams(match=match))
+
+    pattern = f"%{keyword}%"
+    return db.or_(model.title.like(pattern), model.description.like(pattern))
+
+
+def prefix_filter(column, prefix: str):
+    """
+    前缀匹配条件
+
+    转换为范围比较而不是 LIKE 'xxx%'，可以直接利用该字段上的B树索引。
+    """
+    return and_(column >= prefix, column < prefix + '\U0010ffff')
+
+
+def _highlight_pattern(keyword: str):
+    """构建用于高亮关键词的正则表达式，长词优先匹配"""
+    terms = sorted({t.lower() for t in _QUERY_TOKEN.findall(keyword or '')}, key=len, reverse=True)
+    if not terms:
+        return None
+    return re.compile('|'.join(re.escape(term) for term in terms), re.IGNORECASE)
+
+
+def make_snippet(value: Optional[str], keyword: str, width: int = 60) -> Markup:
+    """
+    生成包含高亮关键词的摘要片段
+
+    Args:
+        value: 原始文本
+        keyword: 用户输入的关键词
+        width: 命中位置前后保留的字符数
+
+    Returns:
+        已转义的HTML片段，关键词使用<mark>标记
+    """
+    value = value or ''
+    pattern = _highlight_pattern(keyword)
+    if pattern is None:
+        return escape(value[:width * 2])
+
+    first = pattern.search(value)
+    start = max(first.start() - width, 0) if first else 0
+    end = min(start + width * 2, len(value))
+    fragment = value[start:end]
+
+    parts = []
+    last = 0
+    for m in pattern.finditer(fragment):
+        parts.append(escape(fragment[last:m.start()]))
+        parts.append(Markup('<mark>{}</mark>').format(m.group()))
+        last = m.end()
+    parts.append(escape(fragment[last:]))
+
+    snippet = Markup('').join(parts)
+    if start > 0:
+        snippet = Markup('…') + snippet
+    if end < len(value):
+        snippet = snippet + Markup('…')
+    return snippet
+
+
+def search(entity: str, keyword: str, limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    全文检索，按BM25相关度排序并返回高亮摘要
+
+    Args:
+        entity: 实体名称，bug 或 test_case
+        keyword: 用户输入的关键词
+        limit: 返回结果数上限
+
+    Returns:
+        结果列表，每项包含id、title、status、score和snippet
+    """
+    spec = SEARCH_INDEXES[entity]
+    model = spec['model']
+    match = build_match_query(keyword)
+    if not match:
+        return []
+
+    if not is_index_ready():
+        rows = model.query.filter(keyword_filter(entity, keyword)) \
+            .order_by(model.created_at.desc()).limit(limit).all()
+        scored = [(row, None) for row in rows]
+    else:
+        weights = ', '.join(str(w) for w in spec['weights'])
+        ranked = db.session.execute(
+            text(f"SELECT rowid, bm25({spec['table']}, {weights}) AS score FROM {spec['table']} "
+                 f"WHERE {spec['table']} MATCH :match ORDER BY score LIMIT :limit"),
+            {'match': match, 'limit': limit}
+        ).all()
+        rows = {row.id: row for row in model.query.filter(model.id.in_([r.rowid for r in ranked]))}
+        scored = [(rows[r.rowid], r.score) for r in ranked if r.rowid in rows]
+
+    pattern = _highlight_pattern(keyword)
+    results = []
+    for row, score in scored:
+        # 摘要取自第一个命中关键词的正文字段
+        body = next((value for value in (getattr(row, col) for col in spec['columns'][1:])
+                     if value and pattern.search(value)), row.description)
+        results.append({
+            'id': row.id,
+            'title': row.title,
+            'status': row.status,
+            'score': round(-score, 4) if score is not None else None,
+            'title_highlight': str(make_snippet(row.title, keyword, width=100)),
+            'snippet': str(make_snippet(body, keyword))
+        })
+    return results
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _after_create(target, connection, **kw):
+    """创建业务表后同时创建全文索引表"""
+    create_search_tables(connection)
+
+
+@event.listens_for(db.metadata, 'before_drop')
+def _before_drop(target, connection, **kw):
+    """删除业务表前同时删除全文索引表"""
+    drop_search_tables(connection)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _sync_search_index(session, flush_context):
+    """在同一事务内将新增、修改、删除同步到全文索引"""
+    changed = {entity: [] for entity in SEARCH_INDEXES}
+    removed = {entity: [] for entity in SEARCH_INDEXES}
+
+    for obj in session.new:
+        entity = MODEL_ENTITIES.get(type(obj))
+        if entity:
+            changed[entity].append(obj)
+
+    for obj in session.dirty:
+        entity = MODEL_ENTITIES.get(type(obj))
+        if entity and obj not in session.deleted:
+            state = inspect(obj)
+            if any(state.attrs[col].history.has_changes() for col in SEARCH_INDEXES[entity]['columns']):
+                changed[entity].append(obj)
+
+    for obj in session.deleted:
+        entity = MODEL_ENTITIES.get(type(obj))
+        if entity:
+            removed[entity].append(obj.id)
+
+    if not any(changed.values()) and not any(removed.values()):
+        return
+
+    connection = session.connection()
+    if not is_index_ready(connection):
+        return
+
+    for entity, objs in changed.items():
+        columns = SEARCH_INDEXES[entity]['columns']
+        index_documents(connection, entity,
+                        [dict({'id': obj.id}, **{col: getattr(obj, col) for col in columns}) for obj in objs])
+    for entity, ids in removed.items():
+        remove_documents(connection, entity, ids)
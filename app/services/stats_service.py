@@ -0,0 +1,284 @@
+from collections import Counter
+from typing import Dict, Iterable, Mapping, Tuple
+from sqlalchemy import event, func, insert, inspect, select, update, delete
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.database import lock_for_write
+from app.models import Bug, TestCase, StatusCounter
+from app.services import cache, query_budget
+
+# 计数器表中保存总数的特殊状态值
+TOTAL_KEY = '_total'
+
+# 需要维护状态计数的模型及其实体名称
+TRACKED_MODELS = {
+    Bug: 'bug',
+    TestCase: 'test_case'
+}
+
+ENTITY_MODELS = {entity: model for model, entity in TRACKED_MODELS.items()}
+
+# 会话 info 中保存本次刷新已按数据库中的旧状态核对过的计数增量
+_GUARDED_KEY = 'status_counter_guarded'
+
+
+def aggregate_status_counts(entity: str, connection=None) -> Dict[str, int]:
+    """
+    通过一次分组聚合查询统计各状态数量
+
+    Args:
+        entity: 实体名称，bug 或 test_case
+        connection: 可选的数据库连接，默认使用当前会话
+
+    Returns:
+        状态到数量的字典，total 键为总数
+    """
+    model = ENTITY_MODELS[entity]
+    executor = connection if connection is not None else db.session
+    rows = executor.execute(
+        select(model.status, func.count()).group_by(model.status)
+    ).all()
+
+    counts = {status: count for status, count in rows if status is not None}
+    counts['total'] = sum(count for _, count in rows)
+    return counts
+
+
+def initialize_status_counts(connection, entity: str) -> Dict[str, int]:
+    """
+    在给定连接的事务中根据实际数据重写某个实体的状态计数器
+
+    Returns:
+        状态计数字典
+    """
+    counts = aggregate_status_counts(entity, connection)
+
+    table = StatusCounter.__table__
+    rows = [{'entity': entity, 'status': status, 'count': count}
+            for status, count in counts.items() if status != 'total']
+    rows.append({'entity': entity, 'status': TOTAL_KEY, 'count': counts['total']})
+
+    connection.execute(delete(table).where(table.c.entity == entity))
+    connection.execute(insert(table), rows)
+    return counts
+
+
+def rebuild_in_transaction(connection, entity: str) -> None:
+    """
+    在当前写事务中根据实际数据重建某个实体的状态计数器
+
+    在本事务的写入之后调用，聚合结果已包含这些写入。并发事务同时重建时以先提交的为准。
+    """
+    lock_for_write(connection, _counter_rows(entity))
+    try:
+        with connection.begin_nested():
+            initialize_status_counts(connection, entity)
+    except IntegrityError:
+        pass
+    cache.invalidate(entity)
+
+
+def reconcile_status_counts(entity: str) -> Dict[str, Tuple[int, int]]:
+    """
+    核对计数器与实际数据，不一致时按实际数据重建
+
+    Args:
+        entity: 实体名称，bug 或 test_case
+
+    Returns:
+        不一致的状态 -> (计数器中的数量, 实际数量)，total 键为总数，一致时为空字典
+    """
+    connection = db.session.connection()
+    lock_for_write(connection, _counter_rows(entity))
+
+    table = StatusCounter.__table__
+    stored = dict(connection.execute(
+        select(table.c.status, table.c.count).where(table.c.entity == entity)
+    ).all())
+    if TOTAL_KEY in stored:
+        stored['total'] = stored.pop(TOTAL_KEY)
+    actual = aggregate_status_counts(entity, connection)
+
+    drift = {status: (stored.get(status, 0), actual.get(status, 0))
+             for status in set(stored) | set(actual)
+             if stored.get(status, 0) != actual.get(status, 0)}
+    if drift:
+        initialize_status_counts(connection, entity)
+        cache.invalidate(entity)
+    db.session.commit()
+    return drift
+
+
+def _counter_rows(entity: str):
+    """某个实体的计数器行（用于加锁）"""
+    return select(StatusCounter.status).where(StatusCounter.entity == entity)
+
+
+def get_status_counts(entity: str) -> Dict[str, int]:
+    """
+    读取状态计数器（统计卡片），优先从缓存读取，写入该实体后缓存失效
+
+    Args:
+        entity: 实体名称，bug 或 test_case
+
+    Returns:
+        状态到数量的字典，total 键为总数
+    """
+    return cache.remember(entity, ('status_counts',), lambda: read_status_counts(entity))
+
+
+def read_status_counts(entity: str) -> Dict[str, int]:
+    """
+    从数据库读取状态计数器，代价与数据表大小无关
+
+    计数器尚未初始化时直接分组聚合（不计入查询预算），读请求中不写入；
+    计数器由下一次写入该实体或 flask stats reconcile 重建。
+
+    Args:
+        entity: 实体名称，bug 或 test_case
+
+    Returns:
+        状态到数量的字典，total 键为总数
+    """
+    rows = db.session.execute(
+        select(StatusCounter.status, StatusCounter.count).where(StatusCounter.entity == entity)
+    ).all()
+
+    counts = dict(rows)
+    if TOTAL_KEY not in counts:
+        with query_budget.unbudgeted():
+            return aggregate_status_counts(entity)
+
+    counts['total'] = counts.pop(TOTAL_KEY)
+    return counts
+
+
+def apply_status_deltas(connection, entity: str, deltas: Mapping[str, int]) -> None:
+    """
+    在当前事务中按增量调整状态计数器
+
+    供ORM刷新钩子以及绕过ORM的批量写路径调用，须在本事务的写入之后调用。
+    计数器未初始化时按实际数据重建（已包含本事务的写入）。
+
+    Args:
+        connection: 当前事务所用的数据库连接
+        entity: 实体名称，bug 或 test_case
+        deltas: 状态到增量的映射，TOTAL_KEY 表示总数的增量
+    """
+    deltas = {status: delta for status, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    cache.invalidate(entity)
+
+    table = StatusCounter.__table__
+    initialized = connection.execute(
+        select(table.c.count).where(table.c.entity == entity, table.c.status == TOTAL_KEY)
+    ).first()
+    if initialized is None:
+        rebuild_in_transaction(connection, entity)
+        return
+
+    for status, delta in deltas.items():
+        result = connection.execute(
+            update(table)
+            .where(table.c.entity == entity, table.c.status == status)
+            .values(count=table.c.count + delta)
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(table).values(entity=entity, status=status, count=delta))
+
+
+def invalidate_status_counts(connection, entities: Iterable[str]) -> None:
+    """
+    使计数器失效，之后的读取直接聚合，下一次写入该实体时重建
+
+    Args:
+        connection: 当前事务所用的数据库连接
+        entities: 需要失效的实体名称
+    """
+    entities = list(entities)
+    table = StatusCounter.__table__
+    connection.execute(delete(table).where(table.c.entity.in_(entities)))
+    cache.invalidate(*entities)
+
+
+def _default_status(model) -> str:
+    """获取模型状态字段的默认值"""
+    default = model.__table__.c.status.default
+    return default.arg if default is not None else None
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _initialize_after_create(target, connection, **kw):
+    """建表后立即初始化计数器，之后的写入都会增量维护"""
+    for entity in ENTITY_MODELS:
+        initialize_status_counts(connection, entity)
+
+
+@event.listens_for(db.session, 'before_flush')
+def _guard_status_changes(session, flush_context, instances):
+    """
+    在ORM写入之前，以旧状态为条件更新修改或删除的记录（UPDATE ... WHERE status = :old）
+
+    ORM加载的旧状态可能已被并发事务修改。条件更新同时取得该行的写锁：命中时旧状态与数据库一致，
+    按它计算增量；未命中说明数据库中的状态已经不同，刷新后在本事务中按实际数据重建该实体的计数器。
+    """
+    deltas = {entity: Counter() for entity in ENTITY_MODELS}
+    stale = set()
+    connection = None
+
+    for obj in list(session.dirty) + list(session.deleted):
+        entity = TRACKED_MODELS.get(type(obj))
+        state = inspect(obj)
+        if not entity or state.key is None:
+            continue
+        deleted = obj in session.deleted
+        history = state.attrs.status.history
+        if deleted:
+            old_status = history.deleted[0] if history.deleted else obj.status
+            new_status = old_status
+        elif not history.added:
+            continue
+        elif not history.deleted:
+            # 无法得知旧状态，刷新后按实际数据重建
+            stale.add(entity)
+            continue
+        else:
+            old_status, new_status = history.deleted[0], history.added[0]
+
+        connection = connection or session.connection()
+        table = type(obj).__table__
+        result = connection.execute(
+            update(table)
+            .where(table.c.id == state.identity[0], table.c.status == old_status)
+            .values(status=new_status)
+        )
+        if result.rowcount != 1:
+            stale.add(entity)
+            continue
+        deltas[entity][old_status] -= 1
+        if deleted:
+            deltas[entity][TOTAL_KEY] -= 1
+        else:
+            deltas[entity][new_status] += 1
+
+    session.info[_GUARDED_KEY] = (deltas, stale)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _track_status_changes(session, flush_context):
+    """在同一事务内根据新增的对象和刷新前核对过的修改、删除维护状态计数器"""
+    deltas, stale = session.info.pop(_GUARDED_KEY, ({entity: Counter() for entity in ENTITY_MODELS}, set()))
+
+    for obj in session.new:
+        entity = TRACKED_MODELS.get(type(obj))
+        if entity:
+            deltas[entity][obj.status or _default_status(type(obj))] += 1
+            deltas[entity][TOTAL_KEY] += 1
+
+    connection = session.connection()
+    for entity in stale:
+        rebuild_in_transaction(connection, entity)
+    for entity, entity_deltas in deltas.items():
+        if entity not in stale:
+            apply_status_deltas(connection, entity, entity_deltas)
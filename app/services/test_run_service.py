@@ -0,0 +1,223 @@
+"""
+测试执行轮次与执行结果
+
+执行结果只追加写入，按批次提交：每批结果以 executemany 写入，
+轮次汇总（各结果数量、耗时）按增量更新，测试用例的 status 更新为最近一次结果，
+整个过程只涉及本批用例，不扫描全表。
+"""
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Sequence, Tuple
+from sqlalchemy import func, insert, select, update
+from app import db
+from app.database import lock_for_write
+from app.models import TestCase, TestResult, TestRun
+from app.services import bulk_service
+
+RESULT_STATUSES = ('passed', 'failed', 'blocked')
+RUN_STATUSES = ('running', 'completed', 'aborted')
+RUN_ENVIRONMENTS = ('development', 'test', 'production')
+
+# 单批最多写入的结果数
+MAX_RESULTS_PER_BATCH = 10000
+
+
+class TestRunError(ValueError):
+    """执行轮次状态不允许该操作（例如向已结束的轮次写入结果）"""
+
+
+def parse_results(raw_results: Any) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    校验一批执行结果
+
+    Returns:
+        (有效结果列表, 错误列表)，错误中的 index 为结果在请求数组中的位置（从0开始）
+    """
+    if not isinstance(raw_results, list) or not raw_results:
+        raise TestRunError('results 必须是非空数组')
+    if len(raw_results) > MAX_RESULTS_PER_BATCH:
+        raise TestRunError(f'单批最多提交 {MAX_RESULTS_PER_BATCH} 条结果')
+
+    results, errors = [], []
+    for index, item in enumerate(raw_results):
+        if not isinstance(item, dict):
+            errors.append({'index': index, 'error': '每条结果必须是对象'})
+            continue
+        if item.get('status') not in RESULT_STATUSES:
+            errors.append({'index': index, 'error': f'status 必须是 {", ".join(RESULT_STATUSES)} 之一'})
+            continue
+        try:
+            test_case_id = int(item.get('test_case_id'))
+            duration_ms = int(item.get('duration_ms') or 0)
+        except (TypeError, ValueError):
+            errors.append({'index': index, 'error': 'test_case_id 和 duration_ms 必须是整数'})
+            continue
+        if duration_ms < 0:
+            errors.append({'index': index, 'error': 'duration_ms 不能为负数'})
+            continue
+        results.append({
+            'index': index,
+            'test_case_id': test_case_id,
+            'status': item['status'],
+            'duration_ms': duration_ms,
+            'comment': item.get('comment')
+        })
+    return results, errors
+
+
+def _latest_results(connection, run_id: int, case_ids: Sequence[int]) -> Dict[int, Tuple[str, int]]:
+    """本轮中这些用例已有的最新结果：用例编号 -> (结果, 耗时)"""
+    table = TestResult.__table__
+    latest_ids = (
+        select(func.max(table.c.id))
+        .where(table.c.run_id == run_id, table.c.test_case_id.in_(case_ids))
+        .group_by(table.c.test_case_id)
+    )
+    rows = connection.execute(
+        select(table.c.test_case_id, table.c.status, table.c.duration_ms).where(table.c.id.in_(latest_ids))
+    ).all()
+    return {row.test_case_id: (row.status, row.duration_ms) for row in rows}
+
+
+def record_results(run: TestRun, raw_results: Any, user_id: int) -> Dict[str, Any]:
+    """
+    向执行轮次追加一批结果并提交
+
+    同一用例在本轮中再次执行时，轮次汇总以最新结果替换旧结果；
+    测试用例的 status 按结果分组，以少量 UPDATE 语句更新为本批中的最新结果。
+    读取已有结果前先锁定轮次，同一轮次的并发批次依次写入。
+
+    Args:
+        run: 执行轮次
+        raw_results: 结果列表，每项包含 test_case_id、status，可选 duration_ms、comment
+        user_id: 执行人
+
+    Returns:
+        {'recorded': 写入的结果数, 'errors': 无效结果, 'run': 更新后的轮次汇总}
+
+    Raises:
+        TestRunError: 轮次已结束或请求格式无效
+    """
+    if run.status != 'running':
+        raise TestRunError('执行轮次已结束，不能再写入结果')
+
+    results, errors = parse_results(raw_results)
+    connection = db.session.connection()
+
+    # 过滤不存在的用例
+    requested_ids = {result['test_case_id'] for result in results}
+    existing_ids = set(connection.execute(
+        select(TestCase.id).where(TestCase.id.in_(requested_ids))
+    ).scalars()) if requested_ids else set()
+    valid = []
+    for result in results:
+        if result['test_case_id'] in existing_ids:
+            valid.append(result)
+        else:
+            errors.append({'index': result['index'], 'error': f'测试用例不存在：{result["test_case_id"]}'})
+
+    if valid:
+        now = datetime.utcnow()
+        run_table = TestRun.__table__
+        try:
+            lock_for_write(connection, select(run_table.c.id).where(run_table.c.id == run.id))
+            if connection.execute(select(run_table.c.status).where(run_table.c.id == run.id)).scalar() != 'running':
+                raise TestRunError('执行轮次已结束，不能再写入结果')
+            latest = _latest_results(connection, run.id, sorted(existing_ids))
+
+            connection.execute(insert(TestResult.__table__), [{
+                'run_id': run.id,
+                'test_case_id': result['test_case_id'],
+                'status': result['status'],
+                'duration_ms': result['duration_ms'],
+                'comment': result['comment'],
+                'executed_by': user_id,
+                'executed_at': now
+            } for result in valid])
+
+            # 轮次汇总增量：同一用例以最新结果为准
+            counts = Counter()
+            duration = 0
+            for result in valid:
+                previous = latest.get(result['test_case_id'])
+                if previous:
+                    counts[previous[0]] -= 1
+                    duration -= previous[1]
+                else:
+                    counts['total'] += 1
+                counts[result['status']] += 1
+                duration += result['duration_ms']
+                latest[result['test_case_id']] = (result['status'], result['duration_ms'])
+
+            values = {f'{name}_count': run_table.c[f'{name}_count'] + counts[name]
+                      for name in ('total',) + RESULT_STATUSES if counts[name]}
+            connection.execute(
+                update(run_table).where(run_table.c.id == run.id).values(
+                    duration_ms=run_table.c.duration_ms + duration, updated_at=now, **values)
+            )
+
+            # 用例的最近一次结果：按结果分组批量更新
+            by_status = {}
+            for result in valid:
+                by_status.setdefault(result['status'], set()).add(result['test_case_id'])
+            final_status = {case_id: status for case_id, (status, _) in latest.items()}
+            for status, case_ids in by_status.items():
+                case_ids = [case_id for case_id in case_ids if final_status[case_id] == status]
+                if case_ids:
+                    bulk_service.apply_bulk_update(connection, 'test_case', case_ids,
+                                                   {'status': status, 'last_executed_at': now}, now)
+
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        db.session.refresh(run)
+
+    return {
+        'recorded': len(valid),
+        'errors': sorted(errors, key=lambda error: error['index']),
+        'run': run.to_dict()
+    }
+
+
+def finish_run(run: TestRun, status: str = 'completed') -> TestRun:
+    """
+    结束执行轮次
+
+    Raises:
+        TestRunError: 轮次已结束或目标状态无效
+    """
+    if status not in ('completed', 'aborted'):
+        raise TestRunError('status 必须是 completed 或 aborted')
+    if run.status != 'running':
+        raise TestRunError('执行轮次已结束')
+
+    run.status = status
+    run.finished_at = datetime.utcnow()
+    db.session.commit()
+    return run
+
+
+def create_run(data: Mapping[str, Any], user_id: int) -> TestRun:
+    """
+    创建执行轮次
+
+    Raises:
+        TestRunError: 名称为空或环境无效
+    """
+    name = (data.get('name') or '').strip()
+    if not name:
+        raise TestRunError('请填写执行轮次名称')
+    environment = data.get('environment') or 'test'
+    if environment not in RUN_ENVIRONMENTS:
+        raise TestRunError(f'environment 必须是 {", ".join(RUN_ENVIRONMENTS)} 之一')
+
+    run = TestRun(
+        name=name[:200],
+        description=data.get('description'),
+        environment=environment,
+        created_by=user_id
+    )
+    db.session.add(run)
+    db.session.commit()
+    return run
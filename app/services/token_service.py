@@ -0,0 +1,184 @@
+"""
+个人API令牌
+
+供CI等自动化客户端使用：请求 /api/ 下的接口时携带 Authorization: Bearer <令牌>，
+无需登录表单、会话Cookie和CSRF令牌。
+
+令牌只保存 HMAC-SHA256 哈希（密钥为 API_TOKEN_HASH_KEY，默认 SECRET_KEY），
+令牌本身是高熵随机值，不需要慢速密码哈希；验证时按哈希列的唯一索引查找，
+结果经缓存（写入令牌或用户后失效），高频调用不查询数据库。
+"""
+import hashlib
+import hmac
+import secrets
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+from flask import current_app, g, jsonify, request, request_started
+from flask.sessions import SecureCookieSessionInterface
+from app import db
+from app.models import ApiToken, User
+from app.services import cache
+from app.services.identity import UserIdentity
+
+# 令牌明文的前缀，便于在日志和代码扫描中识别
+TOKEN_PREFIX = 'stp_'
+
+# 令牌名称的最大长度
+MAX_NAME_LENGTH = 100
+
+_NOT_LOADED = object()
+
+
+class ApiTokenError(ValueError):
+    """令牌参数无效"""
+
+
+def _hash_key() -> bytes:
+    key = current_app.config.get('API_TOKEN_HASH_KEY') or current_app.config['SECRET_KEY']
+    return key.encode('utf-8')
+
+
+def hash_token(token: str) -> str:
+    """令牌的带密钥哈希"""
+    return hmac.new(_hash_key(), token.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+def create_token(user_id: int, name: str, expires_in_days: Optional[int] = None) -> Tuple[ApiToken, str]:
+    """
+    为用户创建令牌并提交
+
+    Returns:
+        (令牌记录, 令牌明文)，明文只在此时返回
+
+    Raises:
+        ApiTokenError: 名称为空或有效期无效
+    """
+    name = (name or '').strip()
+    if not name:
+        raise ApiTokenError('请填写令牌名称')
+    if expires_in_days is not None and (not isinstance(expires_in_days, int) or expires_in_days <= 0):
+        raise ApiTokenError('expires_in_days 必须是正整数')
+
+    raw = TOKEN_PREFIX + secrets.token_urlsafe(32)
+    token = ApiToken(
+        user_id=user_id,
+        name=name[:MAX_NAME_LENGTH],
+        token_hash=hash_token(raw),
+        prefix=raw[:len(TOKEN_PREFIX) + 4],
+        expires_at=datetime.utcnow() + timedelta(days=expires_in_days) if expires_in_days else None
+    )
+    db.session.add(token)
+    db.session.commit()
+    return token, raw
+
+
+def list_tokens(user_id: int) -> List[ApiToken]:
+    """用户的全部令牌，新创建的在前"""
+    return ApiToken.query.filter_by(user_id=user_id).order_by(ApiToken.id.desc()).all()
+
+
+def revoke_token(user_id: int, token_id: int) -> Optional[ApiToken]:
+    """
+    撤销用户的令牌并提交
+
+    Returns:
+        令牌不存在或不属于该用户时返回None
+    """
+    token = ApiToken.query.filter_by(id=token_id, user_id=user_id).first()
+    if token is None:
+        return None
+    if token.revoked_at is None:
+        token.revoked_at = datetime.utcnow()
+        db.session.commit()
+    return token
+
+
+def _lookup(token_hash: str) -> Optional[dict]:
+    """按哈希查找可用的令牌及其用户（一次索引查询）"""
+    row = db.session.execute(
+        db.select(ApiToken.id, ApiToken.expires_at, ApiToken.revoked_at, User.id.label('user_id'),
+                  User.username, User.email)
+        .join(User, User.id == ApiToken.user_id)
+        .where(ApiToken.token_hash == token_hash)
+    ).first()
+    if row is None or row.revoked_at is not None:
+        return None
+    return {'token_id': row.id, 'expires_at': row.expires_at, 'user_id': row.user_id,
+            'username': row.username, 'email': row.email}
+
+
+def authenticate(raw: str) -> Optional[UserIdentity]:
+    """
+    验证令牌明文
+
+    查找结果（包括无效令牌）按哈希缓存，令牌或用户被修改后失效。
+
+    Returns:
+        令牌有效时返回令牌所属用户的身份，否则返回None
+    """
+    if not raw or not raw.startswith(TOKEN_PREFIX):
+        return None
+    token_hash = hash_token(raw)
+    entry = cache.remember('api_token', (token_hash, cache.get_cache().generation('user')),
+                           lambda: _lookup(token_hash))
+    if entry is None or (entry['expires_at'] is not None and entry['expires_at'] <= datetime.utcnow()):
+        return None
+    return UserIdentity(entry['user_id'], entry['username'], entry['email'])
+
+
+def _bearer_token() -> Optional[str]:
+    """/api/ 请求的 Authorization: Bearer 令牌"""
+    if not request.path.startswith('/api/'):
+        return None
+    scheme, _, value = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer':
+        return None
+    return value.strip() or None
+
+
+def request_identity() -> Optional[UserIdentity]:
+    """当前请求携带的有效令牌对应的用户（每个请求只验证一次）"""
+    identity = g.get('api_token_identity', _NOT_LOADED)
+    if identity is _NOT_LOADED:
+        token = _bearer_token()
+        identity = g.api_token_identity = authenticate(token) if token else None
+    return identity
+
+
+def _reset_request_identity(sender, **extra):
+    """每个请求开始时重新验证（应用上下文可能被连续的请求复用）"""
+    g.pop('api_token_identity', None)
+
+
+request_started.connect(_reset_request_identity)
+
+
+class TokenAwareSessionInterface(SecureCookieSessionInterface):
+    """令牌认证的请求不写会话Cookie"""
+
+    def save_session(self, app, session, response):
+        if g.get('api_token_identity') is not None:
+            return
+        super().save_session(app, session, response)
+
+
+def init_api_tokens(app, csrf) -> None:
+    """
+    启用令牌认证
+
+    携带无效令牌的 /api/ 请求直接返回401（而不是重定向到登录页）。
+    CSRF检查改为在这里执行（WTF_CSRF_CHECK_DEFAULT=False）：携带有效令牌的请求不依赖Cookie，
+    跨站页面也无法设置 Authorization 头，因此跳过CSRF检查，其余请求与原先一样检查。
+    """
+    app.session_interface = TokenAwareSessionInterface()
+
+    @app.before_request
+    def authenticate_api_token():
+        if _bearer_token() is not None and request_identity() is None:
+            return jsonify({'error': 'API令牌无效、已过期或已撤销'}), 401
+        if not app.config['WTF_CSRF_ENABLED'] or request.method not in app.config['WTF_CSRF_METHODS']:
+            return None
+        if not request.endpoint or request_identity() is not None:
+            return None
+        csrf.protect()
+        return None
@@ -1,32 +1,27 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, abort
 from flask_login import login_required, current_user
 from app import db
 from app.models import TestCase, Bug, bug_testcase_association
 from app.forms import TestCaseForm, TestCaseSearchForm
+from app.services import stats_service, search_service, import_service, export_service, bulk_service, link_service, projection
+from app.services.pagination import cached_keyset_paginate, filter_args
+from app.services.query_budget import query_budget
+from app.services.conditional import conditional_get
+from sqlalchemy.orm import joinedload, undefer
 from datetime import datetime
 import json
 
 test_cases_bp = Blueprint('test_cases', __name__)
 
-@test_cases_bp.route('/test-cases')
-@login_required
-def test_case_list():
-    """测试用例列表页"""
-    page = request.args.get('page', 1, type=int)
-    per_page = 10
-    
-    form = TestCaseSearchForm(request.args)
-    
-    # 构建查询
+# 列表与API查询预加载创建人，并通过聚合子查询随主查询获取关联缺陷数量
+TEST_CASE_LIST_OPTIONS = (joinedload(TestCase.creator), undefer(TestCase.linked_bug_count))
+
+def _filtered_test_case_query(form):
+    """根据搜索表单构建测试用例查询"""
     query = TestCase.query
     
-    # 应用筛选条件
     if form.keyword.data:
-        keyword = f"%{form.keyword.data}%"
-        query = query.filter(db.or_(
-            TestCase.title.like(keyword),
-            TestCase.description.like(keyword)
-        ))
+        query = query.filter(search_service.keyword_filter('test_case', form.keyword.data))
     
     if form.status.data:
         query = query.filter_by(status=form.status.data)
@@ -38,23 +33,56 @@ def test_case_list():
         module_filter = f"%{form.module.data}%"
         query = query.filter(TestCase.module.like(module_filter))
     
-    # 按创建时间倒序排列
-    query = query.order_by(TestCase.created_at.desc())
+    return query
+
+def _filtered_test_case_total(form, query, case_counts):
+    """获取筛选结果总数：能从状态计数器得到时直接读取，否则仅在显式请求时统计"""
+    if not form.keyword.data and not form.test_type.data and not form.module.data:
+        if form.status.data:
+            return case_counts.get(form.status.data, 0)
+        return case_counts['total']
     
-    # 分页
-    test_cases_pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-    test_cases = test_cases_pagination.items
+    if request.args.get('with_count', type=int):
+        return query.order_by(None).count()
     
-    # 统计数据
-    total_cases = TestCase.query.count()
-    not_run_cases = TestCase.query.filter_by(status='not_run').count()
-    passed_cases = TestCase.query.filter_by(status='passed').count()
-    failed_cases = TestCase.query.filter_by(status='failed').count()
-    blocked_cases = TestCase.query.filter_by(status='blocked').count()
+    return None
+
+def _test_case_list_key(form):
+    """列表缓存键：筛选条件"""
+    return (form.keyword.data, form.status.data, form.test_type.data, form.module.data,
+            request.args.get('with_count', type=int))
+
+@test_cases_bp.route('/test-cases')
+@query_budget(3)
+@login_required
+def test_case_list():
+    """测试用例列表页"""
+    cursor = request.args.get('cursor')
+    per_page = 10
+    
+    form = TestCaseSearchForm(request.args)
+    
+    # 构建查询并应用筛选条件
+    query = _filtered_test_case_query(form).options(*TEST_CASE_LIST_OPTIONS)
+    
+    # 统计数据（读取增量维护的状态计数器）
+    case_counts = stats_service.get_status_counts('test_case')
+    total_cases = case_counts['total']
+    not_run_cases = case_counts.get('not_run', 0)
+    passed_cases = case_counts.get('passed', 0)
+    failed_cases = case_counts.get('failed', 0)
+    blocked_cases = case_counts.get('blocked', 0)
+    
+    # 按创建时间倒序的游标分页
+    test_cases_pagination = cached_keyset_paginate(
+        query, TestCase, 'test_case', _test_case_list_key(form), cursor=cursor, per_page=per_page,
+        total=lambda: _filtered_test_case_total(form, query, case_counts))
+    test_cases = test_cases_pagination.items
     
     return render_template('test_cases/list.html',
                          test_cases=test_cases,
                          pagination=test_cases_pagination,
+                         filter_args=filter_args(request.args),
                          form=form,
                          total_cases=total_cases,
                          not_run_cases=not_run_cases,
@@ -97,21 +125,20 @@ def create_test_case():
     return render_template('test_cases/create.html', form=form, title='创建测试用例')
 
 @test_cases_bp.route('/test-cases/<int:test_case_id>')
+@query_budget(4)
 @login_required
+@conditional_get('test_case', 'test_case_id', html=True)
 def test_case_detail(test_case_id):
-    """测试用例详情页"""
-    test_case = TestCase.query.get_or_404(test_case_id)
+    """测试用例详情页（待关联缺陷通过输入联想异步查询，不再加载全部缺陷）"""
+    test_case = TestCase.query.options(joinedload(TestCase.creator)) \
+        .filter_by(id=test_case_id).first_or_404()
     
     # 获取关联的缺陷
     linked_bugs = test_case.bugs
     
-    # 获取所有缺陷（用于关联下拉框）
-    all_bugs = Bug.query.all()
-    
     return render_template('test_cases/detail.html',
                          test_case=test_case,
                          linked_bugs=linked_bugs,
-                         all_bugs=all_bugs,
                          title=f'测试用例 #{test_case.id}')
 
 @test_cases_bp.route('/test-cases/<int:test_case_id>/edit', methods=['GET', 'POST'])
@@ -198,10 +225,17 @@ def update_test_case_status(test_case_id):
     
     return redirect(url_for('test_cases.test_case_detail', test_case_id=test_case_id))
 
+@test_cases_bp.route('/api/test-cases/bulk-update', methods=['POST'])
+@query_budget(10)
+@login_required
+def bulk_update_test_cases():
+    """批量更新测试用例状态（一条UPDATE语句、一次提交）"""
+    return bulk_service.bulk_update_response('test_case')
+
 @test_cases_bp.route('/test-cases/<int:test_case_id>/link-bug', methods=['POST'])
 @login_required
 def link_test_case_to_bug(test_case_id):
-    """关联测试用例到缺陷"""
+    """关联测试用例到缺陷（直接写入关联表，不加载已关联的缺陷集合）"""
     test_case = TestCase.query.get_or_404(test_case_id)
     bug_id = request.form.get('bug_id')
     
@@ -210,18 +244,15 @@ def link_test_case_to_bug(test_case_id):
         return redirect(url_for('test_cases.test_case_detail', test_case_id=test_case_id))
     
     try:
-        bug = Bug.query.get(int(bug_id))
+        bug = db.session.get(Bug, int(bug_id))
         if not bug:
             flash('缺陷不存在', 'danger')
             return redirect(url_for('test_cases.test_case_detail', test_case_id=test_case_id))
         
-        # 检查是否已经关联
-        if bug in test_case.bugs:
-            flash('已经关联过此缺陷', 'info')
-        else:
-            test_case.bugs.append(bug)
-            db.session.commit()
+        if link_service.link([test_case.id], [bug.id]):
             flash(f'已关联到缺陷 #{bug.id}', 'success')
+        else:
+            flash('已经关联过此缺陷', 'info')
             
     except Exception as e:
         db.session.rollback()
@@ -236,10 +267,7 @@ def unlink_test_case_from_bug(test_case_id, bug_id):
     test_case = TestCase.query.get_or_404(test_case_id)
     
     try:
-        bug = Bug.query.get(int(bug_id))
-        if bug and bug in test_case.bugs:
-            test_case.bugs.remove(bug)
-            db.session.commit()
+        if link_service.unlink([test_case.id], [bug_id]):
             flash('已解除关联', 'success')
         else:
             flash('未找到关联关系', 'info')
@@ -249,10 +277,95 @@ def unlink_test_case_from_bug(test_case_id, bug_id):
     
     return redirect(url_for('test_cases.test_case_detail', test_case_id=test_case_id))
 
+@test_cases_bp.route('/api/test-cases/bug-links', methods=['POST', 'DELETE'])
+@query_budget(5)
+@login_required
+def batch_link_bugs():
+    """
+    批量关联（POST）或解除关联（DELETE）测试用例与缺陷
+    
+    请求体如 {"test_case_ids": [1, 2], "bug_ids": [3, 4]}，两组记录两两组合，一条语句完成
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({'error': '请求体必须是JSON对象'}), 400
+    
+    try:
+        test_case_ids = bulk_service.parse_ids(payload.get('test_case_ids'))
+        bug_ids = bulk_service.parse_ids(payload.get('bug_ids'))
+    except bulk_service.BulkUpdateError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    requested = len(test_case_ids) * len(bug_ids)
+    if requested > link_service.MAX_LINK_PAIRS:
+        return jsonify({'error': f'单次最多处理 {link_service.MAX_LINK_PAIRS} 个关联组合'}), 400
+    
+    if request.method == 'POST':
+        return jsonify({'requested': requested, 'linked': link_service.link(test_case_ids, bug_ids)})
+    return jsonify({'requested': requested, 'unlinked': link_service.unlink(test_case_ids, bug_ids)})
+
 @test_cases_bp.route('/api/test-cases/<int:test_case_id>/bugs')
+@query_budget(4)
 @login_required
+@conditional_get('test_case', 'test_case_id')
 def get_test_case_bugs(test_case_id):
     """获取测试用例关联的缺陷列表（API）"""
     test_case = TestCase.query.get_or_404(test_case_id)
     bugs = [{'id': bug.id, 'title': bug.title, 'status': bug.status} for bug in test_case.bugs]
-    return jsonify({'bugs': bugs})
\ No newline at end of file
+    return jsonify({'bugs': bugs})
+
+@test_cases_bp.route('/api/test-cases')
+@query_budget(3)
+@login_required
+def list_test_cases_json():
+    """获取测试用例列表JSON数据（游标分页，筛选参数与列表页一致，fields 参数指定返回的字段）"""
+    form = TestCaseSearchForm(request.args)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+    try:
+        fields = projection.parse_fields('test_case', request.args.get('fields'))
+    except projection.FieldsetError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    query = _filtered_test_case_query(form)
+    case_counts = stats_service.get_status_counts('test_case')
+    page = cached_keyset_paginate(projection.project('test_case', query, fields), TestCase, 'test_case',
+                                  _test_case_list_key(form), cursor=request.args.get('cursor'), per_page=per_page,
+                                  total=lambda: _filtered_test_case_total(form, query, case_counts))
+    
+    return jsonify({
+        'items': [projection.serialize(row, fields) for row in page.items],
+        'pagination': page.to_dict()
+    })
+
+@test_cases_bp.route('/api/test-cases/<int:test_case_id>')
+@query_budget(3)
+@login_required
+@conditional_get('test_case', 'test_case_id')
+def get_test_case_json(test_case_id):
+    """获取测试用例JSON数据，fields 参数指定返回的字段，如 fields=id,status,module"""
+    try:
+        fields = projection.parse_fields('test_case', request.args.get('fields'))
+    except projection.FieldsetError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    row = projection.project('test_case', TestCase.query.filter(TestCase.id == test_case_id), fields).first()
+    if row is None:
+        abort(404)
+    return jsonify(projection.serialize(row, fields))
+
+@test_cases_bp.route('/api/test-cases/import', methods=['POST'])
+@login_required
+def import_test_cases():
+    """批量导入测试用例（CSV/JSON/NDJSON，流式返回进度和每行错误）"""
+    return import_service.import_response('test_case', current_user.id)
+
+@test_cases_bp.route('/api/test-cases/export')
+@login_required
+def export_test_cases():
+    """流式导出测试用例（CSV/NDJSON，筛选参数与列表页一致）"""
+    fmt = request.args.get('format', 'csv')
+    if fmt not in export_service.EXPORT_FORMATS:
+        return jsonify({'error': f'不支持的导出格式：{fmt}'}), 400
+    
+    form = TestCaseSearchForm(request.args)
+    return export_service.export_response('test_case', _filtered_test_case_query(form), fmt)
@@ -0,0 +1,89 @@
+from flask import Blueprint, request, jsonify
+from flask_login import login_required, current_user
+from app.models import TestRun, TestResult
+from app.services import test_run_service
+from app.services.pagination import keyset_paginate
+from app.services.query_budget import query_budget
+
+test_runs_bp = Blueprint('test_runs', __name__)
+
+def _json_payload():
+    """读取JSON请求体，缺失时返回空字典"""
+    payload = request.get_json(silent=True)
+    return payload if isinstance(payload, dict) else {}
+
+@test_runs_bp.route('/api/test-runs', methods=['POST'])
+@login_required
+def create_test_run():
+    """创建执行轮次"""
+    try:
+        run = test_run_service.create_run(_json_payload(), current_user.id)
+    except test_run_service.TestRunError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(run.to_dict()), 201
+
+@test_runs_bp.route('/api/test-runs', methods=['GET'])
+@query_budget(3)
+@login_required
+def list_test_runs():
+    """执行轮次列表（游标分页，汇总数据直接读取轮次记录）"""
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+    query = TestRun.query
+    if request.args.get('status'):
+        query = query.filter_by(status=request.args['status'])
+    
+    page = keyset_paginate(query, TestRun, cursor=request.args.get('cursor'), per_page=per_page)
+    return jsonify({
+        'items': [run.to_dict() for run in page.items],
+        'pagination': page.to_dict()
+    })
+
+@test_runs_bp.route('/api/test-runs/<int:run_id>', methods=['GET'])
+@query_budget(2)
+@login_required
+def get_test_run(run_id):
+    """执行轮次详情及汇总（不统计结果表）"""
+    run = TestRun.query.get_or_404(run_id)
+    return jsonify(run.to_dict())
+
+@test_runs_bp.route('/api/test-runs/<int:run_id>/results', methods=['POST'])
+@login_required
+def record_test_results(run_id):
+    """追加一批执行结果，如 {"results": [{"test_case_id": 1, "status": "passed", "duration_ms": 120}]}"""
+    run = TestRun.query.get_or_404(run_id)
+    try:
+        summary = test_run_service.record_results(run, _json_payload().get('results'), current_user.id)
+    except test_run_service.TestRunError as e:
+        return jsonify({'error': str(e)}), 409 if run.status != 'running' else 400
+    return jsonify(summary)
+
+@test_runs_bp.route('/api/test-runs/<int:run_id>/results', methods=['GET'])
+@query_budget(3)
+@login_required
+def list_test_results(run_id):
+    """执行结果列表（按写入顺序，after 为上一页最后一条结果的编号）"""
+    per_page = min(max(request.args.get('per_page', 100, type=int), 1), 1000)
+    after = request.args.get('after', 0, type=int)
+    
+    query = TestResult.query.filter(TestResult.run_id == run_id, TestResult.id > after)
+    if request.args.get('status'):
+        query = query.filter_by(status=request.args['status'])
+    results = query.order_by(TestResult.id).limit(per_page + 1).all()
+    
+    has_next = len(results) > per_page
+    results = results[:per_page]
+    return jsonify({
+        'items': [result.to_dict() for result in results],
+        'next_after': results[-1].id if has_next else None
+    })
+
+@test_runs_bp.route('/api/test-runs/<int:run_id>/finish', methods=['POST'])
+@login_required
+def finish_test_run(run_id):
+    """结束执行轮次（completed 或 aborted）"""
+    run = TestRun.query.get_or_404(run_id)
+    try:
+        test_run_service.finish_run(run, _json_payload().get('status', 'completed'))
+    except test_run_service.TestRunError as e:
+        return jsonify({'error': str(e)}), 409 if run.status != 'running' else 400
+    return jsonify(run.to_dict())
@@ -0,0 +1,137 @@
+"""
+AI客户端延迟基准测试
+
+在本机启动一个兼容OpenAI API的假服务（默认HTTPS，自签名证书由 openssl 生成），
+对比每次调用新建客户端（原先的做法：每次新建连接池、TCP连接和TLS握手）
+与复用注册表中的客户端（保持连接）时，单次AI调用的延迟和服务端接受的连接数。
+
+用法：
+    python benchmarks/ai_client_latency.py [--calls 200] [--no-tls]
+"""
+import argparse
+import json
+import os
+import shutil
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+COMPLETION = json.dumps({
+    'id': 'chatcmpl-bench', 'object': 'chat.completion', 'created': 0, 'model': 'deepseek-chat',
+    'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {
+        'role': 'assistant', 'content': json.dumps({'improved_title': '登录按钮无响应', 'suggested_severity': 'high'},
+                                                   ensure_ascii=False)}}],
+    'usage': {'prompt_tokens': 10, 'completion_tokens': 10, 'total_tokens': 20}
+}).encode('utf-8')
+
+
+class FakeCompletionHandler(BaseHTTPRequestHandler):
+    """立即返回固定结果的 /chat/completions，统计新建的连接数"""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True  # 响应头和响应体分开写出，避免与客户端的延迟确认叠加
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(COMPLETION)))
+        self.end_headers()
+        self.wfile.write(COMPLETION)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(tmp, tls):
+    """启动假服务，返回 (server, base_url, CA文件)"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeCompletionHandler)
+    server.daemon_threads = True
+    ca_file = None
+    if tls:
+        ca_file, key_file = os.path.join(tmp, 'cert.pem'), os.path.join(tmp, 'key.pem')
+        subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-keyout', key_file,
+                        '-out', ca_file, '-days', '1', '-subj', '/CN=127.0.0.1',
+                        '-addext', 'subjectAltName=IP:127.0.0.1'], check=True, capture_output=True)
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(ca_file, key_file)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    scheme = 'https' if tls else 'http'
+    return server, f'{scheme}://127.0.0.1:{server.server_address[1]}/v1', ca_file
+
+
+def build_app(tmp, base_url, ca_file):
+    """创建应用（假服务地址通过 AI_BASE_URL 配置）"""
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tmp, "bench.db")}'
+    os.environ['CACHE_SQLITE_PATH'] = os.path.join(tmp, 'cache.db')
+    from app import create_app
+    app = create_app()
+    app.config.update(AI_BASE_URL=base_url, AI_HTTP_CA_BUNDLE=ca_file)
+    return app
+
+
+def run_scenario(app, mode, calls):
+    """依次调用 calls 次，返回每次的延迟（毫秒）和新建的连接数"""
+    from app.services.ai_clients import create_client, get_registry
+    from app.services.ai_service import AIService
+
+    registry = get_registry()
+    registry.close()
+    FakeCompletionHandler.connections = 0
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        if mode == 'per-request':
+            client = create_client('deepseek', 'sk-bench', app.config)
+            service = AIService(api_key='sk-bench', provider='deepseek')
+            service.client = client
+            result = service.improve_bug_description('点击登录按钮没有反应')
+            client.close()
+        else:
+            result = AIService(api_key='sk-bench', provider='deepseek').improve_bug_description('点击登录按钮没有反应')
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert 'error' not in result, result
+    latencies.sort()
+    return {
+        'p50': statistics.median(latencies),
+        'p95': latencies[int(len(latencies) * 0.95)],
+        'connections': FakeCompletionHandler.connections
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='AI客户端延迟基准测试')
+    parser.add_argument('--calls', type=int, default=200, help='每个场景的调用次数')
+    parser.add_argument('--no-tls', action='store_true', help='使用HTTP（未安装 openssl 时自动使用）')
+    args = parser.parse_args()
+    tls = not args.no_tls and shutil.which('openssl') is not None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server, base_url, ca_file = start_server(tmp, tls)
+        app = build_app(tmp, base_url, ca_file)
+        app.logger.disabled = True
+        print(f'假服务 {base_url}，每个场景 {args.calls} 次调用')
+        print(f'{"场景":<14}{"p50(ms)":>10}{"p95(ms)":>10}{"新建连接":>10}')
+        with app.app_context():
+            for mode in ('per-request', 'pooled'):
+                result = run_scenario(app, mode, args.calls)
+                print(f'{mode:<14}{result["p50"]:>10.2f}{result["p95"]:>10.2f}{result["connections"]:>10}')
+            app.extensions['ai_clients'].close()
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
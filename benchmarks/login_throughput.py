@@ -0,0 +1,129 @@
+"""
+登录吞吐量基准测试
+
+模拟 CI 用户集中登录：多个线程持续提交登录表单，同时另一些线程请求普通页面，
+对比密码验证直接在请求线程中执行（inline）与在有上限的线程池中执行（bounded）时
+的登录吞吐量、被拒绝的登录数，以及普通页面的响应延迟。
+
+用法：
+    python benchmarks/login_throughput.py [--login-threads 16] [--page-threads 4] [--seconds 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+USERS = 20
+
+
+def build_app(path):
+    """创建应用并生成登录用户"""
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    os.environ['CACHE_SQLITE_PATH'] = os.path.join(os.path.dirname(path), 'cache.db')
+    from app import create_app, db
+    from app.models import User
+
+    app = create_app()
+    app.config.update(WTF_CSRF_ENABLED=False, COMPRESS_ENABLED=False)
+    with app.app_context():
+        db.create_all()
+        for i in range(USERS):
+            user = User(username=f'ci{i}', email=f'ci{i}@example.com')
+            user.set_password('password123')
+            db.session.add(user)
+        db.session.commit()
+    return app
+
+
+def login_worker(app, deadline, stats, lock):
+    """持续登录（不保留会话）"""
+    client = app.test_client()
+    done = rejected = 0
+    i = 0
+    while time.monotonic() < deadline:
+        response = client.post('/auth/login', data={'email': f'ci{i % USERS}@example.com',
+                                                    'password': 'password123'})
+        if response.status_code == 503:
+            rejected += 1
+        else:
+            done += 1
+        client.get('/auth/logout')
+        i += 1
+    with lock:
+        stats['logins'] += done
+        stats['rejected'] += rejected
+
+
+def page_worker(app, deadline, latencies, lock):
+    """持续请求不涉及密码的页面，记录延迟"""
+    client = app.test_client()
+    local = []
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        client.get('/')
+        local.append((time.perf_counter() - start) * 1000)
+    with lock:
+        latencies.extend(local)
+
+
+def run_scenario(app, mode, login_threads, page_threads, seconds):
+    """运行一个场景，返回汇总结果"""
+    from app.services.passwords import EXECUTOR_KEY, BoundedExecutor
+
+    if mode == 'inline':
+        executor = app.extensions.pop(EXECUTOR_KEY, None)
+    else:
+        executor = app.extensions[EXECUTOR_KEY] = BoundedExecutor(
+            app.config['PASSWORD_HASH_WORKERS'], app.config['PASSWORD_HASH_QUEUE'], app.config['PASSWORD_HASH_TIMEOUT'])
+
+    stats = {'logins': 0, 'rejected': 0}
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+    threads = [threading.Thread(target=login_worker, args=(app, deadline, stats, lock))
+               for _ in range(login_threads)]
+    threads += [threading.Thread(target=page_worker, args=(app, deadline, latencies, lock))
+                for _ in range(page_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if mode != 'inline':
+        executor.shutdown()
+
+    latencies.sort()
+    return {
+        'login_ps': stats['logins'] / seconds,
+        'rejected': stats['rejected'],
+        'page_p50': statistics.median(latencies) if latencies else 0,
+        'page_p95': latencies[int(len(latencies) * 0.95)] if latencies else 0,
+        'page_ps': len(latencies) / seconds
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='登录吞吐量基准测试')
+    parser.add_argument('--login-threads', type=int, default=16, help='并发登录线程数')
+    parser.add_argument('--page-threads', type=int, default=4, help='并发页面请求线程数')
+    parser.add_argument('--seconds', type=float, default=5, help='每个场景的运行时间')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = build_app(os.path.join(tmp, 'bench.db'))
+        print(f'{args.login_threads} 个登录线程 + {args.page_threads} 个页面线程，'
+              f'哈希算法 {app.config["PASSWORD_HASHER"]}，线程池 {app.config["PASSWORD_HASH_WORKERS"]} 线程，'
+              f'每个场景 {args.seconds} 秒')
+        print(f'{"场景":<10}{"登录/秒":>10}{"拒绝":>8}{"页面/秒":>10}{"页面p50(ms)":>14}{"页面p95(ms)":>14}')
+        for mode in ('inline', 'bounded'):
+            result = run_scenario(app, mode, args.login_threads, args.page_threads, args.seconds)
+            print(f'{mode:<10}{result["login_ps"]:>10.1f}{result["rejected"]:>8}{result["page_ps"]:>10.1f}'
+                  f'{result["page_p50"]:>14.1f}{result["page_p95"]:>14.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+响应压缩基准测试
+
+在临时SQLite数据库中生成缺陷和测试用例，请求列表页和JSON列表接口，
+对比未压缩、gzip（不同级别）和 brotli（已安装时）的响应大小，
+以及每个请求的压缩CPU耗时。
+
+用法：
+    python benchmarks/response_compression.py [--rows 500] [--repeat 50]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PAGES = (
+    ('缺陷列表页', '/bugs'),
+    ('用例列表页', '/test-cases'),
+    ('缺陷JSON', '/api/bugs?per_page=100'),
+    ('用例JSON', '/api/test-cases?per_page=100')
+)
+
+
+def build_app(path, rows):
+    """创建应用并生成测试数据"""
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    os.environ['CACHE_SQLITE_PATH'] = os.path.join(os.path.dirname(path), 'cache.db')
+    from app import create_app, db
+    from app.models import Bug, TestCase, User
+
+    app = create_app()
+    app.config.update(WTF_CSRF_ENABLED=False, COMPRESS_ENABLED=False)
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com')
+        user.set_password('password123')
+        db.session.add(user)
+        db.session.flush()
+        for i in range(rows):
+            db.session.add(Bug(title=f'基准测试缺陷 {i}：登录页面在弱网环境下提交表单无响应',
+                               description='复现步骤：切换到3G网络后打开登录页，输入账号密码并提交。' * 3,
+                               severity=('critical', 'high', 'medium', 'low')[i % 4], priority='p2',
+                               bug_type='functional', environment='test', created_by=user.id))
+            db.session.add(TestCase(title=f'基准测试用例 {i}：验证登录表单的输入校验',
+                                    description='验证用户名、密码为空或格式错误时的提示信息。',
+                                    steps='1. 打开登录页\n2. 输入无效数据\n3. 点击登录', expected_result='显示错误提示',
+                                    priority='p2', test_type='functional', module='登录模块',
+                                    status='not_run', created_by=user.id))
+        db.session.commit()
+    return app
+
+
+def measure(data, encoding, level, repeat):
+    """压缩后的大小和每次压缩的CPU耗时（毫秒）"""
+    from app.compression import compress
+    start = time.process_time()
+    for _ in range(repeat):
+        compressed = compress(data, encoding, level)
+    return len(compressed), (time.process_time() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='响应压缩基准测试')
+    parser.add_argument('--rows', type=int, default=500, help='生成的缺陷和测试用例数')
+    parser.add_argument('--repeat', type=int, default=50, help='每种编码的压缩次数')
+    args = parser.parse_args()
+
+    from app.compression import available_encodings
+    variants = [('gzip', 1), ('gzip', 6), ('gzip', 9)]
+    if 'br' in available_encodings():
+        variants += [('br', 4), ('br', 11)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = build_app(os.path.join(tmp, 'bench.db'), args.rows)
+        with app.test_client() as client:
+            client.post('/auth/login', data={'email': 'bench@example.com', 'password': 'password123'})
+            print(f'{"页面":<12}{"编码":<10}{"字节":>10}{"节省":>8}{"CPU毫秒/请求":>14}')
+            for name, url in PAGES:
+                data = client.get(url).get_data()
+                print(f'{name:<12}{"identity":<10}{len(data):>10}{"-":>8}{"-":>14}')
+                for encoding, level in variants:
+                    size, cpu_ms = measure(data, encoding, level, args.repeat)
+                    print(f'{"":<12}{f"{encoding}-{level}":<10}{size:>10}{1 - size / len(data):>8.1%}{cpu_ms:>14.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+SQLite并发写入基准测试
+
+模拟 gunicorn --workers 4 --threads 4 的部署方式：多个进程、每个进程多个线程，
+混合执行写事务（插入缺陷并更新状态）和列表统计读查询，分别在默认参数和
+app/config.py 中的调优参数（WAL、busy_timeout、synchronous=NORMAL 等）下运行，
+对比写入吞吐量与 database is locked 错误数。
+
+用法：
+    python benchmarks/sqlite_write_concurrency.py [--workers 4] [--threads 4] [--seconds 5]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import (Column, DateTime, Integer, MetaData, String, Table, Text, create_engine,
+                        func, insert, select, update)
+from sqlalchemy.exc import OperationalError
+
+from app.config import Config
+from app.database import configure_sqlite_engine
+
+metadata = MetaData()
+bug = Table(
+    'bug', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('title', String(200), nullable=False),
+    Column('description', Text),
+    Column('status', String(20), index=True),
+    Column('created_at', DateTime, index=True)
+)
+
+STATUSES = ('new', 'assigned', 'in_progress', 'resolved', 'closed')
+
+# 调整前：与原先硬编码配置一致（驱动默认5秒锁等待、回滚日志模式）
+SCENARIOS = {
+    'default': {'engine_options': {}, 'pragmas': None},
+    'tuned': {'engine_options': {'connect_args': {'timeout': Config.SQLITE_PRAGMAS['busy_timeout'] / 1000}},
+              'pragmas': Config.SQLITE_PRAGMAS}
+}
+
+
+def make_engine(path, scenario):
+    """按场景创建引擎"""
+    config = SCENARIOS[scenario]
+    engine = create_engine(f'sqlite:///{path}', **config['engine_options'])
+    if config['pragmas']:
+        configure_sqlite_engine(engine, config['pragmas'])
+    return engine
+
+
+def worker_thread(engine, deadline, stats, lock):
+    """单个线程：约3/4写事务、1/4读查询"""
+    writes = reads = errors = 0
+    while time.monotonic() < deadline:
+        try:
+            if random.random() < 0.75:
+                with engine.begin() as connection:
+                    new_id = connection.execute(insert(bug).values(
+                        title='并发写入测试缺陷',
+                        description='x' * 500,
+                        status='new',
+                        created_at=datetime.utcnow()
+                    )).inserted_primary_key[0]
+                    connection.execute(
+                        update(bug).where(bug.c.id == new_id).values(status=random.choice(STATUSES))
+                    )
+                writes += 1
+            else:
+                with engine.connect() as connection:
+                    connection.execute(select(bug.c.status, func.count()).group_by(bug.c.status)).all()
+                    connection.execute(
+                        select(bug.c.id, bug.c.title).order_by(bug.c.created_at.desc()).limit(20)
+                    ).all()
+                reads += 1
+        except OperationalError:
+            errors += 1
+    with lock:
+        stats['writes'] += writes
+        stats['reads'] += reads
+        stats['errors'] += errors
+
+
+def worker_process(path, scenario, threads, seconds, queue):
+    """单个进程：启动多个线程并汇总结果"""
+    engine = make_engine(path, scenario)
+    deadline = time.monotonic() + seconds
+    stats = {'writes': 0, 'reads': 0, 'errors': 0}
+    lock = threading.Lock()
+    pool = [threading.Thread(target=worker_thread, args=(engine, deadline, stats, lock))
+            for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    engine.dispose()
+    queue.put(stats)
+
+
+def run_scenario(scenario, workers, threads, seconds):
+    """运行一个场景，返回汇总结果"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        engine = make_engine(path, scenario)
+        metadata.create_all(engine)
+        engine.dispose()
+
+        queue = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=worker_process,
+                                             args=(path, scenario, threads, seconds, queue))
+                     for _ in range(workers)]
+        for process in processes:
+            process.start()
+        results = [queue.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+    total = {key: sum(r[key] for r in results) for key in ('writes', 'reads', 'errors')}
+    total['write_tps'] = total['writes'] / seconds
+    total['read_qps'] = total['reads'] / seconds
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SQLite并发写入基准测试')
+    parser.add_argument('--workers', type=int, default=4, help='进程数')
+    parser.add_argument('--threads', type=int, default=4, help='每个进程的线程数')
+    parser.add_argument('--seconds', type=float, default=5, help='每个场景的运行时间')
+    args = parser.parse_args()
+
+    print(f'{args.workers} 进程 x {args.threads} 线程，每个场景 {args.seconds} 秒')
+    print(f'{"场景":<10}{"写事务/秒":>12}{"读查询/秒":>12}{"锁错误":>10}')
+    for scenario in SCENARIOS:
+        result = run_scenario(scenario, args.workers, args.threads, args.seconds)
+        print(f'{scenario:<10}{result["write_tps"]:>12.1f}{result["read_qps"]:>12.1f}{result["errors"]:>10}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,10 @@
 from app.routes import app 
+from app import db, migrations 
 
 if __name__ == '__main__': 
     print("🚀 启动智能测试平台...") 
+    # 开发服务器启动时自动执行迁移，生产环境请使用 flask db upgrade 
+    with app.app_context(): 
+        migrations.upgrade(db.engine) 
     print("访问地址：http://127.0.0.1:5000") 
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
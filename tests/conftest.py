@@ -1,4 +1,9 @@
+import os
 import pytest
+
+# 测试使用进程内缓存，不读写 instance/cache.db（应用配置在导入 app.config 时读取环境变量）
+os.environ['CACHE_BACKEND'] = 'memory'
+
 from app import create_app, db
 from app.models import User, Bug, TestCase, AIConfig
 from flask_login import login_user
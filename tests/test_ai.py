@@ -0,0 +1,316 @@
+import gc
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import pytest
+from flask import url_for
+from app import db
+from app.models import AIConfig, AIJob, AIResponseCache
+from app.services import ai_clients, ai_jobs, ai_response_cache, ai_stream
+from app.services.ai_stream import JSONFieldExtractor
+from app.services.ai_clients import get_registry
+from app.services.ai_service import AIService
+from app.services.ai_settings import AISettings, get_ai_settings, get_ai_settings_cache
+
+
+def test_ai_clients_reused(app):
+    """测试同一服务商和密钥复用客户端，配置变化后得到新客户端，旧客户端在使用结束后关闭"""
+    with app.app_context():
+        registry = get_registry()
+        first = AIService(api_key='sk-test-1', provider='deepseek').client
+        assert AIService(api_key='sk-test-1', provider='deepseek').client is first
+        assert str(first.base_url).startswith('https://api.deepseek.com/v1')
+
+        second = AIService(api_key='sk-test-2', provider='openai').client
+        assert second is not first
+        assert registry.stats()['clients'] == 2
+
+        registry.retain_only('openai', 'sk-test-2')
+        assert registry.stats()['clients'] == 1 and registry.stats()['retired'] == 1
+        # 仍在使用中的旧客户端（如正在执行的AI任务）不会被关闭
+        assert not first.is_closed() and not second.is_closed()
+        assert AIService(api_key='sk-test-2', provider='openai').client is second
+
+        http_client = first._client
+        del first
+        gc.collect()
+        assert http_client.is_closed
+        assert registry.stats()['retired'] == 0
+
+        registry.close()
+        assert second.is_closed()
+
+
+def test_ai_client_without_app_context_uses_config():
+    """测试没有应用上下文时创建的一次性客户端使用默认的 AI_HTTP_* 配置"""
+    from app.config import Config
+
+    client = ai_clients.get_client('deepseek', 'sk-test')
+    try:
+        assert client.max_retries == Config.AI_HTTP_MAX_RETRIES
+        assert client.timeout.read == Config.AI_HTTP_READ_TIMEOUT
+        assert client.timeout.connect == Config.AI_HTTP_CONNECT_TIMEOUT
+    finally:
+        client.close()
+
+
+@pytest.mark.usefixtures('init_database')
+def test_ai_settings_refresh_by_version(logged_in_client, app):
+    """测试AI配置在进程内缓存，版本戳变化后在检查间隔内刷新，AI接口不查询AI配置"""
+    settings_cache = get_ai_settings_cache()
+    settings_cache.invalidate()
+    assert get_ai_settings() == AISettings('openai', 'test-api-key', False)
+
+    response = logged_in_client.post(url_for('ai.api_improve_bug'), json={'description': '登录按钮无响应'})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'AI功能未启用'
+
+    with app.app_context():
+        AIConfig.query.first().ai_enabled = True
+        db.session.commit()
+    # 检查间隔内仍使用快照
+    assert get_ai_settings().enabled is False
+    settings_cache.check_interval = 0
+    try:
+        assert get_ai_settings() == AISettings('openai', 'test-api-key', True)
+    finally:
+        settings_cache.check_interval = app.config['AI_CONFIG_CHECK_INTERVAL']
+
+
+def _fake_client(calls, content='{"severity": "high", "priority": "p1"}'):
+    """记录调用参数并返回固定结果的客户端"""
+    def create(**kwargs):
+        calls.append(kwargs)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+@pytest.mark.usefixtures('init_database')
+def test_ai_response_cache(app):
+    """测试相同（规范化后）请求命中响应缓存，跳过缓存时仍调用服务商，过期项和超出上限的项被清理"""
+    calls = []
+    with app.app_context():
+        stats = ai_response_cache.get_stats()
+        before = stats.to_dict()
+        service = AIService(api_key='sk-test', provider='deepseek')
+        service.client = _fake_client(calls)
+
+        assert service.classify_bug('登录按钮 无响应')['severity'] == 'high'
+        assert service.classify_bug('登录按钮   无响应  ')['severity'] == 'high'
+        assert len(calls) == 1
+        service.classify_bug('注册页面报错')
+        assert len(calls) == 2
+
+        refresh = AIService(api_key='sk-test', provider='deepseek', bypass_cache=True)
+        refresh.client = service.client
+        refresh.classify_bug('登录按钮 无响应')
+        assert len(calls) == 3
+
+        after = stats.to_dict()
+        assert after['hits'] - before['hits'] == 1
+        assert after['misses'] - before['misses'] == 2
+        assert after['bypassed'] - before['bypassed'] == 1
+        assert after['stores'] - before['stores'] == 3
+
+        assert AIResponseCache.query.count() == 2
+
+        for entry in AIResponseCache.query:
+            entry.expires_at = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+        service.classify_bug('登录按钮 无响应')
+        assert len(calls) == 4
+
+        service.classify_bug('导出文件乱码')
+        app.config['AI_RESPONSE_CACHE_MAX_ENTRIES'] = 1
+        try:
+            ai_response_cache.prune()
+        finally:
+            app.config['AI_RESPONSE_CACHE_MAX_ENTRIES'] = 5000
+        assert AIResponseCache.query.count() == 1
+        assert service.classify_bug('导出文件乱码')['severity'] == 'high'
+        assert len(calls) == 5
+
+
+@pytest.fixture
+def ai_enabled(app, monkeypatch):
+    """启用AI配置，AI服务使用返回固定结果的客户端"""
+    calls = []
+    with app.app_context():
+        AIConfig.query.first().ai_enabled = True
+        db.session.commit()
+    get_ai_settings_cache().invalidate()
+    content = '{"improved_title": "登录按钮点击无响应", "improved_description": "弱网环境下提交登录表单无响应"}'
+    monkeypatch.setattr(ai_clients, 'get_client', lambda provider, api_key: _fake_client(calls, content))
+    yield calls
+    get_ai_settings_cache().invalidate()
+
+
+@pytest.mark.usefixtures('init_database')
+def test_ai_job_eager(logged_in_client, app, ai_enabled):
+    """测试 AI_JOB_WORKERS=0 时任务在请求中执行，返回已完成的任务"""
+    original = app.extensions[ai_jobs.QUEUE_KEY]
+    app.extensions[ai_jobs.QUEUE_KEY] = ai_jobs.AIJobQueue(app, 0, 0)
+    try:
+        response = logged_in_client.post(url_for('ai.api_improve_bug'), json={'description': '登录没反应', 'refresh': True})
+    finally:
+        app.extensions[ai_jobs.QUEUE_KEY] = original
+    assert response.status_code == 202
+    job = response.get_json()
+    assert job['status'] == 'succeeded'
+    assert job['result']['improved_title'] == '登录按钮点击无响应'
+    assert logged_in_client.get(job['status_url']).get_json()['result'] == job['result']
+
+
+@pytest.mark.usefixtures('init_database')
+def test_ai_job_runs_in_background(logged_in_client, app, ai_enabled, monkeypatch):
+    """测试AI任务在线程池中执行：接口立即返回，队列满时拒绝，服务商未返回时页面照常响应"""
+    release = threading.Event()
+    original_run_job = ai_jobs.run_job
+
+    def slow_run_job(*args, **kwargs):
+        release.wait(5)
+        original_run_job(*args, **kwargs)
+
+    monkeypatch.setattr(ai_jobs, 'run_job', slow_run_job)
+    queue = ai_jobs.AIJobQueue(app, 1, 0)
+    original = app.extensions[ai_jobs.QUEUE_KEY]
+    app.extensions[ai_jobs.QUEUE_KEY] = queue
+    try:
+        response = logged_in_client.post(url_for('ai.api_improve_test_case'),
+                                         json={'description': '验证登录表单', 'refresh': True})
+        assert response.status_code == 202
+        job = response.get_json()
+        assert job['status'] == 'queued'
+
+        assert logged_in_client.post(url_for('ai.api_classify_bug'), json={'description': '登录没反应'}).status_code == 503
+        assert logged_in_client.get(url_for('bugs.bug_list')).status_code == 200
+
+        release.set()
+        deadline = time.monotonic() + 5
+        while job['status'] not in ('succeeded', 'failed') and time.monotonic() < deadline:
+            time.sleep(0.05)
+            job = logged_in_client.get(url_for('ai.get_ai_job', job_id=job['id'])).get_json()
+        assert job['status'] == 'succeeded'
+        assert job['result']['improved_title'] == '登录按钮点击无响应'
+        with app.app_context():
+            assert ai_jobs.get_job(job['id'], user_id=2) is None
+    finally:
+        release.set()
+        queue.shutdown()
+        app.extensions[ai_jobs.QUEUE_KEY] = original
+
+
+@pytest.mark.usefixtures('init_database')
+def test_ai_job_timed_out_not_overwritten(app, monkeypatch):
+    """测试执行中的任务被查询标记为超时后，执行线程完成时不再改写为成功"""
+    def timed_out_while_running(service, params):
+        # 模拟客户端在服务商返回前轮询，任务已超过 AI_JOB_STALE_SECONDS
+        monkeypatch.setitem(app.config, 'AI_JOB_STALE_SECONDS', -1)
+        assert ai_jobs.get_job(job_id, user_id=1).status == 'failed'
+        return {'category': 'functional'}
+
+    monkeypatch.setitem(ai_jobs.JOB_KINDS, 'classify_bug', timed_out_while_running)
+    with app.app_context():
+        job = AIJob(kind='classify_bug', params='{"description": "登录没反应"}', created_by=1)
+        db.session.add(job)
+        db.session.commit()
+        job_id = job.id
+
+        ai_jobs.run_job(job_id, AISettings('deepseek', 'sk-test', True))
+        db.session.expire_all()
+        job = db.session.get(AIJob, job_id)
+        assert job.status == 'failed'
+        assert job.error == 'AI任务超时'
+        assert job.result is None
+
+
+def test_json_field_extractor():
+    """测试逐字符输入时每个顶层字段在其值完整时给出，代码块标记和嵌套结构不影响提取"""
+    text = ('```json\n{"improved_title": "登录\\"按钮\\"无响应", "score": 0.9, '
+            '"improved_steps": ["打开{登录}页", ["输入", "提交"]], "meta": {"a": [1, 2]}, "ok": true}\n```')
+    extractor = JSONFieldExtractor()
+    seen = []
+    for index, char in enumerate(text):
+        for name, value in extractor.feed(char):
+            seen.append((name, value, index))
+    assert [(name, value) for name, value, _ in seen] == [
+        ('improved_title', '登录"按钮"无响应'), ('score', 0.9),
+        ('improved_steps', ['打开{登录}页', ['输入', '提交']]), ('meta', {'a': [1, 2]}), ('ok', True)
+    ]
+    # 标题在步骤开始生成之前就已给出
+    assert seen[0][2] < text.index('improved_steps')
+    assert extractor.finished
+
+
+def _sse_events(response):
+    """解析SSE响应为 (事件, 数据) 列表"""
+    events = []
+    body = response.get_data(as_text=True)
+    response.close()  # 关闭响应时释放流式请求名额
+    for block in body.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+@pytest.mark.usefixtures('init_database')
+def test_improve_test_case_stream(logged_in_client, app, ai_enabled, monkeypatch):
+    """测试流式接口按字段推送事件，结果写入响应缓存，名额用尽时返回503"""
+    content = '{"improved_title": "验证登录", "improved_steps": ["打开登录页", "点击登录"], "suggested_priority": "p1"}'
+    calls = []
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        assert kwargs['stream'] is True
+        return [SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content[i:i + 7]))])
+                for i in range(0, len(content), 7)]
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(ai_clients, 'get_client', lambda provider, api_key: client)
+
+    response = logged_in_client.post(url_for('ai.api_improve_test_case_stream'),
+                                     json={'description': '验证登录表单', 'refresh': True})
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    events = _sse_events(response)
+    assert [payload['name'] for event, payload in events if event == 'field'] == \
+        ['improved_title', 'improved_steps', 'suggested_priority']
+    event, result = events[-1]
+    assert event == 'done'
+    assert result['improved_steps'] == ['打开登录页', '点击登录']
+    assert result['improved_expected_result']  # 缺少的字段已补全
+
+    # 相同请求命中响应缓存，不再调用服务商
+    response = logged_in_client.post(url_for('ai.api_improve_test_case_stream'), json={'description': '验证登录表单'})
+    assert _sse_events(response)[-1] == ('done', result)
+    assert len(calls) == 1
+
+    slots = ai_stream.get_slots()
+    for _ in range(app.config['AI_STREAM_MAX_CONCURRENT']):
+        assert slots.acquire(blocking=False)
+    try:
+        response = logged_in_client.post(url_for('ai.api_improve_test_case_stream'), json={'description': '验证登录表单'})
+        assert response.status_code == 503
+    finally:
+        for _ in range(app.config['AI_STREAM_MAX_CONCURRENT']):
+            slots.release()
+
+
+@pytest.mark.usefixtures('init_database')
+def test_stream_slot_not_leaked_when_service_fails(logged_in_client, app, ai_enabled, monkeypatch):
+    """测试创建AI服务失败时不占用流式名额"""
+    def broken_service(**kwargs):
+        raise RuntimeError('AI服务不可用')
+
+    monkeypatch.setattr('app.ai.AIService', broken_service)
+    for _ in range(app.config['AI_STREAM_MAX_CONCURRENT'] + 1):
+        with pytest.raises(RuntimeError):
+            logged_in_client.post(url_for('ai.api_improve_bug_stream'), json={'description': '登录没反应'})
+
+    slots = ai_stream.get_slots()
+    for _ in range(app.config['AI_STREAM_MAX_CONCURRENT']):
+        assert slots.acquire(blocking=False)
+    for _ in range(app.config['AI_STREAM_MAX_CONCURRENT']):
+        slots.release()
@@ -1,5 +1,8 @@
 import pytest
 from flask import url_for
+from app import db
+from app.models import Bug, TestCase, User
+from app.services import stats_service
 
 
 @pytest.mark.usefixtures('init_database')
@@ -104,3 +107,269 @@ def test_main_pages(client):
     # 假设没有关于页面，返回404
     response = client.get('/about')
     assert response.status_code == 404
+
+
+@pytest.mark.usefixtures('init_database')
+def test_fulltext_search_api(logged_in_client):
+    """测试全文检索API按相关度返回并高亮关键词"""
+    response = logged_in_client.get(url_for('main.api_search', q='缺陷2', type='bug'))
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [r['id'] for r in results] == [2]
+    assert '<mark>' in results[0]['title_highlight']
+    
+    response = logged_in_client.get(url_for('main.api_search', q='注册', type='test_case'))
+    results = response.get_json()['results']
+    assert [r['id'] for r in results] == [2]
+    
+    # 不支持的检索类型
+    response = logged_in_client.get(url_for('main.api_search', q='缺陷', type='user'))
+    assert response.status_code == 400
+
+
+@pytest.mark.usefixtures('init_database')
+def test_fulltext_search_single_character(logged_in_client, app):
+    """测试单个汉字能检索到只出现在词尾的字"""
+    from app import db
+    from app.models import Bug
+    with app.app_context():
+        db.session.add(Bug(title='用户登录失败', description='输入正确密码后提示错误', created_by=1))
+        db.session.commit()
+
+    response = logged_in_client.get(url_for('main.api_search', q='败', type='bug'))
+    assert [r['title'] for r in response.get_json()['results']] == ['用户登录失败']
+
+    response = logged_in_client.get(url_for('bugs.bug_list', keyword='败'))
+    assert '用户登录失败' in response.get_data(as_text=True)
+
+
+@pytest.mark.usefixtures('init_database')
+def test_bug_list_api_cursor_pagination(logged_in_client, app):
+    """测试缺陷列表API的游标分页"""
+    from datetime import datetime, timedelta
+    from app import db
+    from app.models import Bug
+    
+    with app.app_context():
+        base = datetime(2024, 1, 1)
+        for i in range(5):
+            db.session.add(Bug(title=f'分页缺陷{i}', description='分页测试缺陷描述',
+                               created_by=1, created_at=base + timedelta(minutes=i)))
+        db.session.commit()
+    
+    # 逐页向后翻页，收集所有记录
+    seen = []
+    cursor = None
+    while True:
+        response = logged_in_client.get(url_for('bugs.list_bugs_json', per_page=3, cursor=cursor))
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['pagination']['total'] == 7
+        seen.extend(item['id'] for item in data['items'])
+        cursor = data['pagination']['next_cursor']
+        if not cursor:
+            break
+    
+    assert len(seen) == 7
+    assert len(set(seen)) == 7
+    
+    # 从最后一页向前翻页
+    response = logged_in_client.get(url_for('bugs.list_bugs_json', per_page=3,
+                                            cursor=data['pagination']['prev_cursor']))
+    prev_ids = [item['id'] for item in response.get_json()['items']]
+    assert prev_ids == seen[3:6]
+    
+    # 无效游标返回第一页
+    response = logged_in_client.get(url_for('bugs.list_bugs_json', per_page=3, cursor='invalid'))
+    assert [item['id'] for item in response.get_json()['items']] == seen[:3]
+
+
+@pytest.mark.usefixtures('init_database')
+def test_test_case_list_api_filters(logged_in_client):
+    """测试测试用例列表API与列表页使用相同的筛选条件"""
+    response = logged_in_client.get(url_for('test_cases.list_test_cases_json', status='passed'))
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [item['id'] for item in data['items']] == [2]
+    assert data['pagination']['total'] == 1
+    
+    # 无法从计数器获得的筛选条件默认不统计总数
+    response = logged_in_client.get(url_for('test_cases.list_test_cases_json', module='登录'))
+    data = response.get_json()
+    assert [item['id'] for item in data['items']] == [1]
+    assert data['pagination']['total'] is None
+    
+    response = logged_in_client.get(url_for('test_cases.list_test_cases_json', module='登录', with_count=1))
+    assert response.get_json()['pagination']['total'] == 1
+
+
+@pytest.mark.usefixtures('init_database')
+def test_query_budget_exceeded(app):
+    """测试视图超出查询预算时在测试环境中抛出异常"""
+    from flask import request_started
+    from app.models import User
+    from app.services.query_budget import query_budget, QueryBudgetExceeded
+    
+    @query_budget(1)
+    def chatty_view():
+        User.query.count()
+        User.query.count()
+        return 'ok'
+    
+    with app.test_request_context('/'):
+        request_started.send(app)
+        with pytest.raises(QueryBudgetExceeded):
+            chatty_view()
+
+
+@pytest.mark.usefixtures('init_database')
+def test_typeahead_apis(logged_in_client):
+    """测试缺陷和用户的输入联想API"""
+    response = logged_in_client.get(url_for('bugs.bug_typeahead', q='测试缺陷'))
+    assert response.status_code == 200
+    assert [item['id'] for item in response.get_json()['items']] == [1, 2]
+    
+    # 按编号查找时精确匹配的缺陷排在最前面
+    response = logged_in_client.get(url_for('bugs.bug_typeahead', q='#2'))
+    assert [item['id'] for item in response.get_json()['items']] == [2]
+    
+    response = logged_in_client.get(url_for('bugs.bug_typeahead', q='测试缺陷', limit=1))
+    assert len(response.get_json()['items']) == 1
+    
+    # 超出整数范围的数字和非ASCII数字不按编号查找
+    for keyword in ('#' + '9' * 30, str(2 ** 63), '²'):
+        response = logged_in_client.get(url_for('bugs.bug_typeahead', q=keyword))
+        assert response.status_code == 200
+        assert response.get_json()['items'] == []
+    
+    response = logged_in_client.get(url_for('bugs.user_typeahead', q='testuser'))
+    assert [item['username'] for item in response.get_json()['items']] == ['testuser1', 'testuser2']
+    
+    response = logged_in_client.get(url_for('bugs.user_typeahead', q='nobody'))
+    assert response.get_json()['items'] == []
+
+
+@pytest.mark.usefixtures('init_database')
+def test_bulk_update_bugs_status_and_closed_at(logged_in_client, app):
+    """测试批量关闭、重新打开缺陷时维护关闭时间和状态计数"""
+    with app.app_context():
+        ids = [bug.id for bug in Bug.query.all()]
+
+    response = logged_in_client.post(url_for('bugs.bulk_update_bugs'),
+                                     json={'ids': ids + [9999], 'status': 'closed', 'severity': 'low'})
+    assert response.status_code == 200
+    assert response.get_json() == {'requested': 3, 'updated': 2}
+
+    with app.app_context():
+        bugs = Bug.query.all()
+        assert all(bug.status == 'closed' and bug.severity == 'low' and bug.closed_at for bug in bugs)
+        counts = stats_service.get_status_counts('bug')
+        assert counts.get('closed') == 2 and counts.get('new', 0) == 0
+
+    logged_in_client.post(url_for('bugs.bulk_update_bugs'), json={'ids': ids[:1], 'status': 'reopened'})
+    with app.app_context():
+        reopened = db.session.get(Bug, ids[0])
+        assert reopened.status == 'reopened' and reopened.closed_at is None
+        assert db.session.get(Bug, ids[1]).closed_at is not None
+
+
+@pytest.mark.usefixtures('init_database')
+def test_bulk_update_assignment_and_validation(logged_in_client, app):
+    """测试批量分配处理人及参数校验"""
+    with app.app_context():
+        ids = [bug.id for bug in Bug.query.all()]
+        assignee_id = User.query.filter_by(username='testuser2').first().id
+
+    response = logged_in_client.post(url_for('bugs.bulk_update_bugs'), json={'ids': ids, 'assigned_to': assignee_id})
+    assert response.get_json()['updated'] == 2
+    with app.app_context():
+        assert {bug.assigned_to for bug in Bug.query.all()} == {assignee_id}
+
+    for payload in ({'ids': ids, 'status': 'bogus'}, {'ids': [], 'status': 'closed'},
+                    {'ids': ids}, {'ids': ids, 'assigned_to': 9999}):
+        assert logged_in_client.post(url_for('bugs.bulk_update_bugs'), json=payload).status_code == 400
+
+
+@pytest.mark.usefixtures('init_database')
+def test_bulk_update_test_case_status(logged_in_client, app):
+    """测试批量记录测试用例执行结果"""
+    with app.app_context():
+        ids = [test_case.id for test_case in TestCase.query.all()]
+
+    response = logged_in_client.post(url_for('test_cases.bulk_update_test_cases'),
+                                     json={'ids': ids, 'status': 'failed'})
+    assert response.get_json() == {'requested': 2, 'updated': 2}
+    with app.app_context():
+        counts = stats_service.get_status_counts('test_case')
+        assert counts['failed'] == 2 and counts.get('passed', 0) == 0
+
+
+@pytest.mark.usefixtures('init_database')
+def test_sparse_fieldsets(logged_in_client, app):
+    """测试 fields 参数只返回并只查询请求的字段，关联字段仅在请求时连接查询"""
+    from sqlalchemy import event
+    
+    statements = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = logged_in_client.get(url_for('bugs.list_bugs_json', fields='id,status,severity', severity='high'))
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    
+    assert response.get_json()['items'] == [{'id': 2, 'status': 'new', 'severity': 'high'}]
+    bug_query = next(statement for statement in statements if 'FROM bug' in statement and 'severity' in statement)
+    assert 'description' not in bug_query
+    assert 'JOIN' not in bug_query
+    
+    response = logged_in_client.get(url_for('bugs.get_bug_json', bug_id=2, fields='title,creator_name'))
+    assert response.get_json() == {'title': '测试缺陷2', 'creator_name': 'testuser2'}
+    
+    response = logged_in_client.get(url_for('test_cases.get_test_case_json', test_case_id=1, fields='module,bug_count'))
+    assert response.get_json() == {'module': '登录模块', 'bug_count': 0}
+    
+    response = logged_in_client.get(url_for('test_cases.list_test_cases_json', fields='id,password'))
+    assert response.status_code == 400
+    assert logged_in_client.get(url_for('bugs.get_bug_json', bug_id=999)).status_code == 404
+
+
+@pytest.mark.usefixtures('init_database')
+def test_conditional_get(logged_in_client):
+    """测试 ETag / Last-Modified 条件请求：数据未变化时返回304，变化后返回新内容"""
+    url = url_for('bugs.get_bug_json', bug_id=1)
+    response = logged_in_client.get(url)
+    etag, last_modified = response.headers['ETag'], response.headers['Last-Modified']
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+    
+    response = logged_in_client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert logged_in_client.get(url, headers={'If-Modified-Since': last_modified}).status_code == 304
+    
+    # 不同字段集的响应使用不同的ETag
+    response = logged_in_client.get(url_for('bugs.get_bug_json', bug_id=1, fields='id,status'),
+                                    headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    
+    logged_in_client.post(url_for('bugs.bulk_update_bugs'), json={'ids': [1], 'status': 'fixed'})
+    response = logged_in_client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    
+    # 测试用例的版本包含关联缺陷集合
+    url = url_for('test_cases.get_test_case_bugs', test_case_id=1)
+    etag = logged_in_client.get(url).headers['ETag']
+    assert logged_in_client.get(url, headers={'If-None-Match': etag}).status_code == 304
+    logged_in_client.post(url_for('test_cases.batch_link_bugs'),
+                          json={'test_case_ids': [1], 'bug_ids': [2]})
+    response = logged_in_client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['bugs'][0]['id'] == 2
+    
+    assert logged_in_client.get(url_for('bugs.bug_detail', bug_id=999)).status_code == 404
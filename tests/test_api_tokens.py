@@ -0,0 +1,63 @@
+import pytest
+from flask import g, url_for
+from app import db
+from app.models import ApiToken
+from app.services import token_service
+
+
+def _anonymous(app):
+    """不带会话Cookie的客户端（测试中请求共用应用上下文，需清除已加载的用户）"""
+    g.pop('_login_user', None)
+    return app.test_client()
+
+
+@pytest.mark.usefixtures('init_database')
+def test_token_lifecycle(logged_in_client, app):
+    """测试令牌只返回一次明文、只保存哈希，携带令牌无需会话即可调用接口，撤销后失效"""
+    response = logged_in_client.post(url_for('api_tokens.create_api_token'), json={'name': 'CI', 'expires_in_days': 30})
+    assert response.status_code == 201
+    data = response.get_json()
+    raw = data['token']
+    assert raw.startswith(token_service.TOKEN_PREFIX) and raw.startswith(data['prefix'])
+    with app.app_context():
+        token = db.session.get(ApiToken, data['id'])
+        assert token.token_hash == token_service.hash_token(raw) != raw
+
+    listed = logged_in_client.get(url_for('api_tokens.list_api_tokens')).get_json()['items']
+    assert [item['id'] for item in listed] == [data['id']]
+    assert 'token' not in listed[0]
+
+    assert logged_in_client.post(url_for('api_tokens.create_api_token'), json={'name': ' '}).status_code == 400
+
+    client = _anonymous(app)
+    headers = {'Authorization': f'Bearer {raw}'}
+    response = client.get(url_for('bugs.list_bugs_json'), headers=headers)
+    assert response.status_code == 200
+    assert 'Set-Cookie' not in response.headers
+    assert client.get(url_for('bugs.list_bugs_json'), headers={'Authorization': 'Bearer stp_invalid'}).status_code == 401
+    # 令牌只用于 /api/ 接口
+    g.pop('_login_user', None)
+    assert client.get(url_for('bugs.bug_list'), headers=headers).status_code == 302
+
+    g.pop('_login_user', None)
+    assert logged_in_client.delete(url_for('api_tokens.revoke_api_token', token_id=data['id'])).status_code == 200
+    g.pop('_login_user', None)
+    assert client.get(url_for('bugs.list_bugs_json'), headers=headers).status_code == 401
+
+
+@pytest.mark.usefixtures('init_database')
+def test_token_requests_skip_csrf(app):
+    """测试携带令牌的写请求不检查CSRF，会话请求仍然检查"""
+    with app.app_context():
+        token, raw = token_service.create_token(1, 'CI')
+    app.config['WTF_CSRF_ENABLED'] = True
+    try:
+        client = _anonymous(app)
+        response = client.post(url_for('test_runs.create_test_run'), json={'name': '夜间回归'},
+                               headers={'Authorization': f'Bearer {raw}'})
+        assert response.status_code == 201
+        g.pop('_login_user', None)
+        response = client.post(url_for('test_runs.create_test_run'), json={'name': '夜间回归'})
+        assert response.status_code == 400
+    finally:
+        app.config['WTF_CSRF_ENABLED'] = False
@@ -1,5 +1,6 @@
 import pytest
 from flask import url_for
+from app import db
 
 
 def test_register_page(client):
@@ -129,3 +130,72 @@ def test_protected_page_access(client):
     assert response.status_code == 200
     # 检查是否重定向到登录页面
     assert url_for('auth.login') in response.request.url
+
+
+@pytest.mark.usefixtures('init_database')
+def test_user_loader_cached(logged_in_client, app):
+    """测试用户加载命中缓存时不查询数据库，用户修改后重新加载"""
+    from app.models import User
+    from app.services.identity import get_identity_cache, load_identity
+
+    with app.app_context():
+        user_id = User.query.filter_by(username='testuser1').first().id
+        stats = get_identity_cache().stats()
+        assert load_identity(user_id).username == 'testuser1'
+        assert load_identity(user_id).username == 'testuser1'
+        assert load_identity(999) is None
+
+        user = db.session.get(User, user_id)
+        user.username = 'renamed_user'
+        db.session.commit()
+        assert load_identity(user_id).username == 'renamed_user'
+
+    after = get_identity_cache().stats()
+    assert after['hits'] == stats['hits'] + 1
+    assert after['misses'] == stats['misses'] + 3
+
+    metrics = logged_in_client.get('/api/metrics').get_json()['user_loader']
+    assert metrics['hits'] == after['hits'] and 0 < metrics['hit_rate'] < 1
+
+
+@pytest.mark.usefixtures('init_database')
+def test_password_rehashed_on_login(client, app):
+    """测试旧算法（PBKDF2）生成的哈希在登录成功后升级为当前配置的算法"""
+    from werkzeug.security import generate_password_hash
+    from app.models import User
+
+    with app.app_context():
+        user = User.query.filter_by(email='test2@example.com').first()
+        user.password_hash = generate_password_hash('password123', method='pbkdf2:sha256:1000')
+        db.session.commit()
+
+    response = client.post(url_for('auth.login'), data={'email': 'test2@example.com', 'password': 'wrong'})
+    assert '邮箱或密码错误' in response.get_data(as_text=True)
+    response = client.post(url_for('auth.login'), data={'email': 'test2@example.com', 'password': 'password123'})
+    assert response.status_code == 302
+
+    with app.app_context():
+        user = User.query.filter_by(email='test2@example.com').first()
+        assert user.password_hash.startswith('scrypt:')
+        assert user.check_password('password123')
+        assert not user.password_needs_rehash()
+
+
+def test_password_executor_rejects_when_full():
+    """测试哈希线程池等待的任务已满时立即拒绝"""
+    import threading
+    from app.services.passwords import BoundedExecutor, PasswordHasherBusy
+
+    release = threading.Event()
+    executor = BoundedExecutor(workers=1, queue_size=0, timeout=5)
+    worker = threading.Thread(target=executor.run, args=(release.wait,))
+    worker.start()
+    try:
+        with pytest.raises(PasswordHasherBusy):
+            for _ in range(100):
+                executor.run(lambda: None)
+    finally:
+        release.set()
+        worker.join()
+    assert executor.run(lambda: 42) == 42
+    executor.shutdown()
@@ -175,3 +175,42 @@ def test_assign_bug(logged_in_client, app):
     with app.app_context():
         bug = Bug.query.get(2)
         assert bug.assigned_to is None
+
+
+@pytest.mark.usefixtures('init_database')
+def test_assign_bug_by_typed_username(logged_in_client, app):
+    """测试没有选中候选项时按输入的用户名分配，未知用户名不会取消原有分配"""
+    response = logged_in_client.post(url_for('bugs.assign_bug', bug_id=2), data={
+        'assignee_id': '', 'assignee_name': 'testuser2'
+    }, follow_redirects=True)
+    assert response.status_code == 200
+    with app.app_context():
+        assert Bug.query.get(2).assigned_to == 2
+
+    logged_in_client.post(url_for('bugs.assign_bug', bug_id=2), data={
+        'assignee_id': '', 'assignee_name': 'testuser'
+    })
+    with app.app_context():
+        assert Bug.query.get(2).assigned_to == 2
+
+
+@pytest.mark.usefixtures('init_database')
+def test_bug_list_keyword_search(logged_in_client, app):
+    """测试缺陷列表关键词检索（全文索引随编辑同步）"""
+    response = logged_in_client.get(url_for('bugs.bug_list', keyword='另一个'))
+    assert response.status_code == 200
+    html = response.data.decode('utf-8')
+    assert '测试缺陷2' in html
+    assert '测试缺陷1' not in html
+    
+    # 编辑后新内容可以被检索到
+    logged_in_client.post(url_for('bugs.edit_bug', bug_id=1), data={
+        'title': '支付页面超时缺陷',
+        'description': '点击支付按钮后页面长时间无响应',
+        'severity': 'high',
+        'priority': 'p1',
+        'bug_type': 'performance',
+        'environment': 'production'
+    })
+    response = logged_in_client.get(url_for('bugs.bug_list', keyword='超时'))
+    assert '支付页面超时缺陷' in response.data.decode('utf-8')
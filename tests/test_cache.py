@@ -0,0 +1,134 @@
+import pytest
+from flask import url_for
+from app import db
+from app.models import Bug
+from app.services.cache import MemoryCache, SQLiteCache
+from app.services.query_budget import get_query_count
+
+
+def test_memory_cache_lru_and_ttl():
+    """测试进程内缓存按最近使用淘汰，过期项不再返回"""
+    backend = MemoryCache(max_entries=2, default_ttl=60)
+    backend.set('a', 1)
+    backend.set('b', 2)
+    assert backend.get('a') == 1
+    backend.set('c', 3)
+    assert backend.get('b') is None
+    assert backend.get('a') == 1 and backend.get('c') == 3
+
+    backend.set('d', 4, ttl=-1)
+    assert backend.get('d', 'missing') == 'missing'
+
+    generation = backend.generation('bug')
+    backend.bump('bug')
+    assert backend.generation('bug') != generation
+
+
+def test_sqlite_cache_shared_between_instances(tmp_path):
+    """测试SQLite缓存文件在多个实例（工作进程）之间共享，代号更换对所有实例可见"""
+    path = str(tmp_path / 'cache.db')
+    first, second = SQLiteCache(path), SQLiteCache(path)
+
+    first.set('key', {'ids': [3, 2, 1]})
+    assert second.get('key') == {'ids': [3, 2, 1]}
+
+    generation = second.generation('bug')
+    assert first.generation('bug') == generation
+    first.bump('bug')
+    assert second.generation('bug') != generation
+
+    pruned = SQLiteCache(path, max_entries=1)
+    pruned.set('other', 1)
+    pruned.prune()
+    assert pruned.get('key') is None and pruned.get('other') == 1
+
+
+def test_sqlite_cache_reads_do_not_need_write_lock(tmp_path):
+    """测试其他进程持有缓存文件写锁时，读取仍能命中，写入放弃而不报错"""
+    import sqlite3
+
+    path = str(tmp_path / 'cache.db')
+    backend = SQLiteCache(path, timeout=0.1)
+    backend.set('key', 1)
+    backend.TOUCH_INTERVAL = -1
+
+    locker = sqlite3.connect(path, isolation_level=None)
+    locker.execute('BEGIN IMMEDIATE')
+    try:
+        assert backend.get('key') == 1
+        backend.set('other', 2)
+        assert backend.get('other') is None
+    finally:
+        locker.execute('ROLLBACK')
+        locker.close()
+
+    backend.set('other', 2)
+    assert backend.get('other') == 2
+
+
+@pytest.mark.usefixtures('init_database')
+def test_list_cache_invalidated_by_writes(logged_in_client, app):
+    """测试列表页命中缓存时少执行查询，缺陷写入提交后缓存失效"""
+    url = url_for('bugs.list_bugs_json', severity='high')
+    first = logged_in_client.get(url)
+    first_count = get_query_count()
+    second = logged_in_client.get(url)
+    assert second.get_json() == first.get_json()
+    assert get_query_count() < first_count
+
+    with app.app_context():
+        bug = db.session.get(Bug, 1)
+        bug.severity = 'high'
+        db.session.commit()
+
+    response = logged_in_client.get(url)
+    assert [item['id'] for item in response.get_json()['items']] == [2, 1]
+
+    logged_in_client.post(url_for('bugs.bulk_update_bugs'), json={'ids': [1, 2], 'status': 'fixed'})
+    response = logged_in_client.get(url_for('bugs.list_bugs_json', status='fixed'))
+    assert response.get_json()['pagination']['total'] == 2
+
+
+def test_generations_bumped_on_create_and_migrate(app, tmp_path):
+    """测试建表和执行迁移后更换全部代号，重建的数据库不会读到旧缓存"""
+    from sqlalchemy import create_engine
+    from app import migrations
+    from app.services import cache
+
+    with app.app_context():
+        backend = cache.get_cache()
+        generation = backend.generation('bug')
+        db.create_all()
+        assert backend.generation('bug') != generation
+
+        generation = backend.generation('user')
+        engine = create_engine(f'sqlite:///{tmp_path / "restored.db"}')
+        migrations.upgrade(engine)
+        assert backend.generation('user') != generation
+
+        # 没有待执行的迁移时同样更换
+        generation = backend.generation('user')
+        assert migrations.upgrade(engine) == []
+        assert backend.generation('user') != generation
+        engine.dispose()
+
+
+@pytest.mark.usefixtures('init_database')
+def test_page_cached_under_generation_read_before_query(app):
+    """测试查询期间有写入更换代号时，本页结果不会写入新代号下"""
+    from app.services import cache
+    from app.services.pagination import cached_keyset_paginate
+
+    with app.app_context():
+        backend = cache.get_cache()
+        new_key = {}
+
+        def total():
+            # 模拟查询期间另一个请求的写入提交后更换代号
+            backend.bump('bug')
+            new_key['key'] = cache.make_key(backend, 'bug', ('page', 'race', None, 10))
+            return Bug.query.count()
+
+        page = cached_keyset_paginate(Bug.query, Bug, 'bug', 'race', per_page=10, total=total)
+        assert page.total == 2
+        assert backend.get(new_key['key']) is None
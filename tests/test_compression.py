@@ -0,0 +1,65 @@
+import gzip
+import zlib
+import pytest
+from flask import url_for
+from app.compression import available_encodings, choose_encoding, compress_stream
+from werkzeug.datastructures import Accept
+from werkzeug.http import parse_accept_header
+
+
+@pytest.mark.usefixtures('init_database')
+def test_gzip_html_and_json(logged_in_client):
+    """测试按 Accept-Encoding 压缩HTML和JSON响应，未声明时不压缩"""
+    plain = logged_in_client.get(url_for('bugs.bug_list'))
+    assert 'Content-Encoding' not in plain.headers
+    assert 'Accept-Encoding' in plain.headers['Vary']
+
+    response = logged_in_client.get(url_for('bugs.bug_list'), headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert int(response.headers['Content-Length']) == len(response.data) < len(plain.data)
+    assert gzip.decompress(response.data) == plain.data
+
+    response = logged_in_client.get(url_for('bugs.list_bugs_json'), headers={'Accept-Encoding': 'gzip;q=0'})
+    assert 'Content-Encoding' not in response.headers
+
+
+@pytest.mark.usefixtures('init_database')
+def test_small_responses_not_compressed(logged_in_client, app):
+    """测试小于阈值的响应不压缩，压缩后的ETag为弱ETag且条件请求仍然有效"""
+    url = url_for('bugs.get_bug_json', bug_id=1)
+    response = logged_in_client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+
+    app.config['COMPRESS_MIN_SIZE'] = 0
+    try:
+        response = logged_in_client.get(url, headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.headers['ETag'].startswith('W/')
+        response = logged_in_client.get(url, headers={'Accept-Encoding': 'gzip',
+                                                      'If-None-Match': response.headers['ETag']})
+        assert response.status_code == 304
+    finally:
+        app.config['COMPRESS_MIN_SIZE'] = 500
+
+
+@pytest.mark.usefixtures('init_database')
+def test_streamed_export_compressed(logged_in_client):
+    """测试流式导出逐块压缩"""
+    plain = logged_in_client.get(url_for('bugs.export_bugs', format='ndjson')).data
+    response = logged_in_client.get(url_for('bugs.export_bugs', format='ndjson'),
+                                    headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    assert gzip.decompress(response.data) == plain
+
+
+def test_choose_encoding_and_stream_flush():
+    """测试编码协商，以及流式压缩每块都可以立即解压"""
+    accept = parse_accept_header('gzip;q=0.5, br, identity', Accept)
+    expected = 'br' if 'br' in available_encodings() else 'gzip'
+    assert choose_encoding(accept, available_encodings()) == expected
+    assert choose_encoding(parse_accept_header('deflate', Accept), available_encodings()) is None
+
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    stream = compress_stream(iter(['{"type": "progress"}\n', '{"type": "result"}\n']), 'gzip', 6)
+    assert decompressor.decompress(next(stream)) == b'{"type": "progress"}\n'
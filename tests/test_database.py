@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy import create_engine
+from app.config import engine_options, normalize_uri
+from app.database import configure_sqlite_engine
+
+
+def test_normalize_uri_rewrites_postgres_scheme():
+    """测试 postgres:// 改写为 SQLAlchemy 识别的 postgresql://"""
+    assert normalize_uri('postgres://u:p@db:5432/app') == 'postgresql://u:p@db:5432/app'
+    assert normalize_uri('postgresql://u:p@db/app') == 'postgresql://u:p@db/app'
+    assert normalize_uri('sqlite:///test_platform.db') == 'sqlite:///test_platform.db'
+    assert normalize_uri(None) is None
+
+
+def test_engine_options_for_memory_database():
+    """测试SQLite内存数据库不设置连接池参数"""
+    assert engine_options('sqlite:///:memory:') == {}
+    assert engine_options('sqlite://') == {}
+
+
+def test_engine_options_for_file_database(monkeypatch):
+    """测试文件数据库的连接池参数和驱动层锁等待时间"""
+    monkeypatch.setenv('DB_POOL_SIZE', '7')
+    monkeypatch.setenv('DB_READ_POOL_SIZE', '3')
+    monkeypatch.setenv('SQLITE_BUSY_TIMEOUT_MS', '2500')
+
+    options = engine_options('sqlite:///app.db')
+    assert options['pool_size'] == 7
+    assert options['pool_pre_ping'] is False
+    assert options['connect_args'] == {'timeout': 2.5}
+    assert engine_options('sqlite:///app.db', prefix='DB_READ')['pool_size'] == 3
+    assert engine_options('postgresql://db/app')['pool_pre_ping'] is True
+
+
+@pytest.fixture(scope='function')
+def file_engine(tmp_path):
+    """临时SQLite文件数据库引擎"""
+    engine = create_engine(f'sqlite:///{tmp_path / "pragmas.db"}')
+    yield engine
+    engine.dispose()
+
+
+def test_sqlite_pragmas_applied_to_file_database(app, file_engine):
+    """测试文件数据库的新连接使用WAL并设置配置的 busy_timeout"""
+    pragmas = dict(app.config['SQLITE_PRAGMAS'], busy_timeout=1234)
+    configure_sqlite_engine(file_engine, pragmas)
+
+    with file_engine.connect() as connection:
+        assert connection.exec_driver_sql('PRAGMA journal_mode').scalar() == 'wal'
+        assert connection.exec_driver_sql('PRAGMA busy_timeout').scalar() == 1234
+        assert connection.exec_driver_sql('PRAGMA synchronous').scalar() == 1  # NORMAL
+
+
+def test_sqlite_pragmas_skip_wal_for_memory_database(app):
+    """测试内存数据库跳过 journal_mode，其余参数照常设置"""
+    engine = create_engine('sqlite:///:memory:')
+    configure_sqlite_engine(engine, dict(app.config['SQLITE_PRAGMAS'], busy_timeout=1234))
+
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql('PRAGMA journal_mode').scalar() == 'memory'
+        assert connection.exec_driver_sql('PRAGMA busy_timeout').scalar() == 1234
+    engine.dispose()
@@ -0,0 +1,152 @@
+import csv
+import io
+import json
+import pytest
+from flask import url_for
+from app import db
+from app.models import Bug, TestCase
+from app.services import import_service, search_service, stats_service
+
+CSV_HEADER = 'title,description,steps,expected_result,priority,test_type,module,status\n'
+
+
+def _read_lines(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines() if line]
+
+
+@pytest.mark.usefixtures('init_database')
+def test_import_test_cases_csv(logged_in_client, app):
+    """测试CSV导入：合法行分批写入，非法行报告行号和错误"""
+    content = CSV_HEADER
+    for i in range(5):
+        content += f'导入测试用例{i},这是一个批量导入的测试用例,1. 打开页面,页面正常,p1,smoke,导入模块,passed\n'
+    content += '短,描述太短,,结果,p9,smoke,导入模块,passed\n'
+
+    response = logged_in_client.post(
+        url_for('test_cases.import_test_cases', batch_size=2),
+        data={'file': (io.BytesIO(content.encode('utf-8-sig')), 'cases.csv')},
+        content_type='multipart/form-data'
+    )
+    assert response.status_code == 200
+    lines = _read_lines(response)
+    assert [line['type'] for line in lines[:-1]] == ['progress'] * (len(lines) - 1)
+
+    result = lines[-1]
+    assert result['type'] == 'result'
+    assert result['processed'] == 6
+    assert result['imported'] == 5
+    assert result['failed'] == 1
+    assert result['errors'][0]['row'] == 7
+    assert set(result['errors'][0]['errors']) >= {'title', 'description', 'steps', 'priority'}
+
+    with app.app_context():
+        assert TestCase.query.filter(TestCase.module == '导入模块').count() == 5
+        counts = stats_service.get_status_counts('test_case')
+        assert counts['total'] == 7
+        assert counts['passed'] == 6
+        assert search_service.search('test_case', '批量导入')
+
+
+@pytest.mark.usefixtures('init_database')
+def test_import_bugs_ndjson_body(logged_in_client, app):
+    """测试以请求体发送NDJSON导入缺陷，未提供的下拉字段使用默认值"""
+    lines = [
+        json.dumps({'title': '导入的缺陷标题', 'description': '这是一个导入的缺陷描述'}, ensure_ascii=False),
+        '{broken json',
+        ''
+    ]
+    response = logged_in_client.post(
+        url_for('bugs.import_bugs', format='ndjson'),
+        data='\n'.join(lines).encode('utf-8'),
+        content_type='application/x-ndjson'
+    )
+    result = _read_lines(response)[-1]
+    assert result['imported'] == 1
+    assert result['errors'][0]['row'] == 2
+
+    with app.app_context():
+        bug = Bug.query.filter_by(title='导入的缺陷标题').first()
+        assert bug.status == 'new'
+        assert bug.severity == 'medium'
+        assert bug.creator.username == 'testuser1'
+
+
+@pytest.mark.usefixtures('init_database')
+def test_import_indexes_each_row_under_its_own_id(logged_in_client, app):
+    """测试批量导入的全文索引与记录一一对应，按每行独有的词检索到的是该行"""
+    lines = [json.dumps({'title': f'导入缺陷 token{i}x', 'description': f'批量导入的缺陷描述 token{i}x'},
+                        ensure_ascii=False) for i in range(20)]
+    response = logged_in_client.post(
+        url_for('bugs.import_bugs', format='ndjson', batch_size=7),
+        data='\n'.join(lines).encode('utf-8'),
+        content_type='application/x-ndjson'
+    )
+    assert _read_lines(response)[-1]['imported'] == 20
+
+    with app.app_context():
+        for i in range(20):
+            results = search_service.search('bug', f'token{i}x')
+            assert len(results) == 1
+            assert db.session.get(Bug, results[0]['id']).title == f'导入缺陷 token{i}x'
+
+
+def test_iter_json_array_streams_elements(monkeypatch):
+    """测试JSON数组逐个元素解析，元素跨读取块时也能正确拼接"""
+    monkeypatch.setattr(import_service, '_READ_SIZE', 7)
+    data = json.dumps([{'title': '第一条', 'n': 1}, {'title': '第二条, ]', 'n': 2}], ensure_ascii=False)
+    records = list(import_service.iter_records(io.BytesIO(data.encode('utf-8')), 'json'))
+    assert records == [(1, {'title': '第一条', 'n': 1}), (2, {'title': '第二条, ]', 'n': 2})]
+
+    with pytest.raises(import_service.ImportFileError):
+        list(import_service.iter_records(io.BytesIO(b'{"title": 1}'), 'json'))
+
+
+@pytest.mark.usefixtures('init_database')
+def test_import_cli(app, tmp_path):
+    """测试命令行导入"""
+    path = tmp_path / 'cases.ndjson'
+    path.write_text(json.dumps({
+        'title': '命令行导入用例', 'description': '这是一个命令行导入的用例',
+        'steps': '1. 执行', 'expected_result': '成功', 'module': '命令行'
+    }, ensure_ascii=False) + '\n', encoding='utf-8')
+
+    result = app.test_cli_runner().invoke(args=['data', 'import', 'test_case', str(path), '--user', 'testuser1'])
+    assert result.exit_code == 0, result.output
+    assert '成功 1 行' in result.output
+
+    with app.app_context():
+        test_case = TestCase.query.filter_by(title='命令行导入用例').first()
+        assert test_case.status == 'not_run'
+        assert test_case.priority == 'p2'
+
+
+@pytest.mark.usefixtures('init_database')
+def test_export_bugs_csv_with_filters(logged_in_client):
+    """测试按列表筛选条件流式导出缺陷CSV"""
+    response = logged_in_client.get(url_for('bugs.export_bugs', severity='high'))
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert 'attachment' in response.headers['Content-Disposition']
+
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True).lstrip('\ufeff'))))
+    assert [row['title'] for row in rows] == ['测试缺陷2']
+    assert rows[0]['creator_name'] == 'testuser2'
+    assert rows[0]['assignee_name'] == ''
+
+
+@pytest.mark.usefixtures('init_database')
+def test_export_test_cases_ndjson_round_trip(logged_in_client, app):
+    """测试NDJSON导出的数据可以直接重新导入"""
+    response = logged_in_client.get(url_for('test_cases.export_test_cases', format='ndjson'))
+    rows = _read_lines(response)
+    assert [row['title'] for row in rows] == ['测试用例2', '测试用例1']
+    assert rows[0]['bug_count'] == 0
+
+    # 测试数据的描述不足10个字符，补齐后重新导入
+    body = ''.join(json.dumps(dict(row, description=row['description'] + '（已导出）'), ensure_ascii=False) + '\n'
+                   for row in rows)
+    response = logged_in_client.post(
+        url_for('test_cases.import_test_cases', format='ndjson'),
+        data=body.encode('utf-8'), content_type='application/x-ndjson'
+    )
+    assert _read_lines(response)[-1]['imported'] == 2
@@ -0,0 +1,90 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from app import db, migrations
+
+
+@pytest.fixture(scope='function')
+def engine(tmp_path):
+    """独立的临时数据库引擎"""
+    engine = create_engine(f'sqlite:///{tmp_path / "migrate.db"}')
+    yield engine
+    engine.dispose()
+
+
+def test_upgrade_fresh_database(app, engine):
+    """测试在空数据库上执行全部迁移"""
+    applied = migrations.upgrade(engine)
+    assert [m.version for m in applied] == [m.version for m in migrations.discover()]
+    
+    with engine.connect() as connection:
+        assert migrations.current_version(connection) == applied[-1].version
+        inspector = inspect(connection)
+        assert {'user', 'bug', 'test_case', 'bug_testcase_association', 'ai_config'} <= set(inspector.get_table_names())
+        bug_indexes = {ix['name'] for ix in inspector.get_indexes('bug')}
+        assert 'ix_bug_status_created_at_id' in bug_indexes
+        assert 'ix_bug_created_at_id' in bug_indexes
+        assert 'ix_bug_testcase_association_testcase_id' in {
+            ix['name'] for ix in inspector.get_indexes('bug_testcase_association')}
+    
+    # 重复执行不做任何操作
+    assert migrations.upgrade(engine) == []
+
+
+def test_versions_have_fixed_schema(app, engine):
+    """测试每个版本只包含本版本及之前定义的字段和索引，与当前模型无关"""
+    migrations.upgrade(engine, target=1)
+    with engine.connect() as connection:
+        inspector = inspect(connection)
+        assert 'last_executed_at' not in {col['name'] for col in inspector.get_columns('test_case')}
+        assert inspector.get_indexes('bug') == []
+
+    migrations.upgrade(engine, target=3)
+    with engine.connect() as connection:
+        bug_indexes = {ix['name'] for ix in inspect(connection).get_indexes('bug')}
+        assert 'ix_bug_created_at_id' in bug_indexes
+        assert 'ix_bug_title' not in bug_indexes
+
+    migrations.upgrade(engine, target=6)
+    with engine.connect() as connection:
+        inspector = inspect(connection)
+        assert 'ix_bug_title' in {ix['name'] for ix in inspector.get_indexes('bug')}
+        assert 'last_executed_at' in {col['name'] for col in inspector.get_columns('test_case')}
+
+
+def test_migrated_schema_matches_models(app, engine):
+    """测试执行全部迁移后的表结构与模型定义一致"""
+    migrations.upgrade(engine)
+    with engine.connect() as connection:
+        inspector = inspect(connection)
+        for table in db.metadata.sorted_tables:
+            assert {col['name'] for col in inspector.get_columns(table.name)} == set(table.c.keys()), table.name
+            assert {ix['name'] for ix in inspector.get_indexes(table.name)} == \
+                {ix.name for ix in table.indexes}, table.name
+
+
+def test_upgrade_indexes_existing_data(app, engine):
+    """测试升级已有数据的旧数据库时补建索引和全文检索数据"""
+    migrations.upgrade(engine, target=1)
+    with engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO user (id, username, email, password_hash) VALUES (1, 'u1', 'u1@example.com', 'x')"))
+        connection.execute(text(
+            "INSERT INTO bug (id, title, description, created_by, created_at) "
+            "VALUES (1, '登录页面崩溃', '点击登录按钮后页面崩溃', 1, '2024-01-01 00:00:00')"))
+    
+    migrations.upgrade(engine)
+    with engine.connect() as connection:
+        matched = connection.execute(text(
+            "SELECT rowid FROM bug_fts WHERE bug_fts MATCH '\"崩溃\"'")).scalars().all()
+        assert matched == [1]
+
+
+def test_downgrade_all(app, engine):
+    """测试回退全部迁移"""
+    migrations.upgrade(engine)
+    reverted = migrations.downgrade(engine, 0)
+    assert [m.version for m in reverted] == sorted((m.version for m in migrations.discover()), reverse=True)
+    
+    with engine.connect() as connection:
+        assert migrations.current_version(connection) == 0
+        assert inspect(connection).get_table_names() == ['schema_version']
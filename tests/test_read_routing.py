@@ -0,0 +1,71 @@
+import pytest
+from flask import url_for
+from sqlalchemy import event
+from app import db
+from app.database import READ_ENGINE_KEY, init_read_engine
+
+
+@pytest.fixture(scope='function')
+def read_routing(app):
+    """开启读写分离，返回只读引擎上执行的SQL语句列表"""
+    app.config.update(DATABASE_READ_ROUTING=True, DATABASE_READ_AFTER_WRITE_SECONDS=0)
+    init_read_engine(app, db)
+    engine = app.extensions[READ_ENGINE_KEY]
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    yield statements
+
+    app.config.update(DATABASE_READ_ROUTING=False)
+    init_read_engine(app, db)
+
+
+@pytest.mark.usefixtures('init_database')
+def test_get_requests_use_read_engine(logged_in_client, read_routing):
+    """测试读请求的查询发送到只读引擎"""
+    response = logged_in_client.get(url_for('bugs.bug_list'))
+    assert response.status_code == 200
+    assert '测试缺陷1' in response.get_data(as_text=True)
+    assert any('FROM bug' in statement for statement in read_routing)
+
+
+@pytest.mark.usefixtures('init_database')
+def test_writes_stay_on_primary(logged_in_client, read_routing):
+    """测试写请求不使用只读引擎，写入后读请求能读到新数据"""
+    response = logged_in_client.post(url_for('bugs.create_bug'), data={
+        'title': '读写分离测试缺陷',
+        'description': '这是一个读写分离测试缺陷',
+        'severity': 'medium',
+        'priority': 'p2',
+        'bug_type': 'functional',
+        'environment': 'test'
+    }, follow_redirects=False)
+    assert response.status_code == 302
+    assert not any(statement.lstrip().upper().startswith(('INSERT', 'UPDATE', 'DELETE'))
+                   for statement in read_routing)
+
+    response = logged_in_client.get(url_for('bugs.bug_list'))
+    assert '读写分离测试缺陷' in response.get_data(as_text=True)
+
+
+@pytest.mark.usefixtures('init_database')
+def test_read_your_writes_after_post(logged_in_client, read_routing, app):
+    """测试写请求之后的窗口期内，同一会话的读请求走主库"""
+    app.config['DATABASE_READ_AFTER_WRITE_SECONDS'] = 60
+    logged_in_client.post(url_for('bugs.create_bug'), data={
+        'title': '读己之写测试缺陷',
+        'description': '这是一个读己之写测试缺陷',
+        'severity': 'low',
+        'priority': 'p3',
+        'bug_type': 'functional',
+        'environment': 'test'
+    })
+    read_routing.clear()
+
+    response = logged_in_client.get(url_for('bugs.bug_list'))
+    assert '读己之写测试缺陷' in response.get_data(as_text=True)
+    assert read_routing == []
@@ -0,0 +1,193 @@
+import threading
+import time
+import pytest
+from flask import url_for
+from app import db
+from app.models import Bug, TestCase, StatusCounter
+from app.services import stats_service
+
+
+@pytest.mark.usefixtures('init_database')
+def test_aggregate_status_counts(app):
+    """测试一次分组聚合统计状态数量"""
+    with app.app_context():
+        counts = stats_service.aggregate_status_counts('test_case')
+        assert counts['total'] == 2
+        assert counts['not_run'] == 1
+        assert counts['passed'] == 1
+
+
+@pytest.mark.usefixtures('init_database')
+def test_status_counts_rebuilt_on_next_write(app):
+    """测试计数器失效后读取直接聚合而不写入，下一次写入该实体时重建"""
+    with app.app_context():
+        stats_service.invalidate_status_counts(db.session.connection(), ['bug'])
+        db.session.commit()
+
+        counts = stats_service.read_status_counts('bug')
+        assert counts['total'] == 2
+        assert counts['new'] == 2
+        assert StatusCounter.query.filter_by(entity='bug').count() == 0
+
+        bug = db.session.get(Bug, 1)
+        bug.status = 'fixed'
+        db.session.commit()
+        assert stats_service.read_status_counts('bug') == {'new': 1, 'fixed': 1, 'total': 2}
+        assert StatusCounter.query.filter_by(entity='bug', status=stats_service.TOTAL_KEY).first() is not None
+
+
+@pytest.mark.usefixtures('init_database')
+def test_list_view_within_budget_after_invalidation(logged_in_client, app):
+    """测试计数器失效后列表页仍在查询预算内（严格模式），且不写入计数器"""
+    with app.app_context():
+        stats_service.invalidate_status_counts(db.session.connection(), ['bug', 'test_case'])
+        db.session.commit()
+
+    assert app.config.get('QUERY_BUDGET_STRICT', app.testing)
+    assert logged_in_client.get(url_for('bugs.bug_list')).status_code == 200
+    assert logged_in_client.get(url_for('bugs.list_bugs_json')).status_code == 200
+    assert logged_in_client.get(url_for('test_cases.test_case_list')).status_code == 200
+
+    with app.app_context():
+        assert StatusCounter.query.count() == 0
+
+
+@pytest.mark.usefixtures('init_database')
+def test_status_counts_follow_write_paths(logged_in_client, app):
+    """测试创建、状态更新、删除时计数器增量维护"""
+    logged_in_client.post(url_for('test_cases.create_test_case'), data={
+        'title': '计数测试用例',
+        'description': '这是一个计数测试用例',
+        'steps': '1. 步骤1',
+        'expected_result': '预期结果',
+        'priority': 'p2',
+        'test_type': 'functional',
+        'module': '测试模块',
+        'status': 'failed'
+    })
+    logged_in_client.post(url_for('test_cases.update_test_case_status', test_case_id=1), data={
+        'status': 'passed'
+    })
+    logged_in_client.post(url_for('test_cases.delete_test_case', test_case_id=1))
+
+    with app.app_context():
+        counts = stats_service.get_status_counts('test_case')
+        assert {k: v for k, v in counts.items() if v} == stats_service.aggregate_status_counts('test_case')
+        assert counts['total'] == 2
+        assert counts['failed'] == 1
+        assert counts['passed'] == 1
+        assert counts.get('not_run', 0) == 0
+
+
+@pytest.mark.usefixtures('init_database')
+def test_bug_status_counts_follow_edits(logged_in_client, app):
+    """测试缺陷状态变更时计数器增量维护"""
+    logged_in_client.post(url_for('bugs.update_bug_status', bug_id=2), data={'status': 'fixed'})
+
+    with app.app_context():
+        counts = stats_service.get_status_counts('bug')
+        assert counts['total'] == 2
+        assert counts['new'] == 1
+        assert counts['fixed'] == 1
+
+
+@pytest.mark.usefixtures('init_database')
+def test_concurrent_status_edits_keep_counts_exact(app):
+    """测试两个事务同时修改同一缺陷的状态后，计数器与实际数据一致"""
+    barrier = threading.Barrier(2)
+    errors = []
+
+    def edit(status):
+        with app.app_context():
+            try:
+                bug = db.session.get(Bug, 1)
+                assert bug.status == 'new'
+                barrier.wait(timeout=5)
+                bug.status = status
+                db.session.commit()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=edit, args=(status,)) for status in ('fixed', 'closed')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+    with app.app_context():
+        counts = stats_service.get_status_counts('bug')
+        assert {k: v for k, v in counts.items() if v} == stats_service.aggregate_status_counts('bug')
+        assert counts['total'] == 2
+        assert counts['new'] == 1
+
+
+@pytest.mark.usefixtures('init_database')
+def test_reconcile_repairs_drifted_counts(app):
+    """测试核对命令发现计数器偏差后按实际数据重建"""
+    with app.app_context():
+        stats_service.apply_status_deltas(db.session.connection(), 'bug', {'new': -1, 'fixed': 1})
+        db.session.commit()
+
+        result = app.test_cli_runner().invoke(args=['stats', 'reconcile', '--entity', 'bug'])
+        assert result.exit_code == 0
+        assert 'fixed 1 -> 0' in result.output
+        assert stats_service.get_status_counts('bug')['new'] == 2
+        assert stats_service.reconcile_status_counts('bug') == {}
+
+
+@pytest.mark.usefixtures('init_database')
+def test_bulk_update_holds_lock_between_count_and_update(app):
+    """测试批量更新读取旧状态后，并发的单条修改要等批量更新提交后才能写入"""
+    from sqlalchemy import event
+    from app.services import bulk_service
+
+    counted, edit_started = threading.Event(), threading.Event()
+    errors = []
+
+    def pause_after_count(conn, cursor, statement, parameters, context, executemany):
+        if 'GROUP BY' in statement and threading.current_thread().name == 'bulk':
+            counted.set()
+            edit_started.wait(timeout=5)
+            time.sleep(0.2)  # 没有写锁时，单条修改会在这段时间内提交
+
+    def bulk():
+        with app.app_context():
+            try:
+                bulk_service.bulk_update('bug', [1, 2], {'status': 'closed'})
+            except Exception as e:
+                errors.append(e)
+            finally:
+                db.session.remove()
+
+    def edit():
+        with app.app_context():
+            try:
+                bug = db.session.get(Bug, 1)
+                counted.wait(timeout=5)
+                edit_started.set()
+                bug.status = 'fixed'
+                db.session.commit()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                db.session.remove()
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'after_cursor_execute', pause_after_count)
+    try:
+        threads = [threading.Thread(target=bulk, name='bulk'), threading.Thread(target=edit)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        event.remove(engine, 'after_cursor_execute', pause_after_count)
+    assert errors == []
+
+    with app.app_context():
+        counts = stats_service.get_status_counts('bug')
+        assert {k: v for k, v in counts.items() if v} == stats_service.aggregate_status_counts('bug')
@@ -193,3 +193,57 @@ def test_link_test_case_to_bug(logged_in_client, app):
     with app.app_context():
         test_case = TestCase.query.get(2)
         assert len(test_case.bugs) == 0
+
+
+@pytest.mark.usefixtures('init_database')
+def test_test_case_list_query_budget(logged_in_client, app):
+    """测试列表页查询数量与行数无关（创建人和关联缺陷数随主查询加载）"""
+    from app import db
+    from app.models import Bug
+    
+    with app.app_context():
+        bugs = Bug.query.all()
+        for i in range(12):
+            test_case = TestCase(title=f'批量用例{i}', description='批量用例描述', steps='1. 步骤',
+                                 expected_result='通过', created_by=1 + i % 2)
+            test_case.bugs.extend(bugs[:i % 3])
+            db.session.add(test_case)
+        db.session.commit()
+    
+    # 超出查询预算时测试环境会直接抛出异常
+    response = logged_in_client.get(url_for('test_cases.test_case_list'))
+    assert response.status_code == 200
+    
+    response = logged_in_client.get(url_for('test_cases.list_test_cases_json', per_page=12))
+    items = response.get_json()['items']
+    assert {item['title']: item['bug_count'] for item in items}['批量用例11'] == 2
+    assert {item['title']: item['bug_count'] for item in items}['批量用例10'] == 1
+
+
+@pytest.mark.usefixtures('init_database')
+def test_batch_link_bugs(logged_in_client, app):
+    """测试批量关联：一组用例与一组缺陷两两关联，重复关联和不存在的记录被忽略"""
+    from app import db
+    from app.models import Bug
+    
+    with app.app_context():
+        case_ids = [test_case.id for test_case in TestCase.query.all()]
+        bug_ids = [bug.id for bug in Bug.query.all()]
+        test_case = db.session.get(TestCase, case_ids[0])
+        test_case.bugs.append(db.session.get(Bug, bug_ids[0]))
+        db.session.commit()
+    
+    url = url_for('test_cases.batch_link_bugs')
+    response = logged_in_client.post(url, json={'test_case_ids': case_ids, 'bug_ids': bug_ids + [9999]})
+    assert response.get_json() == {'requested': 6, 'linked': 3}
+    
+    with app.app_context():
+        for case_id in case_ids:
+            assert sorted(bug.id for bug in db.session.get(TestCase, case_id).bugs) == sorted(bug_ids)
+    
+    response = logged_in_client.delete(url, json={'test_case_ids': case_ids, 'bug_ids': bug_ids[:1]})
+    assert response.get_json()['unlinked'] == 2
+    with app.app_context():
+        assert db.session.get(Bug, bug_ids[0]).linked_test_cases.count() == 0
+    
+    assert logged_in_client.post(url, json={'test_case_ids': [], 'bug_ids': bug_ids}).status_code == 400
@@ -0,0 +1,137 @@
+import threading
+import time
+import pytest
+from flask import url_for
+from sqlalchemy import event
+from app import db
+from app.models import TestCase, TestResult, TestRun
+from app.services import stats_service, test_run_service
+
+
+def _create_run(client, name='回归测试第1轮'):
+    response = client.post(url_for('test_runs.create_test_run'), json={'name': name})
+    assert response.status_code == 201
+    return response.get_json()['id']
+
+
+@pytest.mark.usefixtures('init_database')
+def test_record_results_updates_aggregates(logged_in_client, app):
+    """测试批量写入结果后轮次汇总增量更新，用例状态同步为最近结果"""
+    with app.app_context():
+        case_ids = [test_case.id for test_case in TestCase.query.order_by(TestCase.id)]
+    run_id = _create_run(logged_in_client)
+
+    response = logged_in_client.post(url_for('test_runs.record_test_results', run_id=run_id), json={'results': [
+        {'test_case_id': case_ids[0], 'status': 'failed', 'duration_ms': 100},
+        {'test_case_id': case_ids[1], 'status': 'passed', 'duration_ms': 50},
+        {'test_case_id': 9999, 'status': 'passed'},
+        {'test_case_id': case_ids[1], 'status': 'bogus'}
+    ]})
+    data = response.get_json()
+    assert data['recorded'] == 2
+    assert [error['index'] for error in data['errors']] == [2, 3]
+    assert data['run']['total_count'] == 2
+    assert data['run']['failed_count'] == 1
+    assert data['run']['passed_count'] == 1
+    assert data['run']['duration_ms'] == 150
+
+    # 重新执行失败的用例：汇总以最新结果为准，结果记录仍然追加
+    response = logged_in_client.post(url_for('test_runs.record_test_results', run_id=run_id), json={'results': [
+        {'test_case_id': case_ids[0], 'status': 'passed', 'duration_ms': 80}
+    ]})
+    run = response.get_json()['run']
+    assert (run['total_count'], run['passed_count'], run['failed_count']) == (2, 2, 0)
+    assert run['duration_ms'] == 130
+    assert run['pass_rate'] == 100.0
+
+    with app.app_context():
+        assert TestResult.query.filter_by(run_id=run_id).count() == 3
+        test_case = db.session.get(TestCase, case_ids[0])
+        assert test_case.status == 'passed'
+        assert test_case.last_executed_at is not None
+        counts = stats_service.get_status_counts('test_case')
+        assert counts['passed'] == 2
+        assert counts.get('not_run', 0) == 0
+
+
+@pytest.mark.usefixtures('init_database')
+def test_finished_run_rejects_results(logged_in_client, app):
+    """测试结束后的轮次不能再写入结果"""
+    with app.app_context():
+        case_id = TestCase.query.first().id
+    run_id = _create_run(logged_in_client)
+
+    response = logged_in_client.post(url_for('test_runs.finish_test_run', run_id=run_id), json={'status': 'completed'})
+    assert response.get_json()['status'] == 'completed'
+    assert response.get_json()['finished_at']
+
+    response = logged_in_client.post(url_for('test_runs.record_test_results', run_id=run_id),
+                                     json={'results': [{'test_case_id': case_id, 'status': 'passed'}]})
+    assert response.status_code == 409
+
+
+@pytest.mark.usefixtures('init_database')
+def test_list_runs_and_results(logged_in_client, app):
+    """测试轮次列表和结果分页"""
+    with app.app_context():
+        case_ids = [test_case.id for test_case in TestCase.query.order_by(TestCase.id)]
+    run_id = _create_run(logged_in_client, '冒烟测试')
+    logged_in_client.post(url_for('test_runs.record_test_results', run_id=run_id), json={'results': [
+        {'test_case_id': case_id, 'status': 'blocked'} for case_id in case_ids
+    ]})
+
+    runs = logged_in_client.get(url_for('test_runs.list_test_runs')).get_json()
+    assert runs['items'][0]['name'] == '冒烟测试'
+    assert runs['items'][0]['blocked_count'] == 2
+
+    page = logged_in_client.get(url_for('test_runs.list_test_results', run_id=run_id, per_page=1)).get_json()
+    assert len(page['items']) == 1
+    page = logged_in_client.get(url_for('test_runs.list_test_results', run_id=run_id, per_page=1,
+                                        after=page['next_after'])).get_json()
+    assert page['items'][0]['test_case_id'] == case_ids[1]
+    assert page['next_after'] is None
+
+
+@pytest.mark.usefixtures('init_database')
+def test_concurrent_batches_keep_aggregates_exact(logged_in_client, app):
+    """测试同一轮次的两批结果并发写入同一用例时，汇总仍按最新结果统计"""
+    run_id = _create_run(logged_in_client)
+    read_latest, second_started = threading.Event(), threading.Event()
+    errors = []
+
+    def pause_after_latest(conn, cursor, statement, parameters, context, executemany):
+        if 'max(test_result.id)' in statement and threading.current_thread().name == 'first':
+            read_latest.set()
+            second_started.wait(timeout=5)
+            time.sleep(0.2)  # 没有锁定轮次时，第二批会在这段时间内写入并提交
+
+    def record(status):
+        with app.app_context():
+            try:
+                if status == 'failed':
+                    read_latest.wait(timeout=5)
+                    second_started.set()
+                test_run_service.record_results(db.session.get(TestRun, run_id),
+                                                [{'test_case_id': 1, 'status': status}], 1)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                db.session.remove()
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'after_cursor_execute', pause_after_latest)
+    try:
+        threads = [threading.Thread(target=record, args=('passed',), name='first'),
+                   threading.Thread(target=record, args=('failed',))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        event.remove(engine, 'after_cursor_execute', pause_after_latest)
+    assert errors == []
+
+    with app.app_context():
+        run = db.session.get(TestRun, run_id)
+        assert (run.total_count, run.passed_count, run.failed_count) == (1, 0, 1)